@@ -0,0 +1 @@
+"""Utilities shared by the extractors and the modelling scripts."""
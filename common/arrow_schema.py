@@ -0,0 +1,150 @@
+"""
+Explicit Arrow schemas for warehouse loads.
+
+Tables are loaded as Parquet with a schema derived from the row dataclasses, and
+from the target table's own schema where it already exists, rather than one
+inferred from each DataFrame. Values are coerced column by column to the declared
+type, so a column never changes type between runs because one chunk happened to
+hold only numbers or only empty strings.
+"""
+
+import dataclasses
+import io
+import typing
+from datetime import date, datetime
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ARROW_TYPES = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    datetime: pa.timestamp("us", tz="UTC"),
+    date: pa.date32(),
+}
+
+BIGQUERY_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INTEGER": pa.int64(),
+    "INT64": pa.int64(),
+    "FLOAT": pa.float64(),
+    "FLOAT64": pa.float64(),
+    "NUMERIC": pa.float64(),
+    "BOOLEAN": pa.bool_(),
+    "BOOL": pa.bool_(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+    "DATETIME": pa.timestamp("us"),
+    "DATE": pa.date32(),
+}
+
+
+def unwrap_optional(annotation):
+    """Returns `T` for an `Optional[T]` annotation, otherwise the annotation."""
+    if typing.get_origin(annotation) is typing.Union:
+        arguments = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(arguments) == 1:
+            return arguments[0]
+    return annotation
+
+
+def dataclass_schema(cls) -> pa.Schema:
+    """Builds an Arrow schema from a row dataclass's field annotations."""
+    hints = typing.get_type_hints(cls)
+    return pa.schema(
+        [
+            pa.field(
+                field.name,
+                ARROW_TYPES.get(unwrap_optional(hints[field.name]), pa.string()),
+            )
+            for field in dataclasses.fields(cls)
+        ]
+    )
+
+
+def bigquery_schema(fields) -> pa.Schema:
+    """Builds an Arrow schema from a list of BigQuery `SchemaField`s."""
+    return pa.schema(
+        [
+            pa.field(field.name, BIGQUERY_ARROW_TYPES[field.field_type])
+            for field in fields
+            if field.field_type in BIGQUERY_ARROW_TYPES
+        ]
+    )
+
+
+def merge_schemas(*schemas: Optional[pa.Schema]) -> Dict[str, pa.DataType]:
+    """Combines schemas into a column -> type mapping; later schemas take priority."""
+    types = {}
+    for schema in schemas:
+        if schema is not None:
+            types.update(zip(schema.names, schema.types))
+    return types
+
+
+def _to_arrow_array(series: pd.Series, arrow_type: pa.DataType) -> pa.Array:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if pa.types.is_string(arrow_type):
+        values = series.map(
+            lambda value: value if isinstance(value, str) else str(value),
+            na_action="ignore",
+        )
+        values = values.astype(object).where(values.notna(), None)
+    elif pa.types.is_integer(arrow_type):
+        numbers = pd.to_numeric(series, errors="coerce")
+        # Non-integral values cannot be held exactly and become missing
+        values = numbers.where(numbers.isna() | (numbers % 1 == 0)).astype("Int64")
+    elif pa.types.is_floating(arrow_type):
+        values = pd.to_numeric(series, errors="coerce").astype("float64")
+    elif pa.types.is_timestamp(arrow_type):
+        values = pd.to_datetime(series, errors="coerce", utc=arrow_type.tz is not None)
+    elif pa.types.is_date(arrow_type):
+        values = pd.to_datetime(series, errors="coerce").dt.date
+    elif pa.types.is_boolean(arrow_type):
+        values = series.astype("boolean")
+    else:
+        values = series
+    return pa.array(values, type=arrow_type, from_pandas=True)
+
+
+def to_arrow_table(
+    dataframe: pd.DataFrame,
+    types: Dict[str, pa.DataType],
+    table: Optional[str] = None,
+    report=None,
+) -> pa.Table:
+    """
+    Converts `dataframe` to an Arrow table, coercing each column to its type in
+    `types`. Columns without a declared type keep the type Arrow infers, or are
+    loaded as strings when their values have mixed types. Values that cannot be
+    coerced become null, and are counted against `table` in `report`, a
+    `ConversionReport`, when one is given.
+    """
+    arrays = []
+    for column in dataframe.columns:
+        if column in types:
+            raw = dataframe[column]
+            array = _to_arrow_array(raw, types[column])
+            if report is not None and array.null_count > raw.isna().sum():
+                failed = pd.Series(
+                    array.is_null().to_numpy(zero_copy_only=False), index=raw.index
+                )
+                blank = raw.isna() | raw.astype(str).str.strip().eq("")
+                report.record(table, column, failed & ~blank, raw)
+            arrays.append(array)
+            continue
+        try:
+            arrays.append(pa.array(dataframe[column], from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(_to_arrow_array(dataframe[column], pa.string()))
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in dataframe.columns])
+
+
+def to_parquet_bytes(table: pa.Table) -> bytes:
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="snappy")
+    return buffer.getvalue()
@@ -0,0 +1,49 @@
+"""Column-wise row builders that feed DataFrames without per-row objects."""
+
+import dataclasses
+from typing import Iterable, Sequence
+
+import pandas as pd
+
+
+class ColumnBuilder:
+    """
+    Accumulates one table as a list per column.
+
+    Rows are appended as positional values in column order, so no per-row object
+    or dict is created; `to_dataframe` hands the lists to pandas column by column.
+    """
+
+    __slots__ = ("columns", "_lists", "_appends")
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        self._lists = [[] for _ in self.columns]
+        self._appends = [values.append for values in self._lists]
+
+    @classmethod
+    def for_dataclass(cls, row_type) -> "ColumnBuilder":
+        """Builds a table whose columns are the fields of a row dataclass."""
+        return cls([field.name for field in dataclasses.fields(row_type)])
+
+    def __len__(self) -> int:
+        return len(self._lists[0]) if self._lists else 0
+
+    def append(self, *values) -> None:
+        for append, value in zip(self._appends, values):
+            append(value)
+
+    def extend(self, *columns: Iterable) -> None:
+        """Appends several rows given as one sequence per column."""
+        for values, column in zip(self._lists, columns):
+            values.extend(column)
+
+    def extend_keyed(self, key, values: Sequence) -> None:
+        """Appends one row per value for a two-column (key, value) table."""
+        self._lists[0].extend([key] * len(values))
+        self._lists[1].extend(values)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if not len(self):
+            return pd.DataFrame()
+        return pd.DataFrame(dict(zip(self.columns, self._lists)), columns=self.columns)
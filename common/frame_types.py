@@ -0,0 +1,137 @@
+"""
+Typed, memory-compact DataFrame columns.
+
+Parsed rows arrive as object columns of strings. `apply_column_types` converts the
+declared columns with vectorised parsers: dates to UTC datetimes, numbers to
+float64 or nullable Int64, and low-cardinality text to categoricals. Values that
+do not parse become missing and are counted in `ConversionReport` rather than
+kept as strings; empty strings are treated as missing, not as failures.
+"""
+
+import dataclasses
+import threading
+import typing
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from common.arrow_schema import unwrap_optional
+
+DATETIME = "datetime64[ns, UTC]"
+FLOAT = "float64"
+INTEGER = "Int64"
+CATEGORY = "category"
+
+_ANNOTATION_DTYPES = {datetime: DATETIME, float: FLOAT, int: INTEGER}
+
+
+def dataclass_dtypes(cls, categorical: Iterable[str] = ()) -> Dict[str, str]:
+    """
+    Returns the typed columns of a row dataclass: its datetime, float and int
+    fields, plus the `categorical` text fields.
+    """
+    hints = typing.get_type_hints(cls)
+    dtypes = {}
+    for field in dataclasses.fields(cls):
+        annotation = unwrap_optional(hints[field.name])
+        if annotation in _ANNOTATION_DTYPES:
+            dtypes[field.name] = _ANNOTATION_DTYPES[annotation]
+    dtypes.update((column, CATEGORY) for column in categorical)
+    return dtypes
+
+
+class ConversionReport:
+    """Counts values that failed to parse, and memory before and after, per table."""
+
+    def __init__(self):
+        self.failures = defaultdict(int)
+        self.examples = {}
+        self.bytes_before = defaultdict(int)
+        self.bytes_after = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, table, column, failed: pd.Series, raw: pd.Series) -> None:
+        count = int(failed.sum())
+        if not count:
+            return
+        with self._lock:
+            self.failures[(table, column)] += count
+            self.examples.setdefault((table, column), raw[failed].iloc[0])
+
+    def record_memory(self, table, before: int, after: int) -> None:
+        with self._lock:
+            self.bytes_before[table] += before
+            self.bytes_after[table] += after
+
+    def print_summary(self) -> None:
+        for table, before in self.bytes_before.items():
+            after = self.bytes_after[table]
+            print(
+                f"Typed {table}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+                f"({1 - after / max(before, 1):.0%} smaller)"
+            )
+        for (table, column), count in sorted(self.failures.items()):
+            print(
+                f"  {table}.{column}: {count} values failed to parse, "
+                f"e.g. {self.examples[(table, column)]!r}"
+            )
+
+
+conversion_report = ConversionReport()
+
+
+def _is_blank(series: pd.Series) -> pd.Series:
+    return series.isna() | series.astype(str).str.strip().eq("")
+
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        return series.dt.tz_convert("UTC")
+    if pd.api.types.is_datetime64_dtype(series):
+        return series.dt.tz_localize("UTC")
+    converted = pd.to_datetime(series, errors="coerce", utc=True, format="ISO8601")
+    retry = converted.isna() & ~_is_blank(series)
+    if retry.any():
+        # Fall back to per-value inference for the few non-ISO dates
+        converted[retry] = pd.to_datetime(
+            series[retry], errors="coerce", utc=True, format="mixed"
+        )
+    return converted
+
+
+def _convert(series: pd.Series, dtype: str) -> pd.Series:
+    if dtype == DATETIME:
+        return _to_datetime(series)
+    if dtype == CATEGORY:
+        return series.astype(CATEGORY)
+    numbers = pd.to_numeric(series, errors="coerce")
+    if dtype == INTEGER:
+        # Non-integral values cannot be held exactly and count as failures
+        numbers = numbers.where(numbers.isna() | (numbers % 1 == 0))
+        return numbers.astype(INTEGER)
+    return numbers.astype(FLOAT)
+
+
+def apply_column_types(
+    dataframe: pd.DataFrame,
+    dtypes: Dict[str, str],
+    table: Optional[str] = None,
+    report: Optional[ConversionReport] = conversion_report,
+) -> pd.DataFrame:
+    """Converts the columns of `dataframe` named in `dtypes` in place and returns it."""
+    if dataframe.empty:
+        return dataframe
+    before = dataframe.memory_usage(deep=True).sum()
+    for column, dtype in dtypes.items():
+        if column not in dataframe or str(dataframe[column].dtype) == dtype:
+            continue
+        raw = dataframe[column]
+        converted = _convert(raw, dtype)
+        if report is not None and dtype != CATEGORY:
+            report.record(table, column, converted.isna() & ~_is_blank(raw), raw)
+        dataframe[column] = converted
+    if report is not None:
+        report.record_memory(table, before, dataframe.memory_usage(deep=True).sum())
+    return dataframe
@@ -0,0 +1,233 @@
+"""Pooled, keep-alive HTTP client shared by both extractors."""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from common.response_cache import ResponseCache
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+DEFAULT_MAX_RETRIES = 3
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    retries: int = 0
+    errors: int = 0
+    connections_opened: int = 0
+    new_connection_seconds: float = 0.0
+    reused_connection_seconds: float = 0.0
+
+    @property
+    def connections_reused(self) -> int:
+        return max(0, self.requests - self.errors - self.connections_opened)
+
+    @property
+    def estimated_seconds_saved(self) -> float:
+        """Handshake time saved by reuse, from the latency gap of new connections."""
+        if not self.connections_opened or not self.connections_reused:
+            return 0.0
+        new_latency = self.new_connection_seconds / self.connections_opened
+        reused_latency = self.reused_connection_seconds / self.connections_reused
+        return max(0.0, new_latency - reused_latency) * self.connections_reused
+
+
+class HttpClient:
+    """
+    Wraps a persistent `requests.Session` with a sized connection pool.
+
+    Connections are kept alive and reused across requests, responses are requested
+    compressed (brotli is advertised when a brotli decoder is installed), and
+    429/5xx responses and connection errors are retried with jittered exponential
+    backoff. Per-host request, retry and connection counts are kept in `stats()`.
+
+    When a `ResponseCache` is attached, successful bodies are written to it, and in
+    replay mode requests are answered from it without touching the network.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.session.headers.update(
+            {"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"}
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._stats: Dict[str, HostStats] = defaultdict(HostStats)
+        self._lock = threading.Lock()
+
+    def _pool_connection_count(self, url: str) -> int:
+        """Counts connections opened so far by the urllib3 pools for the URL's host."""
+        hostname = urlsplit(url).hostname
+        pools = self.session.get_adapter(url).poolmanager.pools
+        total = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None and key.key_host == hostname:
+                total += pool.num_connections
+        return total
+
+    def _backoff_seconds(self, attempt: int, response=None) -> float:
+        retry_after = None
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(self.backoff_max, float(retry_after))
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _record(self, host: str, **increments) -> None:
+        with self._lock:
+            stats = self._stats[host]
+            for name, value in increments.items():
+                setattr(stats, name, getattr(stats, name) + value)
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        timeout=None,
+        max_retries: Optional[int] = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        Sends a GET request, retrying 429/5xx responses and connection errors.
+
+        Returns the last response received, which may still carry an error status
+        once retries are exhausted. Raises `requests.exceptions.RequestException`
+        if the final attempt fails without a response. With `stream=True` the body
+        is left unread and is not cached; use `iter_content` to stream and cache it.
+        """
+        if self.cache is not None and self.cache.replay:
+            return self.cache.replay_response(url, params)
+
+        host = urlsplit(url).netloc
+        max_retries = self.max_retries if max_retries is None else max_retries
+
+        for attempt in range(max_retries + 1):
+            connections_before = self._pool_connection_count(url)
+            start_time = time.monotonic()
+            try:
+                response = self.session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=timeout or self.timeout,
+                    stream=stream,
+                )
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ):
+                self._record(host, requests=1, errors=1)
+                if attempt == max_retries:
+                    raise
+                self._record(host, retries=1)
+                time.sleep(self._backoff_seconds(attempt))
+                continue
+
+            elapsed = time.monotonic() - start_time
+            opened = self._pool_connection_count(url) - connections_before
+            if opened > 0:
+                self._record(
+                    host,
+                    requests=1,
+                    connections_opened=opened,
+                    new_connection_seconds=elapsed,
+                )
+            else:
+                self._record(host, requests=1, reused_connection_seconds=elapsed)
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                self._record(host, retries=1)
+                response.close()
+                time.sleep(self._backoff_seconds(attempt, response))
+                continue
+            if self.cache is not None and response.status_code == 200 and not stream:
+                self.cache.store(url, params, response.content)
+            return response
+
+    def iter_content(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> Iterator[bytes]:
+        """
+        Sends a GET request and yields the response body in chunks as it arrives.
+
+        Raises `requests.exceptions.HTTPError` for an error status. The body is
+        written to the response cache as it streams and indexed once fully read.
+        """
+        with self.get(url, params=params, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size)
+            if self.cache is not None and not self.cache.replay:
+                chunks = self.cache.store_chunks(url, params, chunks)
+            yield from chunks
+
+    def stats(self) -> Dict[str, HostStats]:
+        """Returns a snapshot of the per-host statistics."""
+        with self._lock:
+            return {
+                host: HostStats(**vars(stats)) for host, stats in self._stats.items()
+            }
+
+    def print_stats(self) -> None:
+        for host, stats in self.stats().items():
+            print(
+                f"HTTP {host}: {stats.requests} requests, {stats.retries} retries, "
+                f"{stats.errors} errors, {stats.connections_opened} connections "
+                f"opened, {stats.connections_reused} reused "
+                f"(~{stats.estimated_seconds_saved:.1f}s of handshakes saved)"
+            )
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Returns the process-wide shared HttpClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure_response_cache(directory: Optional[str], replay: bool = False) -> None:
+    """Attaches an on-disk response cache to the shared client, or detaches it."""
+    if replay and not directory:
+        raise ValueError("Replay needs a response cache directory")
+    get_client().cache = ResponseCache(directory, replay) if directory else None
@@ -0,0 +1,25 @@
+"""JSON decoding with an optional fast backend.
+
+orjson is used when installed, then msgspec, falling back to the standard library.
+Malformed input raises the backend's `DecodeError`.
+"""
+
+import json
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+    DecodeError = orjson.JSONDecodeError
+    loads = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+
+        BACKEND = "msgspec"
+        DecodeError = msgspec.DecodeError
+        loads = msgspec.json.Decoder().decode
+    except ImportError:
+        BACKEND = "json"
+        DecodeError = json.JSONDecodeError
+        loads = json.loads
@@ -0,0 +1,195 @@
+"""Incremental JSON parsing of large responses.
+
+`JsonArrayStream` yields the items of one nested array as the response body
+arrives, so only one item is held in memory at a time, rather than decoding the
+whole body first. ijson is used when installed; otherwise an incremental decoder
+built on `json.JSONDecoder.raw_decode` walks down to the array. Malformed or
+truncated input raises `ValueError` with either backend.
+"""
+
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+try:
+    import ijson
+
+    BACKEND = "ijson"
+except ImportError:
+    ijson = None
+    BACKEND = "json"
+
+_WHITESPACE = " \t\n\r"
+_SCALAR_EVENTS = {"string", "number", "boolean", "null"}
+
+
+class _ChunkReader:
+    """File-like view of an iterable of byte chunks, for ijson."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class _TextBuffer:
+    """Decoded text of an iterable of byte chunks, read on demand."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self) -> None:
+        """Drops consumed text and at least doubles the unconsumed remainder."""
+        pieces = [self.text[self.pos :]]
+        self.pos = 0
+        target = max(len(pieces[0]) * 2, 1)
+        length = len(pieces[0])
+        while length < target and not self.eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                pieces.append(self._decoder.decode(b"", final=True))
+                self.eof = True
+            else:
+                pieces.append(self._decoder.decode(chunk))
+            length += len(pieces[-1])
+        self.text = "".join(pieces)
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character, or "" at the end."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text) or self.eof:
+                return self.text[self.pos : self.pos + 1]
+            self._read_more()
+
+    def take(self, expected: str) -> str:
+        character = self.peek()
+        if character not in expected:
+            raise ValueError(
+                f"Expected one of {expected!r} in JSON stream, found {character!r}"
+            )
+        self.pos += 1
+        return character
+
+    def value(self) -> Any:
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._read_more()
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and not self.eof:
+                self._read_more()
+                continue
+            self.pos = end
+            return value
+
+
+class JsonArrayStream:
+    """
+    Streams the items of the array at `array_path` in a JSON document.
+
+    Scalars found at `scalar_paths` on the way are kept in `scalars`. `found` is
+    set once the array has been reached, which tells a document without the array
+    apart from one whose array is empty. Paths are tuples of object keys.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        array_path: Tuple[str, ...],
+        scalar_paths: Iterable[Tuple[str, ...]] = (),
+    ):
+        self._chunks = chunks
+        self.array_path = tuple(array_path)
+        self.scalar_paths = {tuple(path) for path in scalar_paths}
+        self.scalars: Dict[Tuple[str, ...], Any] = {}
+        self.found = False
+
+    def items(self) -> Iterator[Any]:
+        """Yields each array item; the rest of the document is read to the end."""
+        if ijson is not None:
+            return self._ijson_items()
+        return self._decoder_items()
+
+    def _ijson_items(self) -> Iterator[Any]:
+        array_prefix = ".".join(self.array_path)
+        item_prefix = f"{array_prefix}.item" if array_prefix else "item"
+        scalar_prefixes = {".".join(path): path for path in self.scalar_paths}
+        builder = None
+        events = ijson.parse(_ChunkReader(self._chunks), use_float=True)
+        try:
+            for prefix, event, value in events:
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == item_prefix and event in ("end_map", "end_array"):
+                        yield builder.value
+                        builder = None
+                elif prefix == item_prefix and event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                elif prefix == item_prefix and event in _SCALAR_EVENTS:
+                    yield value
+                elif prefix == array_prefix and event == "start_array":
+                    self.found = True
+                elif prefix in scalar_prefixes and event in _SCALAR_EVENTS:
+                    self.scalars[scalar_prefixes[prefix]] = value
+        except ijson.JSONError as e:
+            raise ValueError(f"Malformed JSON stream: {e}") from e
+
+    def _decoder_items(self) -> Iterator[Any]:
+        buffer = _TextBuffer(self._chunks)
+        yield from self._walk(buffer, ())
+        if buffer.peek():
+            raise ValueError("Unexpected data after the end of the JSON document")
+
+    def _walk(self, buffer: _TextBuffer, path: Tuple[str, ...]) -> Iterator[Any]:
+        """Reads the value at `path`, descending only towards the array."""
+        if path == self.array_path and buffer.peek() == "[":
+            self.found = True
+            buffer.take("[")
+            if buffer.peek() == "]":
+                buffer.take("]")
+                return
+            while True:
+                yield buffer.value()
+                if buffer.take(",]") == "]":
+                    return
+
+        elif path == self.array_path[: len(path)] and buffer.peek() == "{":
+            buffer.take("{")
+            if buffer.peek() == "}":
+                buffer.take("}")
+                return
+            while True:
+                key = buffer.value()
+                buffer.take(":")
+                yield from self._walk(buffer, path + (key,))
+                if buffer.take(",}") == "}":
+                    return
+
+        else:
+            value = buffer.value()
+            if path in self.scalar_paths:
+                self.scalars[path] = value
@@ -0,0 +1,355 @@
+"""Server-side materialisation of the modelling SQL."""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from common.sql_dialect import replace_table_references, table_references
+from common.warehouse import ACCESSED_AT_COLUMN, QueryResult, Warehouse
+
+# Tables, next to the models, recording each incremental model's high-water mark
+# and the fingerprint of the sources each model was last built from
+WATERMARK_TABLE_NAME = "model_watermarks"
+FINGERPRINT_TABLE_NAME = "model_fingerprints"
+# Models running concurrently would otherwise race to create these tables
+_state_lock = threading.Lock()
+
+
+def format_bytes(num_bytes: Optional[int]) -> str:
+    if num_bytes is None:
+        return "unknown bytes"
+    size = float(num_bytes)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def materialise_model(
+    warehouse: Warehouse, sql: str, destination_table: str
+) -> QueryResult:
+    """
+    Rebuilds `destination_table` from `sql` inside the warehouse.
+
+    The query result is written with `create or replace table ... as`, so client
+    memory and transfer stay constant whatever the size of the model.
+    """
+    result = warehouse.materialise(sql, destination_table)
+    print(
+        f"Model {destination_table}: {format_bytes(result.bytes_processed)} "
+        f"processed in {result.elapsed_seconds:.1f}s"
+    )
+    return result
+
+
+def high_water_mark(
+    warehouse: Warehouse, tables: List[str]
+) -> Optional[pd.Timestamp]:
+    """Returns the latest `_accessed_at` in `tables`, or None if they are empty."""
+    latest = " union all ".join(
+        f"select max({ACCESSED_AT_COLUMN}) as {ACCESSED_AT_COLUMN} "
+        f"from {warehouse.quote(table)}"
+        for table in tables
+    )
+    value = warehouse.read_sql(
+        f"select max({ACCESSED_AT_COLUMN}) as high_water_mark from ({latest})"
+    )["high_water_mark"][0]
+    return None if pd.isna(value) else pd.Timestamp(value)
+
+
+def _state_table(destination_table: str, name: str) -> str:
+    return f"{destination_table.rsplit('.', 1)[0]}.{name}"
+
+
+def _read_state(warehouse: Warehouse, destination_table: str, name: str, column: str):
+    """Returns `column` of the model's row in the state table `name`, if any."""
+    table = _state_table(destination_table, name)
+    if not warehouse.table_exists(table):
+        return None
+    values = warehouse.read_sql(
+        f"select {column} from {warehouse.quote(table)} "
+        f'where model = "{destination_table}"'
+    )[column]
+    return None if values.empty or pd.isna(values[0]) else values[0]
+
+
+def _record_state(
+    warehouse: Warehouse, destination_table: str, name: str, column: str, value
+) -> None:
+    with _state_lock:
+        warehouse.upsert(
+            pd.DataFrame(
+                {
+                    "model": [destination_table],
+                    column: [value],
+                    ACCESSED_AT_COLUMN: [datetime.now(timezone.utc)],
+                }
+            ),
+            _state_table(destination_table, name),
+            ["model"],
+        )
+
+
+def previous_high_water_mark(
+    warehouse: Warehouse, destination_table: str
+) -> Optional[pd.Timestamp]:
+    """Returns the high-water mark recorded by the last run of a model."""
+    mark = _read_state(
+        warehouse, destination_table, WATERMARK_TABLE_NAME, "high_water_mark"
+    )
+    return None if mark is None else pd.Timestamp(mark)
+
+
+def record_high_water_mark(
+    warehouse: Warehouse, destination_table: str, mark: pd.Timestamp
+) -> None:
+    _record_state(
+        warehouse, destination_table, WATERMARK_TABLE_NAME, "high_water_mark", mark
+    )
+
+
+def model_fingerprint(warehouse: Warehouse, sql: str) -> str:
+    """
+    Hashes `sql` with the fingerprint of every table it reads, so that it changes
+    when the query or any of its sources does.
+    """
+    parts = [sql] + [
+        f"{table}: {warehouse.table_fingerprint(table)}"
+        for table in table_references(sql)
+    ]
+    return hashlib.md5("\n".join(parts).encode()).hexdigest()
+
+
+def materialise_unless_unchanged(
+    warehouse: Warehouse,
+    sql: str,
+    destination_table: str,
+    build: Callable[[], QueryResult],
+    refresh: bool = False,
+) -> QueryResult:
+    """
+    Builds `destination_table` with `build`, unless it was last built from the
+    same `sql` and unchanged source tables, which is logged as a cache hit.
+    `refresh` builds it regardless.
+    """
+    fingerprint = model_fingerprint(warehouse, sql)
+    if (
+        not refresh
+        and warehouse.table_exists(destination_table)
+        and _read_state(
+            warehouse, destination_table, FINGERPRINT_TABLE_NAME, "fingerprint"
+        )
+        == fingerprint
+    ):
+        print(f"Model {destination_table}: cache hit, sources unchanged")
+        return QueryResult(elapsed_seconds=0.0, affected_rows=0, bytes_processed=0)
+    result = build()
+    _record_state(
+        warehouse, destination_table, FINGERPRINT_TABLE_NAME, "fingerprint", fingerprint
+    )
+    return result
+
+
+def _matches_keys(column: str, keys: str) -> str:
+    """
+    Builds a condition that `column` is one of the `column` values of the relation
+    `keys`, with a null value matching a null key.
+    """
+    return (
+        f"({column} in (select {column} from {keys} where {column} is not null) "
+        f"or ({column} is null and exists "
+        f"(select 1 from {keys} where {column} is null)))"
+    )
+
+
+def build_replace_keys_sql(
+    target: str, source: str, keys_table: str, change_key: str, columns: List[str]
+) -> List[str]:
+    """
+    Builds the statements that replace the rows of `target` whose `change_key` is
+    in `keys_table` with the rows of `source`: a DELETE of every row of those keys,
+    null included, followed by an INSERT. Rows of a key that no longer appear in
+    `source`, or whose other key columns changed, are therefore removed.
+    """
+    insert_columns = ", ".join(columns)
+    return [
+        f"delete from {target} where {_matches_keys(change_key, keys_table)}",
+        f"insert into {target} ({insert_columns}) "
+        f"select {insert_columns} from {source}",
+    ]
+
+
+def _sum_bytes(results: List[QueryResult]) -> Optional[int]:
+    if any(result.bytes_processed is None for result in results):
+        return None
+    return sum(result.bytes_processed for result in results)
+
+
+def materialise_incremental(
+    warehouse: Warehouse,
+    sql: str,
+    destination_table: str,
+    change_key: str = "course_reference_number",
+    full_refresh: bool = False,
+) -> QueryResult:
+    """
+    Updates `destination_table` with the rows of `sql` whose sources changed.
+
+    The high-water mark of a model is the latest `_accessed_at` of the tables
+    `sql` reads, recorded after each run. The next run recomputes only the
+    `change_key` values with source rows accessed since then, and those of rows
+    in `destination_table` that no longer appear in any source: every table `sql`
+    reads is filtered to those values, and the rows of `destination_table` with
+    them are replaced by the result. Null is a value like any other, so the
+    result matches a full rebuild as long as every row of the model derives
+    from source rows with the same `change_key`, which `sql` must output. The
+    first run, and any with `full_refresh`, rebuild the whole table with
+    `materialise_model`.
+    """
+    sources = table_references(sql)
+    mark = high_water_mark(warehouse, sources)
+    previous_mark = None
+    if not full_refresh and warehouse.table_exists(destination_table):
+        previous_mark = previous_high_water_mark(warehouse, destination_table)
+
+    if previous_mark is None:
+        result = materialise_model(warehouse, sql, destination_table)
+    elif mark is None or mark <= previous_mark:
+        print(f"Model {destination_table}: no source rows since {previous_mark}")
+        return QueryResult(elapsed_seconds=0.0, affected_rows=0, bytes_processed=0)
+    else:
+        result = _merge_changed_rows(
+            warehouse,
+            sql,
+            destination_table,
+            sources,
+            previous_mark,
+            change_key,
+        )
+
+    if mark is not None:
+        record_high_water_mark(warehouse, destination_table, mark)
+    return result
+
+
+def _merge_changed_rows(
+    warehouse: Warehouse,
+    sql: str,
+    destination_table: str,
+    sources: List[str],
+    previous_mark: pd.Timestamp,
+    change_key: str,
+) -> QueryResult:
+    start_time = time.monotonic()
+    keys_table = f"{destination_table}__changed_keys"
+    rows_table = f"{destination_table}__changed_rows"
+    since = f'cast("{previous_mark.isoformat()}" as timestamp)'
+    changed = " union all ".join(
+        f"select {change_key} from {warehouse.quote(table)} "
+        f"where {ACCESSED_AT_COLUMN} > {since}"
+        for table in sources
+    )
+    current = " union all ".join(
+        f"select {change_key} from {warehouse.quote(table)}" for table in sources
+    )
+    # Rows of the model whose key has disappeared from every source
+    vanished = (
+        f"select {change_key} from {warehouse.quote(destination_table)} "
+        f"where not {_matches_keys(change_key, f'({current})')}"
+    )
+    changed_sql = replace_table_references(
+        sql,
+        lambda table: f"(select * from {warehouse.quote(table)} where "
+        f"{_matches_keys(change_key, warehouse.quote(keys_table))})",
+    )
+    try:
+        results = [
+            warehouse.materialise(
+                f"select distinct {change_key} from ({changed} union all {vanished})",
+                keys_table,
+            ),
+            warehouse.materialise(changed_sql, rows_table),
+        ]
+        # A failed insert leaves the high-water mark unrecorded, so the next run
+        # replaces the same keys again
+        results += [
+            warehouse.execute(statement)
+            for statement in build_replace_keys_sql(
+                warehouse.quote(destination_table),
+                warehouse.quote(rows_table),
+                warehouse.quote(keys_table),
+                change_key,
+                warehouse.columns(rows_table),
+            )
+        ]
+    finally:
+        warehouse.drop_table(keys_table)
+        warehouse.drop_table(rows_table)
+
+    deleted, inserted = results[-2].affected_rows, results[-1].affected_rows
+    result = QueryResult(
+        elapsed_seconds=time.monotonic() - start_time,
+        affected_rows=inserted,
+        bytes_processed=_sum_bytes(results),
+    )
+    print(
+        f"Model {destination_table}: {deleted} rows replaced by {inserted} for "
+        f"{change_key} values changed since {previous_mark}, "
+        f"{format_bytes(result.bytes_processed)} processed "
+        f"in {result.elapsed_seconds:.1f}s"
+    )
+    return result
+
+
+def compare_with_full_refresh(
+    warehouse: Warehouse, sql: str, destination_table: str, unique_key: List[str]
+) -> pd.DataFrame:
+    """
+    Rebuilds `sql` into a scratch table and compares it with `destination_table`,
+    to check that incremental runs agree with a full refresh.
+
+    Returns the `unique_key` of every row whose number of copies differs between
+    the two tables, with both counts; an empty result means they agree.
+    """
+    scratch_table = f"{destination_table}__full_refresh"
+    keys = ", ".join(unique_key)
+    either_keys = ", ".join(
+        f"coalesce(incremental.{key}, full_refresh.{key}) as {key}"
+        for key in unique_key
+    )
+
+    def row_copies(table: str) -> str:
+        return (
+            f"select {keys}, to_json_string(model) as model_row, "
+            f"count(*) as copies from {warehouse.quote(table)} as model "
+            "group by all"
+        )
+
+    try:
+        warehouse.materialise(sql, scratch_table)
+        differences = warehouse.read_sql(
+            f"""
+            with
+                incremental as ({row_copies(destination_table)}),
+                full_refresh as ({row_copies(scratch_table)})
+            select
+                {either_keys},
+                coalesce(incremental.copies, 0) as incremental_copies,
+                coalesce(full_refresh.copies, 0) as full_refresh_copies
+            from incremental
+            full join full_refresh on incremental.model_row = full_refresh.model_row
+            where coalesce(incremental.copies, 0) != coalesce(full_refresh.copies, 0)
+            """
+        )
+    finally:
+        warehouse.drop_table(scratch_table)
+    print(
+        f"Model {destination_table}: {len(differences)} rows differ from a full "
+        "refresh"
+    )
+    return differences
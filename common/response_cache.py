@@ -0,0 +1,151 @@
+"""
+Content-addressed on-disk cache of raw API responses.
+
+Every successful response body is stored gzip-compressed under its SHA-256, so
+identical bodies seen on different days are kept once. A SQLite index maps each
+request (URL plus sorted query parameters) to the bodies fetched for it over time.
+In replay mode the HTTP client serves requests from the latest cached body instead
+of the network, which lets parsing and loading be re-run without re-crawling.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+import requests
+
+DEFAULT_CACHE_DIR = ".response_cache"
+
+
+def request_key(url: str, params: Optional[dict]) -> str:
+    canonical = json.dumps({"url": url, "params": params or {}}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, replay: bool = False):
+        self.directory = directory
+        self.replay = replay
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self._connection.execute("pragma journal_mode=wal")
+        self._connection.execute(
+            """create table if not exists responses (
+                request_key text not null,
+                url text not null,
+                params text not null,
+                content_hash text not null,
+                fetched_at text not null
+            )"""
+        )
+        self._connection.execute(
+            "create index if not exists responses_by_key "
+            "on responses (request_key, fetched_at)"
+        )
+        self._connection.commit()
+
+    def _object_path(self, content_hash: str) -> str:
+        return os.path.join(
+            self.directory, "objects", content_hash[:2], f"{content_hash}.json.gz"
+        )
+
+    def store(self, url: str, params: Optional[dict], body: bytes) -> str:
+        """Stores a response body and indexes it under its request; returns its hash."""
+        content_hash = hashlib.sha256(body).hexdigest()
+        path = self._object_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(temporary_path, "wb") as f:
+                f.write(body)
+            os.replace(temporary_path, path)
+        self._index(url, params, content_hash)
+        return content_hash
+
+    def store_chunks(
+        self, url: str, params: Optional[dict], chunks: Iterable[bytes]
+    ) -> Iterator[bytes]:
+        """
+        Passes `chunks` through while writing them to the cache, indexing the body
+        only once every chunk has been read. A partly read body is discarded.
+        """
+        temporary_path = os.path.join(
+            self.directory, "objects", f"{uuid.uuid4().hex}.tmp"
+        )
+        digest = hashlib.sha256()
+        try:
+            with gzip.open(temporary_path, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    yield chunk
+            content_hash = digest.hexdigest()
+            path = self._object_path(content_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temporary_path, path)
+            self._index(url, params, content_hash)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _index(self, url: str, params: Optional[dict], content_hash: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "insert into responses values (?, ?, ?, ?, ?)",
+                (
+                    request_key(url, params),
+                    url,
+                    json.dumps(params or {}, sort_keys=True),
+                    content_hash,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+            self._connection.commit()
+
+    def _latest_object_path(self, url: str, params: Optional[dict]) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "select content_hash from responses where request_key = ? "
+                "order by fetched_at desc limit 1",
+                (request_key(url, params),),
+            ).fetchone()
+        return None if row is None else self._object_path(row[0])
+
+    def load(self, url: str, params: Optional[dict]) -> Optional[bytes]:
+        """Returns the most recently cached body for a request, if any."""
+        path = self._latest_object_path(url, params)
+        if path is None:
+            return None
+        with gzip.open(path, "rb") as f:
+            return f.read()
+
+    def replay_response(self, url: str, params: Optional[dict]) -> requests.Response:
+        """
+        Builds a response from the cache; a cache miss is returned as a 404. The
+        body is read from disk on demand, so it can also be streamed.
+        """
+        path = self._latest_object_path(url, params)
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200 if path is not None else 404
+        response.raw = gzip.open(path, "rb") if path is not None else io.BytesIO()
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+    def cached_params(self, url: str) -> List[dict]:
+        """Returns the distinct query parameters cached for a URL."""
+        with self._lock:
+            rows = self._connection.execute(
+                "select distinct params from responses where url = ?", (url,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
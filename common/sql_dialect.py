@@ -0,0 +1,191 @@
+"""
+Translation of the BigQuery SQL used by the pipeline into DuckDB SQL.
+
+The warehouse code and the modelling scripts are written in BigQuery SQL, and the
+local backend runs the same statements on DuckDB. DuckDB already accepts
+`qualify`, `group by all`, `max_by`, `if()`, trailing commas in select lists and
+`array_agg(distinct ... order by ...)`; `to_duckdb` rewrites the rest:
+
+- backticked `project.dataset.table` names become `"dataset"."table"`;
+- double-quoted strings become single-quoted ones;
+- `safe_cast` becomes `try_cast`, and BigQuery type names become DuckDB's, with
+  `timestamp` as `timestamptz` and `datetime` as `timestamp`;
+- `to_json_string` becomes `to_json`;
+- `date_diff(end, start, part)` becomes `date_diff('part', start, end)`;
+- `struct(a, b)` becomes `struct_pack(a := a, b := b)`;
+- `md5(x)` returns bytes, as it does in BigQuery.
+"""
+
+import re
+from typing import Callable, List, Optional, Tuple
+
+# BigQuery string literals, quoted identifiers and comments, in source order
+_BIGQUERY_TOKEN = re.compile(
+    r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`|--[^\n]*|#[^\n]*|/\*.*?\*/""",
+    re.DOTALL,
+)
+# DuckDB string literals and quoted identifiers
+_DUCKDB_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+
+_TYPES = {
+    "int64": "bigint",
+    "int": "bigint",
+    "integer": "bigint",
+    "float64": "double",
+    "string": "varchar",
+    "bytes": "blob",
+    "bool": "boolean",
+    "numeric": "decimal(38, 9)",
+    "timestamp": "timestamptz",
+    "datetime": "timestamp",
+}
+_CAST_TYPE = re.compile(r"\bas\s+(" + "|".join(_TYPES) + r")\b", re.IGNORECASE)
+_SAFE_CAST = re.compile(r"\bsafe_cast\s*\(", re.IGNORECASE)
+_TO_JSON_STRING = re.compile(r"\bto_json_string\s*\(", re.IGNORECASE)
+_CALL = re.compile(r"\b(md5|struct|date_diff)\s*\(", re.IGNORECASE)
+_ALIAS = re.compile(r"^(.*\S)\s+as\s+(\w+)$", re.IGNORECASE | re.DOTALL)
+_COLUMN = re.compile(r"^(?:\w+\.)*([A-Za-z_]\w*)$")
+
+_TABLE_NAME = re.compile(r"`([\w-]+(?:\.[\w-]+){1,2})`")
+_STATEMENT_TARGET = re.compile(
+    r"^\s*(?:create\s+(?:or\s+replace\s+)?table(?:\s+if\s+not\s+exists)?"
+    r"|merge\s+into|insert\s+into|delete\s+from|update|truncate\s+table"
+    r"|drop\s+table(?:\s+if\s+exists)?)\s+`([^`]+)`",
+    re.IGNORECASE,
+)
+# Statements that replace or drop their target without reading it
+_REPLACES_TARGET = re.compile(
+    r"^\s*(?:create\s+or\s+replace\s+table|drop\s+table)\b", re.IGNORECASE
+)
+
+
+def table_references(sql: str) -> List[str]:
+    """Returns the backticked `dataset.table` names in BigQuery `sql`."""
+    return sorted({name for name in _TABLE_NAME.findall(sql)})
+
+
+def replace_table_references(sql: str, replacement: Callable[[str], str]) -> str:
+    """Replaces every backticked table name in BigQuery `sql` with its replacement."""
+    return _TABLE_NAME.sub(lambda match: replacement(match.group(1)), sql)
+
+
+def statement_target(sql: str) -> Optional[str]:
+    """Returns the table a BigQuery statement creates, changes or drops."""
+    match = _STATEMENT_TARGET.match(sql)
+    return match.group(1) if match else None
+
+
+def replaces_target(sql: str) -> bool:
+    """Whether a BigQuery statement overwrites its target without reading it."""
+    return bool(_REPLACES_TARGET.match(sql))
+
+
+def _string_literal(token: str) -> str:
+    """Re-quotes a BigQuery string literal for DuckDB."""
+    value = re.sub(r"\\([\\'\"])", r"\1", token[1:-1])
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def _identifier(token: str) -> str:
+    # A leading project, as in `project.dataset.table`, is ignored locally
+    return ".".join(f'"{part}"' for part in token[1:-1].split(".")[-2:])
+
+
+def _translate_code(code: str) -> str:
+    code = _SAFE_CAST.sub("try_cast(", code)
+    code = _TO_JSON_STRING.sub("to_json(", code)
+    return _CAST_TYPE.sub(lambda match: f"as {_TYPES[match.group(1).lower()]}", code)
+
+
+def _split_call(sql: str, start: int) -> Tuple[List[str], int]:
+    """
+    Splits the arguments of the call whose opening parenthesis precedes `start`.
+
+    Returns the arguments and the index just past the closing parenthesis.
+    """
+    arguments = []
+    depth = 0
+    argument_start = position = start
+    while position < len(sql):
+        quoted = _DUCKDB_QUOTED.match(sql, position)
+        if quoted:
+            position = quoted.end()
+            continue
+        character = sql[position]
+        if character == "(":
+            depth += 1
+        elif character == ")" and depth:
+            depth -= 1
+        elif character == ")":
+            arguments.append(sql[argument_start:position].strip())
+            return [argument for argument in arguments if argument], position + 1
+        elif character == "," and not depth:
+            arguments.append(sql[argument_start:position].strip())
+            argument_start = position + 1
+        position += 1
+    raise ValueError("Unbalanced parentheses in SQL")
+
+
+def _struct_fields(arguments: List[str]) -> Optional[List[str]]:
+    """Names each `struct` field as BigQuery does, or None if one has no name."""
+    fields = []
+    for argument in arguments:
+        alias = _ALIAS.match(argument)
+        column = _COLUMN.match(argument)
+        if alias:
+            fields.append(f"{alias.group(2)} := {alias.group(1)}")
+        elif column:
+            fields.append(f"{column.group(1)} := {argument}")
+        else:
+            return None
+    return fields
+
+
+def _rewrite_call(name: str, arguments: List[str]) -> str:
+    if name == "md5":
+        return f"unhex(md5({', '.join(arguments)}))"
+    if name == "struct":
+        fields = _struct_fields(arguments)
+        if fields is None:
+            return f"row({', '.join(arguments)})"
+        return f"struct_pack({', '.join(fields)})"
+    end, start, part = arguments
+    return f"date_diff('{part.lower()}', {start}, {end})"
+
+
+def _rewrite_calls(sql: str) -> str:
+    quoted_spans = [match.span() for match in _DUCKDB_QUOTED.finditer(sql)]
+    pieces = []
+    position = 0
+    for match in _CALL.finditer(sql):
+        if match.start() < position or any(
+            start <= match.start() < end for start, end in quoted_spans
+        ):
+            continue
+        arguments, end = _split_call(sql, match.end())
+        pieces.append(sql[position : match.start()])
+        pieces.append(
+            _rewrite_call(
+                match.group(1).lower(),
+                [_rewrite_calls(argument) for argument in arguments],
+            )
+        )
+        position = end
+    pieces.append(sql[position:])
+    return "".join(pieces)
+
+
+def to_duckdb(sql: str) -> str:
+    """Translates a BigQuery statement into DuckDB SQL."""
+    pieces = []
+    position = 0
+    for match in _BIGQUERY_TOKEN.finditer(sql):
+        pieces.append(_translate_code(sql[position : match.start()]))
+        token = match.group()
+        if token[0] in "'\"":
+            pieces.append(_string_literal(token))
+        elif token[0] == "`":
+            pieces.append(_identifier(token))
+        position = match.end()
+    pieces.append(_translate_code(sql[position:]))
+    return _rewrite_calls("".join(pieces))
@@ -0,0 +1,718 @@
+"""
+Warehouse access for the extractors and the modelling scripts.
+
+`upsert` loads a run's rows into a staging table and MERGEs them into the target
+on its primary key inside the warehouse, keeping the row with the latest
+`_accessed_at` per key. Nothing is read back into Python, so the cost of a run no
+longer depends on the size of the target table.
+
+Tables created by a merge are partitioned by the day of `_accessed_at`, which is
+stored as a UTC TIMESTAMP, and clustered by the columns given, so that queries for
+the latest snapshot of some courses do not scan their whole history. Tables from
+before this layout are rebuilt into it by `migrate_table`.
+
+`materialise` rebuilds a model table from its SQL with `create or replace table`,
+so model results never pass through the client either.
+
+DataFrames are loaded as Parquet with an explicit Arrow schema, built from the row
+dataclasses and the target table's existing schema (see `common.arrow_schema`).
+
+Statements are written in BigQuery SQL whatever the backend. `BigQueryWarehouse`
+is used by the pipeline; `DuckDBWarehouse` translates the same SQL for an embedded
+DuckDB database (see `common.sql_dialect`), and `ParquetWarehouse` keeps its tables
+as local Parquet files, so the whole pipeline can run offline. `get_warehouse`
+returns the backend chosen with `configure_warehouse` or the
+`SKILLSFUTURE_WAREHOUSE` environment variable.
+"""
+
+import io
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from common.arrow_schema import (
+    bigquery_schema,
+    merge_schemas,
+    to_arrow_table,
+    to_parquet_bytes,
+)
+from common.sql_dialect import (
+    replaces_target,
+    statement_target,
+    table_references,
+    to_duckdb,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are then only serialised within a process
+    fcntl = None
+
+ACCESSED_AT_COLUMN = "_accessed_at"
+ACCESSED_AT_TYPE = pa.timestamp("us", tz="UTC")
+WAREHOUSE_ENV = "SKILLSFUTURE_WAREHOUSE"
+WAREHOUSE_DIR_ENV = "SKILLSFUTURE_WAREHOUSE_DIR"
+WAREHOUSE_BACKENDS = ("bigquery", "local")
+DEFAULT_WAREHOUSE_DIR = ".warehouse"
+
+# BigQuery names of the DuckDB types the warehouse stores
+DUCKDB_TYPE_NAMES = {
+    "VARCHAR": "STRING",
+    "BIGINT": "INT64",
+    "INTEGER": "INT64",
+    "DOUBLE": "FLOAT64",
+    "BOOLEAN": "BOOL",
+    "TIMESTAMP WITH TIME ZONE": "TIMESTAMP",
+    "TIMESTAMP": "DATETIME",
+    "DATE": "DATE",
+    "BLOB": "BYTES",
+}
+
+
+@dataclass
+class QueryResult:
+    elapsed_seconds: float
+    affected_rows: Optional[int] = None
+    bytes_processed: Optional[int] = None
+
+
+def build_latest_rows_sql(source: str, keys: List[str]) -> str:
+    """Selects the most recently accessed row per key from `source`."""
+    return f"""
+        select * from {source}
+        where true
+        qualify row_number() over (
+            partition by {", ".join(keys)} order by {ACCESSED_AT_COLUMN} desc
+        ) = 1
+    """
+
+
+def build_merge_sql(
+    target: str, staging: str, keys: List[str], columns: List[str]
+) -> str:
+    """
+    Builds a MERGE of `staging` into `target` on `keys`.
+
+    Staging rows are first reduced to the latest row per key. Matched target rows
+    are only overwritten by rows that are at least as recent, and keys are compared
+    with `is not distinct from` so that rows with null key columns still match.
+    """
+    on_clause = " and ".join(
+        f"target.{key} is not distinct from source.{key}" for key in keys
+    )
+    update_clause = ", ".join(f"{column} = source.{column}" for column in columns)
+    insert_columns = ", ".join(columns)
+    insert_values = ", ".join(f"source.{column}" for column in columns)
+    return f"""
+        merge into {target} as target
+        using ({build_latest_rows_sql(staging, keys)}) as source
+        on {on_clause}
+        when matched
+            and source.{ACCESSED_AT_COLUMN} >= target.{ACCESSED_AT_COLUMN}
+            then update set {update_clause}
+        when not matched
+            then insert ({insert_columns}) values ({insert_values})
+    """
+
+
+def local_utc_offset() -> str:
+    """Returns this machine's UTC offset, such as "+08:00"."""
+    offset = datetime.now().astimezone().strftime("%z")
+    return f"{offset[:3]}:{offset[3:]}"
+
+
+class Warehouse:
+    """Operations shared by the warehouse backends."""
+
+    def __init__(self):
+        # Targets whose `_accessed_at` type has already been checked
+        self._checked_tables: Set[str] = set()
+
+    def quote(self, table: str) -> str:
+        """Quotes `table` for use in the BigQuery SQL passed to `execute`."""
+        raise NotImplementedError
+
+    def table_exists(self, table: str) -> bool:
+        raise NotImplementedError
+
+    def load_dataframe(
+        self,
+        dataframe: pd.DataFrame,
+        table: str,
+        if_exists: str = "append",
+        schema_like: Optional[str] = None,
+        schema: Optional[pa.Schema] = None,
+    ) -> None:
+        """
+        Loads `dataframe` into `table`. Column types come from `schema`, overridden
+        by the existing schema of the `schema_like` table; other columns keep the
+        types Arrow infers.
+        """
+        raise NotImplementedError
+
+    def execute(self, sql: str) -> QueryResult:
+        """Runs a statement inside the warehouse and returns its job statistics."""
+        raise NotImplementedError
+
+    def read_sql(self, sql: str) -> pd.DataFrame:
+        """Runs a query and returns its result."""
+        raise NotImplementedError
+
+    def dry_run(self, sql: str) -> Optional[int]:
+        """Returns the bytes `sql` would scan, or None if the backend cannot tell."""
+        return None
+
+    def table_fingerprint(self, table: str) -> Optional[str]:
+        """
+        Returns a string that changes whenever `table` does, or None if it does not
+        exist. Backends without modification times fall back to the row count.
+        """
+        if not self.table_exists(table):
+            return None
+        rows = self.read_sql(f"select count(*) as row_count from {self.quote(table)}")
+        return f"rows={rows['row_count'][0]}"
+
+    def read_table(self, table: str) -> pd.DataFrame:
+        return self.read_sql(f"select * from {self.quote(table)}")
+
+    def materialise(self, sql: str, table: str) -> QueryResult:
+        """Replaces `table` with the result of `sql` without leaving the warehouse."""
+        return self.execute(f"create or replace table {self.quote(table)} as {sql}")
+
+    def drop_table(self, table: str) -> None:
+        raise NotImplementedError
+
+    def columns(self, table: str) -> List[str]:
+        raise NotImplementedError
+
+    def column_types(self, table: str) -> Dict[str, str]:
+        """Returns the BigQuery type name of each column, such as "STRING"."""
+        raise NotImplementedError
+
+    def table_options(self, cluster_by: Sequence[str] = ()) -> str:
+        """
+        Returns the `create table` options that partition a table by the day of
+        `_accessed_at` and cluster it by `cluster_by`.
+        """
+        return ""
+
+    def has_layout(self, table: str, cluster_by: Sequence[str] = ()) -> bool:
+        """Whether `table` is partitioned and clustered as `table_options` sets."""
+        return True
+
+    def _check_accessed_at(self, table: str) -> None:
+        """Refuses to merge TIMESTAMP rows into a table that stores strings."""
+        if table in self._checked_tables:
+            return
+        if self.column_types(table).get(ACCESSED_AT_COLUMN) == "STRING":
+            raise ValueError(
+                f"Table {table} stores {ACCESSED_AT_COLUMN} as a string; rebuild it "
+                "with the extractor's --migrate-tables option first"
+            )
+        self._checked_tables.add(table)
+
+    def migrate_table(
+        self,
+        table: str,
+        cluster_by: Sequence[str] = (),
+        legacy_utc_offset: Optional[str] = None,
+    ) -> bool:
+        """
+        Rebuilds `table` partitioned, clustered and with a TIMESTAMP `_accessed_at`,
+        unless it is already. String `_accessed_at` values were written as local
+        wall-clock time, and are read at `legacy_utc_offset` (this machine's offset
+        by default).
+
+        The rows are copied to a rebuilt table, the original is dropped and then
+        recreated from the copy, since BigQuery cannot change the partitioning of a
+        table in place.
+
+        Returns:
+            Whether the table was rebuilt.
+        """
+        if not self.table_exists(table):
+            return False
+        is_string = self.column_types(table).get(ACCESSED_AT_COLUMN) == "STRING"
+        if not is_string and self.has_layout(table, cluster_by):
+            return False
+
+        accessed_at = ACCESSED_AT_COLUMN
+        if is_string:
+            offset = legacy_utc_offset or local_utc_offset()
+            accessed_at = f'cast(concat({ACCESSED_AT_COLUMN}, "{offset}") as timestamp)'
+        dataset, name = table.split(".")[-2:]
+        rebuilt = f"{dataset}._rebuild_{name}"
+        options = self.table_options(cluster_by)
+        self.execute(
+            f"create or replace table {self.quote(rebuilt)} {options} as "
+            f"select * replace ({accessed_at} as {ACCESSED_AT_COLUMN}) "
+            f"from {self.quote(table)}"
+        )
+        self.drop_table(table)
+        self.execute(
+            f"create table {self.quote(table)} {options} as "
+            f"select * from {self.quote(rebuilt)}"
+        )
+        self.drop_table(rebuilt)
+        self._checked_tables.discard(table)
+        return True
+
+    def merge_tables(
+        self,
+        sources: List[str],
+        table: str,
+        keys: List[str],
+        columns: Optional[List[str]] = None,
+        cluster_by: Sequence[str] = (),
+    ) -> int:
+        """
+        Merges the rows of `sources` into `table` on `keys`, keeping the latest row
+        per key across all of them. Creates `table` if it does not exist yet,
+        partitioned by day and clustered by `cluster_by`.
+
+        Returns:
+            The number of target rows inserted or updated, if reported.
+        """
+        columns = columns or self.columns(sources[0])
+        if len(sources) == 1:
+            source = self.quote(sources[0])
+        else:
+            column_list = ", ".join(columns)
+            source = "({})".format(
+                " union all ".join(
+                    f"select {column_list} from {self.quote(name)}" for name in sources
+                )
+            )
+
+        if self.table_exists(table):
+            self._check_accessed_at(table)
+            sql = build_merge_sql(self.quote(table), source, keys, columns)
+        else:
+            sql = (
+                f"create table {self.quote(table)} {self.table_options(cluster_by)} as "
+                + build_latest_rows_sql(source, keys)
+            )
+        return self.execute(sql).affected_rows or 0
+
+    def upsert(
+        self,
+        dataframe: pd.DataFrame,
+        table: str,
+        keys: List[str],
+        schema: Optional[pa.Schema] = None,
+        cluster_by: Sequence[str] = (),
+    ) -> int:
+        """
+        Merges `dataframe` into `table` on `keys`, keeping the latest row per key.
+
+        Creates the table from the deduplicated rows if it does not exist yet,
+        partitioned by the day of `_accessed_at` and clustered by `cluster_by`.
+        `_accessed_at` is loaded as a UTC TIMESTAMP.
+
+        Returns:
+            The number of target rows inserted or updated, if reported.
+        """
+        if dataframe.empty:
+            return 0
+
+        dataset, name = table.split(".")[-2:]
+        staging = f"{dataset}._staging_{name}_{uuid.uuid4().hex[:8]}"
+        target_exists = self.table_exists(table)
+        if target_exists:
+            self._check_accessed_at(table)
+        schema = pa.schema(
+            [field for field in schema or [] if field.name != ACCESSED_AT_COLUMN]
+            + [pa.field(ACCESSED_AT_COLUMN, ACCESSED_AT_TYPE)]
+        )
+        self.load_dataframe(
+            dataframe,
+            staging,
+            if_exists="replace",
+            schema_like=table if target_exists else None,
+            schema=schema,
+        )
+        try:
+            return self.merge_tables(
+                [staging], table, keys, list(dataframe), cluster_by=cluster_by
+            )
+        finally:
+            self.drop_table(staging)
+
+
+class BigQueryWarehouse(Warehouse):
+    def __init__(self, project_id: str):
+        from google.cloud import bigquery
+
+        super().__init__()
+        self.project_id = project_id
+        self.client = bigquery.Client(project=project_id)
+
+    def _table_id(self, table: str) -> str:
+        return table if table.count(".") == 2 else f"{self.project_id}.{table}"
+
+    def quote(self, table: str) -> str:
+        return f"`{self._table_id(table)}`"
+
+    def table_exists(self, table: str) -> bool:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self.client.get_table(self._table_id(table))
+            return True
+        except NotFound:
+            return False
+
+    def load_dataframe(
+        self, dataframe, table, if_exists="append", schema_like=None, schema=None
+    ):
+        from google.cloud import bigquery
+
+        target_schema = None
+        if schema_like:
+            # Load staging columns with the target's types rather than inferring them
+            target_schema = bigquery_schema(
+                self.client.get_table(self._table_id(schema_like)).schema
+            )
+        arrow_table = to_arrow_table(dataframe, merge_schemas(schema, target_schema))
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition={
+                "append": bigquery.WriteDisposition.WRITE_APPEND,
+                "replace": bigquery.WriteDisposition.WRITE_TRUNCATE,
+                "fail": bigquery.WriteDisposition.WRITE_EMPTY,
+            }[if_exists],
+        )
+        job = self.client.load_table_from_file(
+            io.BytesIO(to_parquet_bytes(arrow_table)),
+            self._table_id(table),
+            job_config=job_config,
+        )
+        job.result()
+
+    def execute(self, sql):
+        start_time = time.monotonic()
+        job = self.client.query(sql)
+        job.result()
+        return QueryResult(
+            elapsed_seconds=time.monotonic() - start_time,
+            affected_rows=job.num_dml_affected_rows,
+            bytes_processed=job.total_bytes_processed,
+        )
+
+    def read_sql(self, sql):
+        return self.client.query(sql).to_dataframe()
+
+    def table_fingerprint(self, table):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            bigquery_table = self.client.get_table(self._table_id(table))
+        except NotFound:
+            return None
+        return (
+            f"modified={bigquery_table.modified.isoformat()} "
+            f"rows={bigquery_table.num_rows}"
+        )
+
+    def dry_run(self, sql):
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        return self.client.query(sql, job_config=job_config).total_bytes_processed
+
+    def drop_table(self, table):
+        self.client.delete_table(self._table_id(table), not_found_ok=True)
+
+    def columns(self, table):
+        schema = self.client.get_table(self._table_id(table)).schema
+        return [field.name for field in schema]
+
+    def column_types(self, table):
+        schema = self.client.get_table(self._table_id(table)).schema
+        return {field.name: field.field_type for field in schema}
+
+    def table_options(self, cluster_by=()):
+        options = f"partition by date({ACCESSED_AT_COLUMN})"
+        if cluster_by:
+            options += f" cluster by {', '.join(cluster_by)}"
+        return options
+
+    def has_layout(self, table, cluster_by=()):
+        bigquery_table = self.client.get_table(self._table_id(table))
+        partitioning = bigquery_table.time_partitioning
+        return (
+            partitioning is not None
+            and partitioning.field == ACCESSED_AT_COLUMN
+            and list(bigquery_table.clustering_fields or []) == list(cluster_by)
+        )
+
+
+class DuckDBWarehouse(Warehouse):
+    """
+    Embedded DuckDB stand-in for BigQuery; `dataset.table` maps to a schema.
+
+    BigQuery SQL passed to `execute` and `read_sql` is translated to DuckDB's
+    dialect first. Partitioning and clustering are BigQuery storage options and
+    have no local equivalent, so tables are created without them.
+    """
+
+    def __init__(self, database: str = ":memory:"):
+        import duckdb
+
+        super().__init__()
+        self.connection = duckdb.connect(database)
+        self._lock = threading.Lock()
+
+    def quote(self, table: str) -> str:
+        # A leading project, as in `project.dataset.table`, is ignored locally
+        return "`{}`".format(".".join(table.split(".")[-2:]))
+
+    @staticmethod
+    def _identifier(table: str) -> str:
+        """Quotes `table` for DuckDB SQL."""
+        return ".".join(f'"{part}"' for part in table.split(".")[-2:])
+
+    @contextmanager
+    def _session(self, tables: Iterable[str] = (), target: Optional[str] = None):
+        """
+        Yields a connection on which `tables` can be read and `target` changed,
+        holding the lock until the statement is done.
+        """
+        tables = [*tables, target] if target else list(tables)
+        with self._lock:
+            for dataset in {table.split(".")[-2] for table in tables if "." in table}:
+                self.connection.execute(f'create schema if not exists "{dataset}"')
+            yield self.connection
+
+    def table_exists(self, table: str) -> bool:
+        schema, name = table.split(".")[-2:]
+        with self._session() as connection:
+            return bool(
+                connection.execute(
+                    "select count(*) from information_schema.tables "
+                    "where table_schema = ? and table_name = ?",
+                    [schema, name],
+                ).fetchone()[0]
+            )
+
+    def load_dataframe(
+        self, dataframe, table, if_exists="append", schema_like=None, schema=None
+    ):
+        target_schema = None
+        if schema_like:
+            with self._session([schema_like]) as connection:
+                target_schema = connection.execute(
+                    f"select * from {self._identifier(schema_like)} limit 0"
+                ).arrow().schema
+        arrow_table = to_arrow_table(dataframe, merge_schemas(schema, target_schema))
+        exists = self.table_exists(table)
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table {table} already exists")
+        with self._session(target=table) as connection:
+            connection.register("_load_frame", arrow_table)
+            try:
+                if exists and if_exists == "append":
+                    connection.execute(
+                        f"insert into {self._identifier(table)} by name "
+                        "select * from _load_frame"
+                    )
+                else:
+                    connection.execute(
+                        f"create or replace table {self._identifier(table)} as "
+                        "select * from _load_frame"
+                    )
+            finally:
+                connection.unregister("_load_frame")
+
+    def execute(self, sql):
+        start_time = time.monotonic()
+        bytes_processed = self.dry_run(sql)
+        with self._session(table_references(sql), statement_target(sql)) as connection:
+            result = connection.execute(to_duckdb(sql)).fetchone()
+        return QueryResult(
+            elapsed_seconds=time.monotonic() - start_time,
+            affected_rows=result[0] if result else None,
+            bytes_processed=bytes_processed,
+        )
+
+    def read_sql(self, sql):
+        with self._session(table_references(sql)) as connection:
+            return connection.execute(to_duckdb(sql)).df()
+
+    def drop_table(self, table):
+        with self._session(target=table) as connection:
+            connection.execute(f"drop table if exists {self._identifier(table)}")
+
+    def columns(self, table):
+        with self._session([table]) as connection:
+            return [
+                row[0]
+                for row in connection.execute(
+                    f"describe {self._identifier(table)}"
+                ).fetchall()
+            ]
+
+    def column_types(self, table):
+        with self._session([table]) as connection:
+            return {
+                name: DUCKDB_TYPE_NAMES.get(column_type, column_type)
+                for name, column_type, *_ in connection.execute(
+                    f"describe {self._identifier(table)}"
+                ).fetchall()
+            }
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Holds an exclusive lock on `path` against other processes."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class ParquetWarehouse(DuckDBWarehouse):
+    """
+    Local warehouse of Parquet files, queried with DuckDB.
+
+    Each table is a file at `directory/dataset/table.parquet`. Every statement runs
+    on a fresh in-memory connection that reads the tables it names from their files
+    and writes the table it changes back, so the files are always the state of the
+    warehouse. A lock file serialises statements across threads and processes, such
+    as the work-queue workers.
+    """
+
+    def __init__(self, directory: str = DEFAULT_WAREHOUSE_DIR):
+        Warehouse.__init__(self)
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, table: str) -> str:
+        dataset, name = table.split(".")[-2:]
+        return os.path.join(self.directory, dataset, f"{name}.parquet")
+
+    def table_exists(self, table):
+        return os.path.exists(self._path(table))
+
+    def table_fingerprint(self, table):
+        if not self.table_exists(table):
+            return None
+        stat = os.stat(self._path(table))
+        return f"modified={stat.st_mtime_ns} size={stat.st_size}"
+
+    def dry_run(self, sql):
+        # The size of the files the statement reads stands in for bytes scanned
+        replaced = statement_target(sql) if replaces_target(sql) else None
+        return sum(
+            os.path.getsize(self._path(table))
+            for table in table_references(sql)
+            if table != replaced and self.table_exists(table)
+        )
+
+    @contextmanager
+    def _session(self, tables=(), target=None):
+        import duckdb
+
+        target = ".".join(target.split(".")[-2:]) if target else None
+        names = {".".join(table.split(".")[-2:]) for table in tables if "." in table}
+        with self._lock, _file_lock(os.path.join(self.directory, ".lock")):
+            connection = duckdb.connect()
+            try:
+                for table in names | {target} - {None}:
+                    dataset = table.split(".")[0]
+                    connection.execute(f'create schema if not exists "{dataset}"')
+                    if not self.table_exists(table):
+                        continue
+                    # Only the changed table is copied; the rest are read in place
+                    kind = "table" if table == target else "view"
+                    connection.execute(
+                        f"create {kind} {self._identifier(table)} as select * "
+                        f"from read_parquet({self._literal(self._path(table))})"
+                    )
+                yield connection
+                if target:
+                    self._write_back(connection, target)
+            finally:
+                connection.close()
+
+    @staticmethod
+    def _literal(value: str) -> str:
+        return "'{}'".format(value.replace("'", "''"))
+
+    def _write_back(self, connection, table: str) -> None:
+        """Replaces the file of `table` with its new contents, or removes it."""
+        path = self._path(table)
+        dataset, name = table.split(".")
+        exists = connection.execute(
+            "select count(*) from information_schema.tables "
+            "where table_schema = ? and table_name = ? and table_type = 'BASE TABLE'",
+            [dataset, name],
+        ).fetchone()[0]
+        if not exists:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        connection.execute(
+            f"copy {self._identifier(table)} to {self._literal(temporary_path)} "
+            "(format parquet)"
+        )
+        os.replace(temporary_path, path)
+
+
+_warehouses: Dict[Tuple[str, str], Warehouse] = {}
+_warehouses_lock = threading.Lock()
+
+
+def configure_warehouse(backend: str, directory: Optional[str] = None) -> None:
+    """
+    Selects the backend `get_warehouse` returns: "bigquery", or "local" for a
+    `ParquetWarehouse` in `directory`. The choice is kept in the environment, so
+    processes started afterwards use the same backend.
+    """
+    if backend not in WAREHOUSE_BACKENDS:
+        raise ValueError(f"Unknown warehouse backend {backend!r}")
+    os.environ[WAREHOUSE_ENV] = backend
+    if directory:
+        os.environ[WAREHOUSE_DIR_ENV] = os.path.abspath(directory)
+
+
+def warehouse_backend() -> str:
+    return os.environ.get(WAREHOUSE_ENV, "bigquery")
+
+
+def get_warehouse(project_id: str) -> Warehouse:
+    """
+    Returns a shared warehouse for the project on the configured backend, creating
+    it on first use. The local backend ignores the project.
+    """
+    if warehouse_backend() == "local":
+        key = (
+            "local",
+            os.path.abspath(os.environ.get(WAREHOUSE_DIR_ENV, DEFAULT_WAREHOUSE_DIR)),
+        )
+    else:
+        key = ("bigquery", project_id)
+    with _warehouses_lock:
+        if key not in _warehouses:
+            _warehouses[key] = (
+                ParquetWarehouse(key[1])
+                if key[0] == "local"
+                else BigQueryWarehouse(project_id)
+            )
+        return _warehouses[key]
@@ -0,0 +1,121 @@
+"""
+Benchmark page accumulation in the courses extractor on a synthetic catalogue.
+
+Compares the previous `pd.concat`-per-page accumulation with `TableAccumulator`
+at a base catalogue size and at 10x that size. Linear accumulation should take
+roughly 10x as long on the larger catalogue; quadratic accumulation much longer.
+
+Usage:
+    python extractor_courses/benchmark_accumulator.py --pages 100
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from courses.accumulator import TableAccumulator
+from courses.config import BIGQUERY_TABLES, QUERY_ROWS
+from courses.data_processing import parse_response_to_dataframes
+
+
+def make_course_group(index: int) -> dict:
+    """Builds one synthetic `grouped.GroupID.groups` entry."""
+    return {
+        "groupValue": f"uuid-{index}",
+        "doclist": {
+            "docs": [
+                {
+                    "Course_Ref_No": f"TGS-{index:010d}",
+                    "Course_Created_Date": "2024-01-01T00:00:00Z",
+                    "Course_Start_Date_Nearest": "2024-06-01T00:00:00Z",
+                    "Course_Funding": "Funded",
+                    "Course_Quality_NumberOfRespondents": index % 500,
+                    "Course_Quality_Stars_Rating": 4.5,
+                    "Course_Title": f"Synthetic course {index}",
+                    "Len_of_Course_Duration_facet": "1 - 2 Days",
+                    "Tol_Cost_of_Trn_Per_Trainee": 100.0 + index % 900,
+                    "Organisation_Name": f"Provider {index % 800}",
+                    "UEN": f"UEN{index % 800:06d}",
+                    "EXT_Course_Ref_No": f"EXT-{index}",
+                    "Area_of_Training": [str(index % 30), str(index % 17)],
+                    "Area_of_Training_text": [
+                        f"Area {index % 30}",
+                        f"Area {index % 17}",
+                    ],
+                    "Medium_of_Instruction_text": ["English", " Mandarin"],
+                    "Tags_text_FeaturedInitiatives": ["Featured"],
+                    "Tags_text_SFInitiatives": ["SkillsFuture Series"],
+                }
+            ]
+        },
+    }
+
+
+def make_pages(page_count: int) -> list:
+    """Parses `page_count` synthetic pages into per-page DataFrame tuples."""
+    return [
+        parse_response_to_dataframes(
+            [make_course_group(page * QUERY_ROWS + i) for i in range(QUERY_ROWS)]
+        )
+        for page in range(page_count)
+    ]
+
+
+def accumulate_with_concat(pages: list) -> dict:
+    all_dataframes = {table: pd.DataFrame() for table in BIGQUERY_TABLES}
+    for new_dataframes in pages:
+        for df, table in zip(new_dataframes, BIGQUERY_TABLES):
+            all_dataframes[table] = pd.concat(
+                [all_dataframes[table], df], ignore_index=True
+            )
+    return all_dataframes
+
+
+def accumulate_with_accumulator(pages: list) -> dict:
+    accumulator = TableAccumulator(BIGQUERY_TABLES)
+    for new_dataframes in pages:
+        accumulator.add(new_dataframes)
+    return accumulator.build()
+
+
+def time_call(func, pages: list) -> float:
+    start_time = time.perf_counter()
+    func(pages)
+    return time.perf_counter() - start_time
+
+
+def main(page_count: int) -> None:
+    small_pages = make_pages(page_count)
+    large_pages = make_pages(page_count * 10)
+
+    print(
+        f"Catalogue sizes: {page_count * QUERY_ROWS} and "
+        f"{page_count * 10 * QUERY_ROWS} courses"
+    )
+    for name, func in [
+        ("pd.concat per page", accumulate_with_concat),
+        ("TableAccumulator", accumulate_with_accumulator),
+    ]:
+        small_time = time_call(func, small_pages)
+        large_time = time_call(func, large_pages)
+        print(
+            f"{name:>20}: {small_time:.3f}s -> {large_time:.3f}s "
+            f"({large_time / small_time:.1f}x for 10x the rows)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark page accumulation.")
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=100,
+        help="Number of pages in the base synthetic catalogue.",
+    )
+    args = parser.parse_args()
+    main(args.pages)
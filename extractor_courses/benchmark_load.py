@@ -0,0 +1,140 @@
+"""
+Benchmark the serialisation of a full courses snapshot for warehouse loads.
+
+Compares the row-wise CSV encoding used by `pandas_gbq.to_gbq` (schema inferred
+per upload) with the Parquet encoding used by the warehouse loader (explicit Arrow
+schema from the row dataclasses), reporting CPU time and bytes per table.
+
+With `--live`, both paths are also timed end to end against BigQuery by loading
+each table into a scratch dataset, which is left empty afterwards.
+
+Usage:
+    python extractor_courses/benchmark_load.py --courses 30000
+    python extractor_courses/benchmark_load.py --live --dataset sg_skillsfuture_bench
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_accumulator import make_course_group
+from common.arrow_schema import merge_schemas, to_arrow_table, to_parquet_bytes
+from courses.config import BIGQUERY_TABLES, PROJECT_ID
+from courses.data_processing import parse_response_to_dataframes
+from courses.schemas import TABLE_SCHEMAS
+
+
+def make_snapshot(course_count: int) -> dict:
+    dataframes = parse_response_to_dataframes(
+        [make_course_group(i) for i in range(course_count)]
+    )
+    snapshot = dict(zip(BIGQUERY_TABLES, dataframes))
+    for df in snapshot.values():
+        df["_accessed_at"] = "2025-01-01 00:00:00"
+    return snapshot
+
+
+def encode_csv(df) -> bytes:
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, header=False, encoding="utf-8")
+    return buffer.getvalue()
+
+
+def encode_parquet(df, table_name) -> bytes:
+    types = merge_schemas(TABLE_SCHEMAS[table_name])
+    return to_parquet_bytes(to_arrow_table(df, types))
+
+
+def timed(function, *args):
+    start_time = time.process_time()
+    result = function(*args)
+    return result, time.process_time() - start_time
+
+
+def run_offline(snapshot: dict) -> None:
+    print(
+        f"{'table':<26} {'rows':>8} {'csv s':>8} {'csv MB':>8} "
+        f"{'pq s':>8} {'pq MB':>8}"
+    )
+    totals = [0.0, 0, 0.0, 0]
+    for table_name, df in snapshot.items():
+        csv_bytes, csv_seconds = timed(encode_csv, df)
+        parquet_bytes, parquet_seconds = timed(encode_parquet, df, table_name)
+        totals = [
+            totals[0] + csv_seconds,
+            totals[1] + len(csv_bytes),
+            totals[2] + parquet_seconds,
+            totals[3] + len(parquet_bytes),
+        ]
+        print(
+            f"{table_name:<26} {len(df):>8} {csv_seconds:>8.2f} "
+            f"{len(csv_bytes) / 1e6:>8.1f} {parquet_seconds:>8.2f} "
+            f"{len(parquet_bytes) / 1e6:>8.1f}"
+        )
+    print(
+        f"{'total':<26} {'':>8} {totals[0]:>8.2f} {totals[1] / 1e6:>8.1f} "
+        f"{totals[2]:>8.2f} {totals[3] / 1e6:>8.1f}"
+    )
+    print(
+        f"Parquet: {totals[0] / max(totals[2], 1e-9):.1f}x less CPU, "
+        f"{totals[1] / max(totals[3], 1):.1f}x fewer bytes than CSV"
+    )
+
+
+def run_live(snapshot: dict, dataset: str) -> None:
+    import pandas_gbq
+    from common.warehouse import get_warehouse
+
+    warehouse = get_warehouse(PROJECT_ID)
+    for table_name, df in snapshot.items():
+        destination = f"{dataset}.bench_{table_name}"
+
+        start_time = time.monotonic()
+        pandas_gbq.to_gbq(
+            df.astype(str),
+            destination,
+            project_id=PROJECT_ID,
+            if_exists="replace",
+            api_method="load_csv",
+        )
+        pandas_gbq_seconds = time.monotonic() - start_time
+        warehouse.drop_table(destination)
+
+        start_time = time.monotonic()
+        warehouse.load_dataframe(
+            df, destination, if_exists="replace", schema=TABLE_SCHEMAS[table_name]
+        )
+        parquet_seconds = time.monotonic() - start_time
+        warehouse.drop_table(destination)
+
+        print(
+            f"{table_name:<26} pandas_gbq {pandas_gbq_seconds:6.1f}s, "
+            f"Parquet load {parquet_seconds:6.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--courses", type=int, default=30000, help="Courses in the snapshot."
+    )
+    parser.add_argument(
+        "--live", action="store_true", help="Also time both loads on BigQuery."
+    )
+    parser.add_argument(
+        "--dataset",
+        default="sg_skillsfuture_bench",
+        help="Scratch dataset for --live loads.",
+    )
+    args = parser.parse_args()
+
+    snapshot = make_snapshot(args.courses)
+    run_offline(snapshot)
+    if args.live:
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
+        run_live(snapshot, args.dataset)
@@ -0,0 +1,136 @@
+"""
+Benchmark building the courses tables from parsed search groups.
+
+Compares the previous path (one dataclass instance per row, then `__dict__` per
+row into `pd.DataFrame`) with the column builders used by
+`parse_response_to_dataframes`, reporting throughput and the peak memory
+allocated while building the tables of a synthetic payload.
+
+Usage:
+    python extractor_courses/benchmark_row_builders.py --courses 100000
+"""
+
+import argparse
+import dataclasses
+import os
+import sys
+import time
+import tracemalloc
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from benchmark_accumulator import make_course_group
+from courses.data_models import (
+    CourseInfo,
+    FeaturedInitiatives,
+    LanguageOfInstruction,
+    SkillsFutureInitiatives,
+    TrainingArea,
+)
+from courses.data_processing import parse_response_to_dataframes
+
+
+def _plain_dataclass(cls):
+    """Rebuilds a row dataclass without slots, as the models were before."""
+    return dataclasses.make_dataclass(
+        cls.__name__, [(field.name, field.type) for field in dataclasses.fields(cls)]
+    )
+
+
+LegacyCourseInfo = _plain_dataclass(CourseInfo)
+LegacyTrainingArea = _plain_dataclass(TrainingArea)
+LegacyLanguage = _plain_dataclass(LanguageOfInstruction)
+LegacyFeatured = _plain_dataclass(FeaturedInitiatives)
+LegacySkillsFuture = _plain_dataclass(SkillsFutureInitiatives)
+
+
+def parse_legacy(course_docs_list):
+    """The per-row dataclass and `__dict__` path replaced by the column builders."""
+    courses = [
+        LegacyCourseInfo(*CourseInfo.values_from_dict(course_dict))
+        for course_dict in course_docs_list
+    ]
+    training_areas = []
+    languages = []
+    featured_initiatives = []
+    skillsfuture_initiatives = []
+
+    for course_info, course_dict in zip(courses, course_docs_list):
+        reference_number = course_info.course_reference_number
+        course_data = course_dict.get("doclist", {}).get("docs", [{}])[0]
+        training_areas.extend(
+            LegacyTrainingArea(reference_number, area_id, area_text)
+            for area_id, area_text in zip(
+                course_data.get("Area_of_Training", []),
+                course_data.get("Area_of_Training_text", []),
+            )
+        )
+        languages.extend(
+            LegacyLanguage(reference_number, language.strip())
+            for language in course_data.get("Medium_of_Instruction_text", [])
+        )
+        featured_initiatives.extend(
+            LegacyFeatured(reference_number, tag)
+            for tag in course_data.get("Tags_text_FeaturedInitiatives", [])
+        )
+        skillsfuture_initiatives.extend(
+            LegacySkillsFuture(reference_number, tag)
+            for tag in course_data.get("Tags_text_SFInitiatives", [])
+        )
+
+    return tuple(
+        pd.DataFrame([row.__dict__ for row in rows])
+        for rows in (
+            courses,
+            training_areas,
+            languages,
+            featured_initiatives,
+            skillsfuture_initiatives,
+        )
+    )
+
+
+def measure(function, course_docs_list):
+    """Returns the result, seconds taken, and peak bytes allocated by `function`."""
+    start_time = time.perf_counter()
+    result = function(course_docs_list)
+    seconds = time.perf_counter() - start_time
+
+    tracemalloc.start()
+    function(course_docs_list)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak_bytes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--courses", type=int, default=100000, help="Courses in the payload."
+    )
+    args = parser.parse_args()
+
+    course_docs_list = [make_course_group(i) for i in range(args.courses)]
+
+    legacy, legacy_seconds, legacy_peak = measure(parse_legacy, course_docs_list)
+    builders, builder_seconds, builder_peak = measure(
+        parse_response_to_dataframes, course_docs_list
+    )
+    for old, new in zip(legacy, builders):
+        pd.testing.assert_frame_equal(old, new)
+
+    rows = sum(len(df) for df in builders)
+    for name, seconds, peak_bytes in (
+        ("dataclass + __dict__", legacy_seconds, legacy_peak),
+        ("column builders", builder_seconds, builder_peak),
+    ):
+        print(
+            f"{name:<22} {seconds:6.2f}s {rows / seconds:>12,.0f} rows/s "
+            f"{peak_bytes / 1e6:>8.1f} MB peak"
+        )
+    print(
+        f"Column builders: {legacy_seconds / builder_seconds:.1f}x faster, "
+        f"{legacy_peak / max(builder_peak, 1):.1f}x less peak memory"
+    )
@@ -0,0 +1,34 @@
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+
+class TableAccumulator:
+    """
+    Collects per-page DataFrames for each table and concatenates them once.
+
+    Concatenating onto a growing DataFrame every page copies all rows collected so
+    far, which makes a full crawl quadratic in the catalogue size. Holding the page
+    frames in lists keeps accumulation linear; the copy happens once in `build()`.
+    """
+
+    def __init__(self, table_names: Iterable[str]):
+        self._frames: Dict[str, List[pd.DataFrame]] = {
+            table: [] for table in table_names
+        }
+
+    def add(self, dataframes: Iterable[pd.DataFrame]) -> None:
+        """Adds one page of DataFrames, given in the same order as `table_names`."""
+        for frames, df in zip(self._frames.values(), dataframes):
+            if not df.empty:
+                frames.append(df)
+
+    def row_count(self, table: str) -> int:
+        return sum(len(df) for df in self._frames[table])
+
+    def build(self) -> Dict[str, pd.DataFrame]:
+        """Returns one DataFrame per table, concatenating each table exactly once."""
+        return {
+            table: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            for table, frames in self._frames.items()
+        }
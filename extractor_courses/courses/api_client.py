@@ -1,18 +1,134 @@
-from typing import Optional
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, quote
 
+import pandas as pd
 import requests
-from courses.config import API_HEADERS, API_URL, QUERY_ROWS
+from common.http_client import get_client
+from common.json_codec import DecodeError, loads
+from common.json_stream import JsonArrayStream
+from courses.config import API_HEADERS, API_URL, QUERY_ROWS, SEARCH_FACETS
+from courses.data_processing import CourseRows
 
+GROUP_PATH = ("grouped", "GroupID")
+GROUPS_PATH = GROUP_PATH + ("groups",)
+NGROUPS_PATH = GROUP_PATH + ("ngroups",)
+MATCHES_PATH = GROUP_PATH + ("matches",)
 
-def fetch_course_data(start: int = 0, max_rows: int = QUERY_ROWS) -> Optional[dict]:
-    """Fetches course data from the API."""
+
+@dataclass
+class SearchPage:
+    """
+    One parsed page of search results. `total_groups` is exact when the response
+    reports `ngroups`; when only `matches` is reported it counts courses rather
+    than groups, and only bounds the number of groups from above.
+    """
+
+    start_row: int
+    group_count: int
+    total_groups: int
+    dataframes: tuple[pd.DataFrame, ...]
+    filter_query: Optional[str] = None
+    exact_total: bool = True
+
+
+def search_params(
+    start: int,
+    max_rows: int,
+    facets: bool = SEARCH_FACETS,
+    filter_query: Optional[str] = None,
+) -> dict:
+    query = f"rows={max_rows}"
+    if facets:
+        query += "&facet=true&facet.mincount=1"
+    if filter_query:
+        query += f"&fq={quote(filter_query)}"
+    return {"query": f"{query}&json.nl=map&start={start}"}
+
+
+def cached_page_sizes() -> Dict[Tuple[Optional[str], int], int]:
+    """
+    Returns the largest `rows` in the response cache for each filter query and
+    start row.
+    """
+    cache = get_client().cache
+    sizes = {}
+    for params in cache.cached_params(API_URL) if cache is not None else []:
+        query = parse_qs(params.get("query", ""))
+        if "start" in query and "rows" in query:
+            key = (query.get("fq", [None])[0], int(query["start"][0]))
+            sizes[key] = max(int(query["rows"][0]), sizes.get(key, 0))
+    return sizes
+
+
+def fetch_facet_counts(field: str) -> Optional[Tuple[int, bool, Dict[str, int]]]:
+    """
+    Returns the total number of course groups, whether that total is exact (see
+    `SearchPage`), and the number of courses for each value of the facet `field`,
+    or None if the request fails.
+    """
     params = {
-        "query": f"rows={max_rows}&facet=true&facet.mincount=1&json.nl=map&start={start}"
+        "query": f"rows=0&facet=true&facet.field={field}&facet.mincount=1"
+        "&facet.limit=-1&json.nl=map&start=0"
     }
     try:
-        response = requests.get(API_URL, headers=API_HEADERS, params=params)
+        response = get_client().get(API_URL, headers=API_HEADERS, params=params)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        payload = loads(response.content)
+        group = payload["grouped"]["GroupID"]
+        total_groups = int(group.get("ngroups", group.get("matches", 0)))
+        return (
+            total_groups,
+            "ngroups" in group,
+            dict(payload["facet_counts"]["facet_fields"][field]),
+        )
+    except (requests.exceptions.RequestException, DecodeError, KeyError) as e:
+        print(f"Error fetching {field} facet counts: {e!r}")
+        return None
+
+
+def fetch_course_page(
+    start: int = 0,
+    max_rows: int = QUERY_ROWS,
+    facets: bool = SEARCH_FACETS,
+    filter_query: Optional[str] = None,
+) -> Optional[SearchPage]:
+    """
+    Fetches one page of course search results and parses it as it streams in.
+
+    Each search group is added to the course tables as soon as it is decoded, so
+    the raw page is never held in memory whole. `filter_query` restricts the
+    search with a Solr `fq` filter. Returns None if the request fails or the
+    response has no `grouped.GroupID.groups`.
+    """
+    stream = JsonArrayStream(
+        get_client().iter_content(
+            API_URL,
+            headers=API_HEADERS,
+            params=search_params(start, max_rows, facets, filter_query),
+        ),
+        GROUPS_PATH,
+        scalar_paths=(NGROUPS_PATH, MATCHES_PATH),
+    )
+    rows = CourseRows()
+    try:
+        for course_dict in stream.items():
+            rows.add(course_dict)
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error fetching data: {e}")
         return None
+    if not stream.found:
+        print(f"Error fetching data: no search groups in the response at {start}")
+        return None
+
+    total_groups = stream.scalars.get(
+        NGROUPS_PATH, stream.scalars.get(MATCHES_PATH, 0)
+    )
+    return SearchPage(
+        start,
+        len(rows),
+        int(total_groups),
+        rows.to_dataframes(),
+        filter_query,
+        exact_total=NGROUPS_PATH in stream.scalars,
+    )
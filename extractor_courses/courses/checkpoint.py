@@ -0,0 +1,200 @@
+import glob
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from common.arrow_schema import merge_schemas, to_arrow_table
+from common.frame_types import apply_column_types, conversion_report
+from courses.accumulator import TableAccumulator
+
+STATE_FILE = "state.json"
+
+
+def read_run_metadata(path: str) -> dict:
+    """Returns the metadata recorded by the last finished crawl, if any."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_run_metadata(path: str, **values) -> None:
+    """Records metadata of a finished crawl, with the time it finished."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    metadata = {
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **values,
+    }
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(temporary_path, path)
+
+
+class CrawlCheckpoint:
+    """
+    Spills completed pages to Parquet and records where the crawl should resume.
+
+    Every `spill_every` pages the accumulated rows are written to one Parquet file
+    per table and `state.json` is rewritten with the next offset to fetch, so that
+    at most `spill_every` pages are held in memory and a crashed crawl can continue
+    from the last spill without re-fetching earlier pages. Spill files are only
+    written for contiguous runs of pages, which the crawlers guarantee by yielding
+    pages in offset order and stopping at the first failure. A partitioned
+    crawl records the next offset of each partition instead. Columns are
+    converted to their `dtypes` as they are spilled.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        table_names: Iterable[str],
+        spill_every: int,
+        schemas: Optional[Dict[str, pa.Schema]] = None,
+        dtypes: Optional[Dict[str, Dict[str, str]]] = None,
+    ):
+        self.directory = directory
+        self.table_names = list(table_names)
+        self.spill_every = spill_every
+        self.schemas = schemas or {}
+        self.dtypes = dtypes or {}
+        self.accumulator = TableAccumulator(self.table_names)
+        self.state = {}
+        self._pages_in_memory = 0
+
+    @property
+    def next_start_row(self) -> int:
+        return self.state["next_start_row"]
+
+    @property
+    def page_size(self) -> Optional[int]:
+        """Page size the crawl had settled on at the last checkpoint."""
+        return self.state.get("page_size")
+
+    @property
+    def partition_by(self) -> Optional[str]:
+        """Facet field a partitioned crawl is split by."""
+        return self.state.get("partition_by")
+
+    @property
+    def partitions(self) -> Dict[str, Optional[int]]:
+        """Next start row of each partition, or None once a partition is finished."""
+        return self.state.get("partitions", {})
+
+    def _state_path(self) -> str:
+        return os.path.join(self.directory, STATE_FILE)
+
+    def _write_state(self) -> None:
+        temporary_path = self._state_path() + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temporary_path, self._state_path())
+
+    def exists(self) -> bool:
+        return os.path.exists(self._state_path())
+
+    def start(self, start_row: int, partition_by: Optional[str] = None) -> None:
+        """
+        Begins a new crawl at `start_row`, or one split by the facet field
+        `partition_by`, discarding any earlier checkpoint.
+        """
+        if self.exists():
+            print(f"Discarding unfinished crawl checkpoint in {self.directory}")
+        self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        self.state = {
+            "next_start_row": start_row,
+            "pages": 0,
+            "spills": 0,
+        }
+        if partition_by:
+            self.state.update(partition_by=partition_by, partitions={})
+        self._write_state()
+
+    def resume(self) -> int:
+        """Loads the checkpoint and returns the offset of the next page to fetch."""
+        if not self.exists():
+            raise FileNotFoundError(f"No crawl checkpoint in {self.directory}")
+        with open(self._state_path()) as f:
+            self.state = json.load(f)
+        if self.partition_by:
+            finished = [p for p in self.partitions.values() if p is None]
+            print(
+                f"Resuming crawl by {self.partition_by} with {len(finished)} "
+                f"partitions finished ({self.state['pages']} pages already spilled)"
+            )
+        else:
+            print(
+                f"Resuming crawl at start row {self.next_start_row} "
+                f"({self.state['pages']} pages already spilled)"
+            )
+        return self.next_start_row
+
+    def add_page(
+        self,
+        start_row: int,
+        page_rows: int,
+        dataframes: Iterable[pd.DataFrame],
+        page_size: Optional[int] = None,
+        partition: Optional[str] = None,
+    ) -> None:
+        """
+        Adds one crawled page of `page_rows` groups, spilling to disk every
+        `spill_every` pages. `page_size` is the size chosen for the next request,
+        and `partition` the filter query of a partitioned crawl.
+        """
+        self.accumulator.add(dataframes)
+        if partition is None:
+            self.state["next_start_row"] = start_row + page_rows
+        else:
+            self.state["partitions"][partition] = start_row + page_rows
+        self.state["pages"] += 1
+        if page_size is not None:
+            self.state["page_size"] = page_size
+        self._pages_in_memory += 1
+        if self._pages_in_memory >= self.spill_every:
+            self.flush()
+
+    def finish_partition(self, partition: str) -> None:
+        """Records that a partition has been crawled to its end."""
+        self.state["partitions"][partition] = None
+
+    def flush(self) -> None:
+        """Writes the pages held in memory to Parquet and records the next offset."""
+        if self._pages_in_memory:
+            spill = self.state["spills"]
+            for table, df in self.accumulator.build().items():
+                if df.empty:
+                    continue
+                apply_column_types(df, self.dtypes.get(table, {}), table)
+                pq.write_table(
+                    to_arrow_table(
+                        df,
+                        merge_schemas(self.schemas.get(table)),
+                        table,
+                        conversion_report,
+                    ),
+                    os.path.join(self.directory, f"{table}-{spill:05d}.parquet"),
+                )
+            self.state["spills"] = spill + 1
+            self.accumulator = TableAccumulator(self.table_names)
+            self._pages_in_memory = 0
+        self._write_state()
+
+    def read_table(self, table: str) -> pd.DataFrame:
+        """Returns every spilled row of `table`, with its typed columns restored."""
+        paths = sorted(glob.glob(os.path.join(self.directory, f"{table}-*.parquet")))
+        if not paths:
+            return pd.DataFrame()
+        df = pd.concat((pd.read_parquet(path) for path in paths), ignore_index=True)
+        return apply_column_types(df, self.dtypes.get(table, {}), report=None)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -5,7 +5,15 @@ API_HEADERS = {
     "Referer": "https://www.myskillsfuture.gov.sg/content/portal/en/portal-search/portal-search.html",
     "X-Requested-With": "XMLHttpRequest",
 }
+# Initial and smallest page size; the crawl grows pages up to MAX_QUERY_ROWS while
+# they come back complete within PAGE_TARGET_SECONDS
 QUERY_ROWS = 24
+MAX_QUERY_ROWS = 1000
+PAGE_TARGET_SECONDS = 5.0
+# Facet counts are not used by the extractor; requesting them only enlarges pages
+SEARCH_FACETS = False
+# Facet field whose values split the catalogue for `--partition-by`
+PARTITION_FACET_FIELD = "Area_of_Training"
 PROJECT_ID = "jeremy-chia"
 BIGQUERY_TABLES = {
     "courses": "sg_skillsfuture.courses",
@@ -24,3 +32,13 @@ PRIMARY_KEYS = {
         "skillsfuture_initiatives_tag",
     ],
 }
+# Tables are partitioned by the day of _accessed_at and clustered by these columns
+CLUSTER_COLUMNS = {
+    table_name: ["course_reference_number"] for table_name in PRIMARY_KEYS
+}
+
+CHECKPOINT_DIR = ".crawl_checkpoint/courses"
+# Metadata of the last finished crawl, such as its settled page size; kept when
+# the checkpoint is cleared so that the next crawl starts at that size
+RUN_METADATA_PATH = ".crawl_checkpoint/courses_last_run.json"
+SPILL_EVERY_PAGES = 50
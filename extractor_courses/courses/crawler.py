@@ -0,0 +1,373 @@
+"""Page crawlers for the course-search endpoint."""
+
+import dataclasses
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from courses.api_client import SearchPage, fetch_course_page, fetch_facet_counts
+from courses.config import SEARCH_FACETS
+from courses.page_size import PageSizeController
+
+
+class CrawlInterrupted(Exception):
+    """Raised when a page cannot be fetched; `start_row` is the page that failed."""
+
+    def __init__(self, start_row: int, filter_query: Optional[str] = None):
+        where = f" of partition {filter_query}" if filter_query else ""
+        super().__init__(
+            f"API call failed or returned unexpected data at start row "
+            f"{start_row}{where}"
+        )
+        self.start_row = start_row
+        self.filter_query = filter_query
+
+
+class RateLimiter:
+    """Spaces out requests so no more than `max_rps` start per second."""
+
+    def __init__(self, max_rps: Optional[float] = None):
+        self.interval = 1.0 / max_rps if max_rps else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+def _fetch_page(
+    start_row: int, rows: int, rate_limiter: RateLimiter, facets: bool
+) -> Optional[SearchPage]:
+    rate_limiter.wait()
+    return fetch_course_page(start=start_row, max_rows=rows, facets=facets)
+
+
+def _fetch_tuned_page(
+    start_row: int,
+    rate_limiter: RateLimiter,
+    facets: bool,
+    page_size: PageSizeController,
+    filter_query: Optional[str] = None,
+) -> SearchPage:
+    """
+    Fetches the page at `start_row` at the controller's size, retrying it at a
+    smaller size while the controller allows. Raises `CrawlInterrupted` otherwise.
+    """
+    while True:
+        rows = page_size.rows_for(start_row, filter_query)
+        rate_limiter.wait()
+        start_time = time.monotonic()
+        page = fetch_course_page(
+            start=start_row, max_rows=rows, facets=facets, filter_query=filter_query
+        )
+        if page is not None:
+            page_size.record_page(
+                start_row,
+                rows,
+                page.group_count,
+                page.total_groups if page.exact_total else 0,
+                time.monotonic() - start_time,
+            )
+            return page
+        if not page_size.record_failure(rows):
+            raise CrawlInterrupted(start_row, filter_query)
+
+
+def _crawl_pages(
+    start_row: int,
+    rate_limiter: RateLimiter,
+    facets: bool,
+    page_size: PageSizeController,
+    filter_query: Optional[str] = None,
+) -> Iterator[SearchPage]:
+    while True:
+        page = _fetch_tuned_page(
+            start_row, rate_limiter, facets, page_size, filter_query
+        )
+        if not page.group_count:
+            return
+
+        yield page
+        start_row += page.group_count
+        if page.total_groups and start_row >= page.total_groups:
+            return
+
+
+def crawl_serial(
+    start_row: int = 0,
+    max_rps: Optional[float] = None,
+    facets: bool = SEARCH_FACETS,
+    page_size: Optional[PageSizeController] = None,
+) -> Iterator[SearchPage]:
+    """
+    Yields parsed pages one at a time until exhausted, sizing each page with
+    `page_size` (adaptive from `QUERY_ROWS` by default).
+
+    Raises `CrawlInterrupted` at the first page that fails.
+    """
+    yield from _crawl_pages(
+        start_row, RateLimiter(max_rps), facets, page_size or PageSizeController()
+    )
+
+
+def _offsets(start_row: int, total_groups: int, page_size: PageSizeController):
+    while start_row < total_groups:
+        yield start_row
+        start_row += page_size.rows_for(start_row)
+
+
+def crawl_concurrent(
+    start_row: int = 0,
+    concurrency: int = 4,
+    max_rps: Optional[float] = None,
+    facets: bool = SEARCH_FACETS,
+    page_size: Optional[PageSizeController] = None,
+) -> Iterator[SearchPage]:
+    """
+    Yields parsed pages in offset order, fetching them in parallel.
+
+    Pages are first fetched one at a time, which reads the total hit count and
+    lets `page_size` settle; the remaining offsets are then spread over a pool of
+    `concurrency` workers at that size. When the endpoint reports no total, every
+    page is fetched one at a time. Pages are yielded in order, and the crawl
+    raises `CrawlInterrupted` at the first page that fails or comes back short of
+    an exact total, so that the output is always a contiguous run of offsets that
+    can be resumed. A short page ends the crawl when the total is only an upper
+    bound.
+
+    Args:
+        start_row (int): Offset of the first page to fetch.
+        concurrency (int): Maximum number of requests in flight.
+        max_rps (float): Optional ceiling on requests started per second.
+        facets (bool): Request facet counts with each page.
+        page_size (PageSizeController): Chooses the rows of each request.
+    """
+    page_size = page_size or PageSizeController()
+    rate_limiter = RateLimiter(max_rps)
+    while True:
+        page = _fetch_tuned_page(start_row, rate_limiter, facets, page_size)
+        if not page.group_count:
+            return
+        yield page
+        start_row += page.group_count
+        if page.total_groups and start_row >= page.total_groups:
+            return
+        if page.total_groups and page_size.settled:
+            break
+
+    total_groups = page.total_groups
+    offsets = list(_offsets(start_row, total_groups, page_size))
+    print(
+        f"Total courses: {total_groups}, fetching {len(offsets)} more pages "
+        f"of {page_size.rows_for(start_row)} rows"
+    )
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        pages = executor.map(
+            lambda offset: _fetch_page(
+                offset, page_size.rows_for(offset), rate_limiter, facets
+            ),
+            offsets,
+        )
+        for offset, page in zip(offsets, pages):
+            if page is None:
+                raise CrawlInterrupted(offset)
+            if not page.group_count:
+                return
+            yield page
+            if page.group_count < page_size.rows_for(offset):
+                if page.exact_total and offset + page.group_count < page.total_groups:
+                    # Pages after a short one would leave a gap; resume from its end
+                    raise CrawlInterrupted(offset + page.group_count)
+                return
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Filter query of the partition that sweeps the whole catalogue for courses the
+# facet partitions missed
+SWEEP_FILTER_QUERY = "*:*"
+
+
+def facet_partitions(field: str, values: Iterable[str]) -> List[str]:
+    """
+    Returns filter queries that split the catalogue by the values of `field`,
+    plus one for the courses without a value.
+    """
+    partitions = []
+    for value in sorted(values):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        partitions.append(f'{field}:"{escaped}"')
+    partitions.append(f"-{field}:[* TO *]")
+    return partitions
+
+
+def drop_seen_courses(page: SearchPage, seen: Set[str]) -> SearchPage:
+    """
+    Removes the courses in `seen` from the page's tables and adds the rest to it.
+
+    `group_count` is left as fetched, so that it still gives the next offset.
+    """
+    courses = page.dataframes[0]
+    if courses.empty:
+        return page
+    references = courses["course_reference_number"]
+    new_references = set(references[~references.isin(seen)])
+    seen.update(new_references)
+    dataframes = tuple(
+        df[df["course_reference_number"].isin(new_references)] if not df.empty else df
+        for df in page.dataframes
+    )
+    return dataclasses.replace(page, dataframes=dataframes)
+
+
+def crawl_partitioned(
+    field: str,
+    concurrency: int = 4,
+    max_rps: Optional[float] = None,
+    facets: bool = SEARCH_FACETS,
+    page_size: Optional[PageSizeController] = None,
+    progress: Optional[Dict[str, Optional[int]]] = None,
+    seen: Optional[Set[str]] = None,
+) -> Iterator[Tuple[str, Optional[SearchPage]]]:
+    """
+    Crawls the catalogue as independent partitions, one per value of the facet
+    `field`, paginating up to `concurrency` partitions in parallel.
+
+    Shallow offsets within each partition replace one deep pagination run, and a
+    partition that fails does not stop the others. Courses listed under several
+    values are kept only the first time they are seen. Yields
+    `(filter_query, page)` pairs, and `(filter_query, None)` once a partition is
+    finished. Once every partition has been crawled, `CrawlInterrupted` is raised
+    for the first partition that failed. If the partitions then hold fewer unique
+    courses than the exact total the endpoint reports, the whole catalogue is
+    swept as one more partition, `SWEEP_FILTER_QUERY`, for the missing courses.
+
+    Args:
+        field (str): Facet field whose values define the partitions.
+        concurrency (int): Maximum number of partitions crawled at once.
+        max_rps (float): Optional ceiling on requests started per second.
+        facets (bool): Request facet counts with each page.
+        page_size (PageSizeController): Chooses the rows of each request; it is
+            shared by all partitions.
+        progress (dict): Next start row of each partition in a resumed crawl, or
+            None for partitions that have finished.
+        seen (set): Course reference numbers already crawled; updated in place.
+    """
+    counts = fetch_facet_counts(field)
+    if counts is None:
+        raise CrawlInterrupted(0)
+    total_groups, exact_total, value_counts = counts
+    progress = progress or {}
+    seen = set() if seen is None else seen
+    page_size = page_size or PageSizeController()
+    rate_limiter = RateLimiter(max_rps)
+
+    partitions = {
+        filter_query: progress.get(filter_query, 0)
+        for filter_query in facet_partitions(field, value_counts)
+    }
+    pending = {fq: start for fq, start in partitions.items() if start is not None}
+    print(
+        f"Total courses: {total_groups}, {len(partitions)} {field} partitions, "
+        f"{len(pending)} left to crawl"
+    )
+
+    def crawl(pending: Dict[str, int]):
+        """Yields the pages of the `pending` partitions; returns the failures."""
+        results = queue.Queue(maxsize=concurrency * 2)
+        stop = threading.Event()
+
+        def put(item) -> None:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def crawl_partition(filter_query: str, start_row: int) -> None:
+            try:
+                for page in _crawl_pages(
+                    start_row, rate_limiter, facets, page_size, filter_query
+                ):
+                    put((filter_query, page))
+                    if stop.is_set():
+                        return
+                put((filter_query, None))
+            except Exception as e:
+                put((filter_query, e))
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        failures = []
+        short_partitions = []
+        last_pages = {}
+        try:
+            for filter_query, start_row in pending.items():
+                executor.submit(crawl_partition, filter_query, start_row)
+
+            remaining = len(pending)
+            while remaining:
+                filter_query, item = results.get()
+                if isinstance(item, CrawlInterrupted):
+                    failures.append(item)
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                elif item is None:
+                    remaining -= 1
+                    last_page = last_pages.get(filter_query)
+                    if (
+                        last_page
+                        and last_page.exact_total
+                        and last_page.start_row + last_page.group_count
+                        < last_page.total_groups
+                    ):
+                        short_partitions.append(filter_query)
+                    yield filter_query, None
+                else:
+                    last_pages[filter_query] = item
+                    yield filter_query, drop_seen_courses(item, seen)
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if short_partitions:
+            print(
+                f"Warning: {len(short_partitions)} partitions ended before their "
+                f"reported total, e.g. {short_partitions[0]}"
+            )
+        return failures
+
+    failures = yield from crawl(pending)
+    print(
+        f"Reconciled {len(seen)} unique courses with {total_groups} reported "
+        f"across {len(partitions)} partitions"
+    )
+    if failures:
+        raise failures[0]
+
+    sweep_start = progress.get(SWEEP_FILTER_QUERY, 0)
+    if exact_total and len(seen) < total_groups and sweep_start is not None:
+        print(
+            f"{total_groups - len(seen)} courses were not found in any {field} "
+            f"partition; sweeping the whole catalogue for them"
+        )
+        failures = yield from crawl({SWEEP_FILTER_QUERY: sweep_start})
+        print(f"Reconciled {len(seen)} unique courses after the sweep")
+        if failures:
+            raise failures[0]
+    if exact_total and len(seen) < total_groups:
+        print(
+            f"Warning: {total_groups - len(seen)} of the {total_groups} courses "
+            f"reported were not found"
+        )
@@ -2,6 +2,7 @@
 from typing import List
 
 import pandas as pd
+from common.columnar import ColumnBuilder
 from courses.data_models import (
     CourseInfo,
     FeaturedInitiatives,
@@ -11,39 +12,78 @@ from courses.data_models import (
 )
 
 
-def parse_response_to_dataframes(
-    course_docs_list: List[dict],
-) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    courses = [CourseInfo.from_dict(course_dict) for course_dict in course_docs_list]
-    training_areas = []
-    languages = []
-    featured_initiatives = []
-    skillsfuture_initiatives = []
+class CourseRows:
+    """
+    Collects the rows of the courses, training_areas, languages,
+    featured_initiatives and skillsfuture_initiatives tables, one search group at
+    a time.
+
+    Values are appended straight into per-column lists, so no row objects are
+    created; the dataclasses only define each table's columns.
+    """
+
+    def __init__(self):
+        self.courses = ColumnBuilder.for_dataclass(CourseInfo)
+        self.training_areas = ColumnBuilder.for_dataclass(TrainingArea)
+        self.languages = ColumnBuilder.for_dataclass(LanguageOfInstruction)
+        self.featured_initiatives = ColumnBuilder.for_dataclass(FeaturedInitiatives)
+        self.skillsfuture_initiatives = ColumnBuilder.for_dataclass(
+            SkillsFutureInitiatives
+        )
+
+    def __len__(self) -> int:
+        return len(self.courses)
+
+    def add(self, course_dict: dict) -> None:
+        course_values = CourseInfo.values_from_dict(course_dict)
+        self.courses.append(*course_values)
+        course_reference_number = course_values[1]
 
-    for course_info, course_dict in zip(courses, course_docs_list):
         course_data = course_dict.get("doclist", {}).get("docs", [{}])[0]
-        training_areas.extend(
-            TrainingArea.from_course_dict(
-                course_info.course_reference_number, course_data
+        area_pairs = list(
+            zip(
+                course_data.get("Area_of_Training", []),
+                course_data.get("Area_of_Training_text", []),
             )
         )
-        languages.extend(
-            LanguageOfInstruction(course_info.course_reference_number, language.strip())
-            for language in course_data.get("Medium_of_Instruction_text", [])
+        self.training_areas.extend(
+            [course_reference_number] * len(area_pairs),
+            [area_id for area_id, _ in area_pairs],
+            [area_text for _, area_text in area_pairs],
         )
-        featured_initiatives.extend(
-            FeaturedInitiatives(course_info.course_reference_number, tag)
-            for tag in course_data.get("Tags_text_FeaturedInitiatives", [])
+        self.languages.extend_keyed(
+            course_reference_number,
+            [
+                language.strip()
+                for language in course_data.get("Medium_of_Instruction_text", [])
+            ],
         )
-        skillsfuture_initiatives.extend(
-            SkillsFutureInitiatives(course_info.course_reference_number, tag)
-            for tag in course_data.get("Tags_text_SFInitiatives", [])
+        self.featured_initiatives.extend_keyed(
+            course_reference_number,
+            list(course_data.get("Tags_text_FeaturedInitiatives", [])),
         )
+        self.skillsfuture_initiatives.extend_keyed(
+            course_reference_number,
+            list(course_data.get("Tags_text_SFInitiatives", [])),
+        )
+
+    def to_dataframes(
+        self,
+    ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        return (
+            self.courses.to_dataframe(),
+            self.training_areas.to_dataframe(),
+            self.languages.to_dataframe(),
+            self.featured_initiatives.to_dataframe(),
+            self.skillsfuture_initiatives.to_dataframe(),
+        )
+
 
-    return (
-        pd.DataFrame([course.__dict__ for course in courses]),
-        pd.DataFrame([ta.__dict__ for ta in training_areas]),
-        pd.DataFrame([lang.__dict__ for lang in languages]),
-        pd.DataFrame([fi.__dict__ for fi in featured_initiatives]),
-        pd.DataFrame([si.__dict__ for si in skillsfuture_initiatives]),
-    )
+def parse_response_to_dataframes(
+    course_docs_list: List[dict],
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Parses a list of search groups into the five course tables."""
+    rows = CourseRows()
+    for course_dict in course_docs_list:
+        rows.add(course_dict)
+    return rows.to_dataframes()
@@ -0,0 +1,97 @@
+"""Page-size tuning for the course-search crawl."""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+from courses.config import MAX_QUERY_ROWS, PAGE_TARGET_SECONDS, QUERY_ROWS
+
+
+class PageSizeController:
+    """
+    Chooses the `rows` of each search request.
+
+    The size doubles while pages come back complete and in under half of
+    `target_seconds`. It halves when a page is slow or fails, and drops to the
+    number of groups returned when the endpoint truncates a page before the end of
+    the results; either way the smaller size becomes a cap, so the size settles
+    instead of oscillating. With `adaptive=False` the size is fixed at `rows`.
+    Pages fetched in parallel share one controller, so its updates are locked.
+    """
+
+    def __init__(
+        self,
+        rows: int = QUERY_ROWS,
+        min_rows: int = QUERY_ROWS,
+        max_rows: int = MAX_QUERY_ROWS,
+        target_seconds: float = PAGE_TARGET_SECONDS,
+        adaptive: bool = True,
+    ):
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.rows = min(max(rows, min_rows), max_rows)
+        self.target_seconds = target_seconds
+        self.adaptive = adaptive
+        self.cap: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def settled(self) -> bool:
+        """Whether the size has stopped growing."""
+        return not self.adaptive or self.cap is not None or self.rows >= self.max_rows
+
+    def rows_for(self, start_row: int, filter_query: Optional[str] = None) -> int:
+        return self.rows
+
+    def record_page(
+        self,
+        start_row: int,
+        requested: int,
+        group_count: int,
+        total_groups: int,
+        seconds: float,
+    ) -> None:
+        """
+        Adjusts the size after a page of `group_count` groups was fetched. A
+        `total_groups` of 0 means the total is unknown, so no page is truncated.
+        """
+        if not self.adaptive:
+            return
+        expected = min(requested, max(total_groups - start_row, 0))
+        with self._lock:
+            if group_count < expected:
+                self._shrink(group_count, "page truncated by the endpoint")
+            elif seconds > self.target_seconds:
+                self._shrink(requested // 2, f"page took {seconds:.1f}s")
+            elif seconds < self.target_seconds / 2 and group_count == requested:
+                self._resize(self.rows * 2, f"page took {seconds:.1f}s")
+
+    def record_failure(self, requested: int) -> bool:
+        """Shrinks the size after a failed page; returns whether to retry it."""
+        if not self.adaptive or requested <= self.min_rows:
+            return False
+        with self._lock:
+            self._shrink(requested // 2, "page failed")
+        return True
+
+    def _shrink(self, rows: int, reason: str) -> None:
+        self.cap = max(min(rows, self.cap or rows), self.min_rows)
+        self._resize(self.cap, reason)
+
+    def _resize(self, rows: int, reason: str) -> None:
+        rows = min(max(rows, self.min_rows), self.cap or self.max_rows)
+        if rows != self.rows:
+            print(f"Page size {self.rows} -> {rows} rows ({reason})")
+            self.rows = rows
+
+
+class RecordedPageSizes(PageSizeController):
+    """Replays the page size that was cached for each filter query and start row."""
+
+    def __init__(
+        self, sizes: Dict[Tuple[Optional[str], int], int], rows: int = QUERY_ROWS
+    ):
+        super().__init__(rows, min_rows=1, adaptive=False)
+        self.sizes = sizes
+
+    def rows_for(self, start_row: int, filter_query: Optional[str] = None) -> int:
+        return self.sizes.get((filter_query, start_row), self.rows)
@@ -6,6 +6,7 @@ import subprocess
 import sys
 
 import requests
+from common.warehouse import get_warehouse, warehouse_backend
 from courses.config import API_HEADERS, API_URL, BIGQUERY_TABLES, PRIMARY_KEYS, PROJECT_ID
 
 
@@ -87,7 +88,7 @@ def check_credentials_file(credentials_path: str = "tokens/gcp_token.json") -> b
 def check_api_connectivity() -> bool:
     """Check if the SkillsFuture course search API is reachable."""
     try:
-        params = {"query": "rows=1&facet=true&facet.mincount=1&json.nl=map&start=0"}
+        params = {"query": "rows=1&json.nl=map&start=0"}
         response = requests.get(API_URL, headers=API_HEADERS, params=params, timeout=10)
         if response.status_code == 200:
             data = response.json()
@@ -105,22 +106,23 @@ def check_api_connectivity() -> bool:
         return False
 
 
-def check_bigquery_connectivity() -> bool:
-    """Check if BigQuery is accessible."""
+def check_warehouse_connectivity() -> bool:
+    """Check if the configured warehouse (BigQuery or local) is accessible."""
+    backend = warehouse_backend()
     try:
-        import pandas_gbq
-
         # Try a simple query to verify connectivity
         test_query = "SELECT 1 as test"
-        result = pandas_gbq.read_gbq(test_query, project_id=PROJECT_ID)
+        result = get_warehouse(PROJECT_ID).read_sql(test_query)
         if len(result) > 0:
-            print(f"✓ BigQuery connection successful (project: {PROJECT_ID})")
+            print(
+                f"✓ {backend} warehouse connection successful (project: {PROJECT_ID})"
+            )
             return True
         else:
-            print("✗ BigQuery query returned no results")
+            print(f"✗ {backend} warehouse query returned no results")
             return False
     except Exception as e:
-        print(f"✗ BigQuery connection failed: {e}")
+        print(f"✗ {backend} warehouse connection failed: {e}")
         return False
 
 
@@ -179,10 +181,16 @@ def run_preflight(
         ("uv Installation", check_uv_installed),
         ("uv Environment", check_uv_environment),
         ("Dependencies", check_dependencies_installed),
-        ("Credentials File", lambda: check_credentials_file(credentials_path)),
+    ]
+    # The local warehouse needs no GCP credentials
+    if warehouse_backend() == "bigquery":
+        checks.append(
+            ("Credentials File", lambda: check_credentials_file(credentials_path))
+        )
+    checks += [
         ("Configuration", check_config),
         ("API Connectivity", check_api_connectivity),
-        ("BigQuery Connectivity", check_bigquery_connectivity),
+        ("Warehouse Connectivity", check_warehouse_connectivity),
     ]
 
     results = []
@@ -0,0 +1,42 @@
+from common.arrow_schema import dataclass_schema
+from common.frame_types import dataclass_dtypes
+from courses.data_models import (
+    CourseInfo,
+    FeaturedInitiatives,
+    LanguageOfInstruction,
+    SkillsFutureInitiatives,
+    TrainingArea,
+)
+
+# Arrow schema of each table, keyed as in BIGQUERY_TABLES
+TABLE_SCHEMAS = {
+    "courses": dataclass_schema(CourseInfo),
+    "training_areas": dataclass_schema(TrainingArea),
+    "languages": dataclass_schema(LanguageOfInstruction),
+    "featured_initiatives": dataclass_schema(FeaturedInitiatives),
+    "skillsfuture_initiatives": dataclass_schema(SkillsFutureInitiatives),
+}
+
+# Typed pandas columns of each table; the remaining columns stay strings
+TABLE_DTYPES = {
+    "courses": dataclass_dtypes(
+        CourseInfo,
+        categorical=[
+            "course_funding_method",
+            "course_duration",
+            "training_partner_name",
+        ],
+    ),
+    "training_areas": dataclass_dtypes(
+        TrainingArea, categorical=["area_of_training_id", "area_of_training_text"]
+    ),
+    "languages": dataclass_dtypes(
+        LanguageOfInstruction, categorical=["language_of_instruction"]
+    ),
+    "featured_initiatives": dataclass_dtypes(
+        FeaturedInitiatives, categorical=["featured_initiatives_tag"]
+    ),
+    "skillsfuture_initiatives": dataclass_dtypes(
+        SkillsFutureInitiatives, categorical=["skillsfuture_initiatives_tag"]
+    ),
+}
@@ -1,98 +1,232 @@
 import argparse
 import os
-from datetime import datetime
+import sys
 
 import pandas as pd
-import pandas_gbq
-from courses.api_client import fetch_course_data
-from courses.config import BIGQUERY_TABLES, PRIMARY_KEYS, PROJECT_ID, QUERY_ROWS
-from courses.data_processing import parse_response_to_dataframes
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.frame_types import conversion_report
+from common.http_client import configure_response_cache, get_client
+from common.response_cache import DEFAULT_CACHE_DIR
+from common.warehouse import (
+    DEFAULT_WAREHOUSE_DIR,
+    WAREHOUSE_BACKENDS,
+    configure_warehouse,
+    get_warehouse,
+    warehouse_backend,
+)
+from courses.api_client import cached_page_sizes
+from courses.checkpoint import (
+    CrawlCheckpoint,
+    read_run_metadata,
+    write_run_metadata,
+)
+from courses.config import (
+    BIGQUERY_TABLES,
+    CHECKPOINT_DIR,
+    CLUSTER_COLUMNS,
+    PARTITION_FACET_FIELD,
+    PRIMARY_KEYS,
+    PROJECT_ID,
+    QUERY_ROWS,
+    RUN_METADATA_PATH,
+    SEARCH_FACETS,
+    SPILL_EVERY_PAGES,
+)
+from courses.crawler import (
+    CrawlInterrupted,
+    crawl_concurrent,
+    crawl_partitioned,
+    crawl_serial,
+)
+from courses.page_size import PageSizeController, RecordedPageSizes
 from courses.preflight import run_preflight
+from courses.schemas import TABLE_DTYPES, TABLE_SCHEMAS
 
 
-def main(start_row_arg=0):
+def main(
+    start_row_arg=0,
+    concurrency=1,
+    max_rps=None,
+    cache_dir=DEFAULT_CACHE_DIR,
+    replay=False,
+    resume=False,
+    spill_every=SPILL_EVERY_PAGES,
+    facets=SEARCH_FACETS,
+    page_size=None,
+    partition_by=None,
+):
     """
     Fetches course data from an API, processes it, and uploads it to BigQuery.
 
+    Crawled pages are checkpointed to local Parquet files every `spill_every`
+    pages. If a page fails, the crawl stops with the completed pages on disk and
+    can be continued with `resume=True`; the checkpoint is removed once every
+    table has been uploaded.
+
     Args:
         start_row_arg (int): The starting row number for data retrieval.
+        concurrency (int): Number of pages fetched in parallel; 1 crawls serially.
+        max_rps (float): Optional ceiling on API requests per second.
+        cache_dir (str): Directory of the raw response cache; None disables it.
+        replay (bool): Serve search pages from the cache instead of the API.
+        resume (bool): Continue the crawl recorded in the checkpoint.
+        spill_every (int): Number of pages held in memory between spills.
+        facets (bool): Request facet counts with each search page.
+        page_size (int): Fixed rows per search page; None tunes it as it crawls.
+        partition_by (str): Facet field to split the crawl by, crawling each
+            value's courses separately and in parallel; None paginates the whole
+            catalogue.
     """
-    all_dataframes = {table: pd.DataFrame() for table in BIGQUERY_TABLES}
+    configure_response_cache(cache_dir, replay=replay)
+    checkpoint = CrawlCheckpoint(
+        CHECKPOINT_DIR,
+        BIGQUERY_TABLES,
+        spill_every,
+        schemas=TABLE_SCHEMAS,
+        dtypes=TABLE_DTYPES,
+    )
 
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
 
-    i = start_row_arg // QUERY_ROWS  # Calculate initial 'i' based on start_row_arg
-
-    while True:
-        start_row = i * QUERY_ROWS
-        response_json = fetch_course_data(start=start_row)
+    if resume:
+        start_row = checkpoint.resume()
+        partition_by = checkpoint.partition_by
+    else:
+        # Align the starting offset to a page boundary
+        start_row = (start_row_arg // QUERY_ROWS) * QUERY_ROWS
+        checkpoint.start(start_row, partition_by=partition_by)
 
-        if not response_json or "grouped" not in response_json:
-            print(f"API call failed or returned unexpected data: {response_json}")
-            break
+    if replay:
+        page_sizes = RecordedPageSizes(cached_page_sizes())
+    elif page_size:
+        page_sizes = PageSizeController(
+            page_size, min_rows=1, max_rows=page_size, adaptive=False
+        )
+    else:
+        # A resumed crawl continues at the size it had settled on, and a new one
+        # starts at the size the last finished crawl settled on
+        page_sizes = PageSizeController(
+            checkpoint.page_size
+            or read_run_metadata(RUN_METADATA_PATH).get("page_size")
+            or QUERY_ROWS
+        )
 
-        course_docs_list = response_json["grouped"]["GroupID"]["groups"]
-        print(f"Adding rows: {len(course_docs_list)}, start row: {start_row}")
+    if partition_by:
+        # Courses spilled before a resume are not added again
+        seen = set(checkpoint.read_table("courses").get("course_reference_number", ()))
+        pages = crawl_partitioned(
+            partition_by,
+            concurrency=concurrency,
+            max_rps=max_rps,
+            facets=facets,
+            page_size=page_sizes,
+            progress=checkpoint.partitions,
+            seen=seen,
+        )
+    # A replay follows the recorded page sizes, which only a serial crawl can do
+    elif concurrency > 1 and not replay:
+        pages = (
+            (None, page)
+            for page in crawl_concurrent(
+                start_row,
+                concurrency=concurrency,
+                max_rps=max_rps,
+                facets=facets,
+                page_size=page_sizes,
+            )
+        )
+    else:
+        pages = (
+            (None, page)
+            for page in crawl_serial(
+                start_row, max_rps=max_rps, facets=facets, page_size=page_sizes
+            )
+        )
 
-        if not course_docs_list:
-            break
+    try:
+        for partition, page in pages:
+            if page is None:
+                checkpoint.finish_partition(partition)
+                continue
+            print(
+                f"Adding rows: {page.group_count}, start row: {page.start_row}"
+                + (f", partition: {partition}" if partition else "")
+            )
 
-        new_dataframes = parse_response_to_dataframes(course_docs_list)
-        for df, table in zip(new_dataframes, BIGQUERY_TABLES):
-            all_dataframes[table] = pd.concat(
-                [all_dataframes[table], df], ignore_index=True
+            checkpoint.add_page(
+                page.start_row,
+                page.group_count,
+                page.dataframes,
+                page_size=None if replay else page_sizes.rows,
+                partition=partition,
             )
-        i += 1
-
-    accessed_at_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for df in all_dataframes.values():
-        df["_accessed_at"] = accessed_at_timestamp
-
-    # Convert specific columns to string before upload
-    if "courses" in all_dataframes:
-        all_dataframes["courses"]["quality_count_respondents"] = all_dataframes[
-            "courses"
-        ]["quality_count_respondents"].astype(str)
-        all_dataframes["courses"]["quality_rating_out_of_5"] = all_dataframes[
-            "courses"
-        ]["quality_rating_out_of_5"].astype(str)
-
-    # Upload DataFrames to BigQuery
-    for table_name, df in all_dataframes.items():
-        pandas_gbq.to_gbq(
-            dataframe=df,
-            destination_table=BIGQUERY_TABLES[table_name],
-            project_id=PROJECT_ID,
-            if_exists="append",
+    except CrawlInterrupted as e:
+        checkpoint.flush()
+        print(f"{e}\nCompleted pages are checkpointed. Rerun with --resume.")
+        raise
+    finally:
+        get_client().print_stats()
+    checkpoint.flush()
+    if checkpoint.page_size:
+        print(f"Page size: {checkpoint.page_size} rows")
+    if checkpoint.page_size and page_sizes.adaptive:
+        # Kept after the checkpoint is cleared, for the next crawl to start from
+        write_run_metadata(
+            RUN_METADATA_PATH,
+            page_size=checkpoint.page_size,
+            pages=checkpoint.state["pages"],
+            partition_by=checkpoint.partition_by,
         )
+    conversion_report.print_summary()
 
-    # Deduplicate the tables
+    # Merge the run into the deduplicated BigQuery tables, one table at a time.
+    # Rows are stamped when they are loaded rather than when they were crawled, so
+    # that pages crawled before a resume are newer than the models' high-water mark
+    loaded_at = pd.Timestamp.now(tz="UTC")
+    warehouse = get_warehouse(PROJECT_ID)
+    failed_tables = []
     for table_name in BIGQUERY_TABLES:
+        df = checkpoint.read_table(table_name)
+        df["_accessed_at"] = loaded_at
         try:
-            df = pandas_gbq.read_gbq(BIGQUERY_TABLES[table_name], project_id=PROJECT_ID)
-
-            before_dedup_rows = len(df)
-
-            df = df.sort_values(by="_accessed_at", ascending=False)
-            df_deduped = df.drop_duplicates(
-                subset=PRIMARY_KEYS[table_name], keep="first"
+            merged_rows = warehouse.upsert(
+                df,
+                BIGQUERY_TABLES[table_name],
+                PRIMARY_KEYS[table_name],
+                schema=TABLE_SCHEMAS[table_name],
+                cluster_by=CLUSTER_COLUMNS[table_name],
             )
-
-            after_dedup_rows = len(df_deduped)
-
-            pandas_gbq.to_gbq(
-                dataframe=df_deduped,
-                destination_table=BIGQUERY_TABLES[table_name],
-                project_id=PROJECT_ID,
-                if_exists="replace",
-            )
-
             print(
-                f"Table {BIGQUERY_TABLES[table_name]}: Before {before_dedup_rows} rows, After {after_dedup_rows} rows. Deduplication complete."
+                f"Table {BIGQUERY_TABLES[table_name]}: {len(df)} rows in run, "
+                f"{merged_rows} rows inserted or updated. Deduplication complete."
             )
         except Exception as e:
+            failed_tables.append(table_name)
             print(f"Error processing table {BIGQUERY_TABLES[table_name]}: {e}")
 
+    if failed_tables:
+        print("Crawl checkpoint kept; rerun with --resume to retry the upload.")
+        raise RuntimeError(
+            f"Upload failed for {', '.join(BIGQUERY_TABLES[t] for t in failed_tables)}"
+        )
+    checkpoint.clear()
+
+
+def migrate_tables(legacy_utc_offset=None):
+    """
+    Rebuilds the course tables partitioned by day, clustered and with a TIMESTAMP
+    `_accessed_at`, skipping tables that already are.
+    """
+    warehouse = get_warehouse(PROJECT_ID)
+    for table_name, table in BIGQUERY_TABLES.items():
+        rebuilt = warehouse.migrate_table(
+            table, CLUSTER_COLUMNS[table_name], legacy_utc_offset
+        )
+        print(f"Table {table}: {'rebuilt' if rebuilt else 'already up to date'}")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -104,6 +238,90 @@ if __name__ == "__main__":
         default=0,
         help="Starting row number for data retrieval.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of pages to fetch in parallel (1 crawls serially).",
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        default=None,
+        help="Maximum number of API requests per second.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last interrupted crawl from its checkpoint.",
+    )
+    parser.add_argument(
+        "--spill-every",
+        type=int,
+        default=SPILL_EVERY_PAGES,
+        help="Pages held in memory before they are checkpointed to disk.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Directory in which raw API responses are cached.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not keep raw API responses.",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Re-run parsing and loading from cached responses without the API.",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=None,
+        help="Fixed number of courses per search request "
+        "(default: tuned automatically).",
+    )
+    parser.add_argument(
+        "--partition-by",
+        nargs="?",
+        const=PARTITION_FACET_FIELD,
+        default=None,
+        metavar="FIELD",
+        help="Split the crawl by the values of a facet field and crawl the parts "
+        f"in parallel (default field: {PARTITION_FACET_FIELD}).",
+    )
+    parser.add_argument(
+        "--facets",
+        action="store_true",
+        help="Request facet counts with each page, as caches recorded before "
+        "facets were switched off expect.",
+    )
+    parser.add_argument(
+        "--warehouse",
+        choices=WAREHOUSE_BACKENDS,
+        default=warehouse_backend(),
+        help="Warehouse to load into: BigQuery, or local Parquet files queried "
+        "with DuckDB.",
+    )
+    parser.add_argument(
+        "--warehouse-dir",
+        default=None,
+        help=f"Directory of the local warehouse (default {DEFAULT_WAREHOUSE_DIR}).",
+    )
+    parser.add_argument(
+        "--migrate-tables",
+        action="store_true",
+        help="Rebuild the course tables partitioned by day and with a TIMESTAMP "
+        "_accessed_at, then exit.",
+    )
+    parser.add_argument(
+        "--legacy-utc-offset",
+        default=None,
+        help="UTC offset, such as +08:00, of string _accessed_at values rebuilt by "
+        "--migrate-tables (default: this machine's).",
+    )
     parser.add_argument(
         "--skip-preflight",
         action="store_true",
@@ -115,12 +333,29 @@ if __name__ == "__main__":
         help="Run preflight checks only without processing data.",
     )
     args = parser.parse_args()
+    configure_warehouse(args.warehouse, args.warehouse_dir)
+
+    if args.migrate_tables:
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
+        migrate_tables(args.legacy_utc_offset)
+        exit(0)
 
     # Run preflight checks
-    if not args.skip_preflight:
+    if not args.skip_preflight and not args.replay:
         run_preflight(exit_on_failure=not args.preflight_only)
         if args.preflight_only:
             print("Preflight checks completed. Exiting.")
             exit(0)
 
-    main(args.start_row)
+    main(
+        args.start_row,
+        concurrency=args.concurrency,
+        max_rps=args.max_rps,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        replay=args.replay,
+        resume=args.resume,
+        spill_every=args.spill_every,
+        facets=args.facets,
+        page_size=args.page_size,
+        partition_by=args.partition_by,
+    )
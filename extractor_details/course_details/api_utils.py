@@ -1,20 +1,40 @@
 import requests
-from course_details.config import BASE_URL, COURSE_DETAIL_URL_TEMPLATE
+from common.http_client import get_client
+from common.json_codec import DecodeError, loads
+from course_details.config import API_HEADERS, BASE_URL, COURSE_DETAIL_URL_TEMPLATE
 
 
-def fetch_course_details(course_reference_number):
+def request_course_details(course_reference_number, max_retries=None):
+    """Sends the course-detail request and returns the raw response."""
     headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36",
-        "X-Requested-With": "XMLHttpRequest",
+        **API_HEADERS,
         "Referer": COURSE_DETAIL_URL_TEMPLATE.format(course_reference_number),
     }
     params = {
         "action": "get-course-by-ref-number",
         "refNumber": course_reference_number,
     }
-    response = requests.get(BASE_URL, headers=headers, params=params)
+    return get_client().get(
+        BASE_URL, headers=headers, params=params, max_retries=max_retries
+    )
+
+
+def cached_course_reference_numbers(start_from=None):
+    """Returns the sorted course reference numbers held in the response cache."""
+    refs = {
+        params["refNumber"]
+        for params in get_client().cache.cached_params(BASE_URL)
+        if "refNumber" in params
+    }
+    return sorted(ref for ref in refs if not start_from or ref >= start_from)
+
+
+def fetch_course_details(course_reference_number):
+    try:
+        response = request_course_details(course_reference_number)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to retrieve data for course {course_reference_number}: {e}")
+        return None
 
     if response.status_code == 200:
         print(f"Data for course {course_reference_number} downloaded")
@@ -24,3 +44,17 @@ def fetch_course_details(course_reference_number):
             f"Failed to retrieve data for course {course_reference_number}: {response.status_code}"
         )
         return None
+
+
+def decode_course_details(response):
+    """Decodes a course-detail response body once and returns its `data` payload."""
+    if response is None or response.status_code != 200:
+        return None
+    try:
+        payload = loads(response.content)
+    except DecodeError as e:
+        print(f"Invalid JSON in course-detail response: {e}")
+        return None
+    if not isinstance(payload, dict) or "data" not in payload:
+        return None
+    return payload.get("data", {})
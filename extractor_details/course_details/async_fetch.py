@@ -0,0 +1,187 @@
+"""Asyncio fetch engine for course details with AIMD concurrency control."""
+
+import asyncio
+import heapq
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import requests
+from course_details.api_utils import decode_course_details, request_course_details
+
+CONGESTION_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease limit on requests in flight.
+
+    The limit grows by roughly one request per window of successful responses while
+    latency stays under `latency_target` and the recent error rate under
+    `max_error_rate`, and is cut by `decrease_factor` on 429s, 5xx and timeouts. At
+    most one cut is applied per `cooldown` seconds so that a burst of throttled
+    responses from the same window only backs off once.
+    """
+
+    limit: float = 4.0
+    min_limit: int = 1
+    max_limit: int = 32
+    latency_target: float = 2.0
+    max_error_rate: float = 0.05
+    decrease_factor: float = 0.5
+    cooldown: float = 2.0
+    window: int = 50
+    _outcomes: deque = field(default_factory=deque, repr=False)
+    _last_decrease: float = field(default=0.0, repr=False)
+
+    @property
+    def current(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _observe(self, ok: bool) -> None:
+        self._outcomes.append(ok)
+        if len(self._outcomes) > self.window:
+            self._outcomes.popleft()
+
+    def on_success(self, latency: float) -> None:
+        self._observe(True)
+        if latency <= self.latency_target and self.error_rate <= self.max_error_rate:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.current)
+
+    def on_congestion(self) -> None:
+        self._observe(False)
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self._last_decrease = now
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    retry_after = response.headers.get("Retry-After")
+    return float(retry_after) if retry_after and retry_after.isdigit() else None
+
+
+def _fetch_one(course_reference_number):
+    """
+    Runs in a worker thread; returns (outcome, payload, latency, retry_after), where
+    `retry_after` is the delay a throttled response asked for, if any.
+    """
+    start_time = time.monotonic()
+    try:
+        response = request_course_details(course_reference_number, max_retries=0)
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+        return "congestion", None, time.monotonic() - start_time, None
+    except requests.exceptions.RequestException:
+        return "failed", None, time.monotonic() - start_time, None
+
+    latency = time.monotonic() - start_time
+    if response.status_code in CONGESTION_STATUS_CODES:
+        return "congestion", None, latency, _retry_after_seconds(response)
+    if response.status_code != 200:
+        return "failed", None, latency, None
+    payload = decode_course_details(response)
+    # Invalid JSON or a body without `data` is returned to the caller as a failure
+    if payload is None:
+        return "failed", None, latency, None
+    return "ok", payload, latency, None
+
+
+def retry_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    backoff_base: float = 0.5,
+    backoff_max: float = 30.0,
+) -> float:
+    """
+    Seconds to wait before retrying a congested request: the longer of the
+    server's Retry-After and exponential backoff, plus jitter.
+    """
+    delay = min(backoff_max, max(retry_after or 0.0, backoff_base * 2**attempt))
+    return delay + random.uniform(0, backoff_base)
+
+
+async def fetch_course_details_async(
+    course_reference_numbers: List[str],
+    on_course_detail: Callable[[dict], None],
+    controller: AIMDController = None,
+    max_attempts: int = 5,
+) -> List[str]:
+    """
+    Fetches course details concurrently, handing each payload to `on_course_detail`.
+
+    Requests run in a thread pool on the shared HTTP client with its own retries
+    disabled, so throttling is visible to the AIMD controller. Congested requests
+    are re-queued until `max_attempts`, each only after its `retry_delay` has
+    passed; the callback runs on the event loop as each response arrives, so
+    parsing overlaps with the requests still in flight.
+
+    Returns:
+        Course reference numbers that could not be fetched.
+    """
+    controller = controller or AIMDController()
+    loop = asyncio.get_running_loop()
+    pending = deque((ref, 1) for ref in course_reference_numbers)
+    # Congested requests waiting out their backoff, as (ready at, ref, attempt)
+    backing_off = []
+    in_flight = {}
+    failed = []
+    completed = 0
+    total = len(course_reference_numbers)
+    start_time = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=controller.max_limit) as executor:
+        while pending or in_flight or backing_off:
+            while backing_off and backing_off[0][0] <= time.monotonic():
+                _, ref, attempt = heapq.heappop(backing_off)
+                pending.append((ref, attempt))
+            while pending and len(in_flight) < controller.current:
+                ref, attempt = pending.popleft()
+                future = loop.run_in_executor(executor, _fetch_one, ref)
+                in_flight[future] = (ref, attempt)
+
+            next_ready = (
+                max(0.0, backing_off[0][0] - time.monotonic()) if backing_off else None
+            )
+            if not in_flight:
+                await asyncio.sleep(next_ready)
+                continue
+            done, _ = await asyncio.wait(
+                in_flight, timeout=next_ready, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                ref, attempt = in_flight.pop(future)
+                outcome, payload, latency, retry_after = future.result()
+
+                if outcome == "congestion":
+                    controller.on_congestion()
+                    if attempt < max_attempts:
+                        ready_at = time.monotonic() + retry_delay(attempt, retry_after)
+                        heapq.heappush(backing_off, (ready_at, ref, attempt + 1))
+                        continue
+                    failed.append(ref)
+                elif outcome == "failed":
+                    failed.append(ref)
+                else:
+                    controller.on_success(latency)
+                    on_course_detail(payload)
+
+                completed += 1
+                if completed % 100 == 0 or completed == total:
+                    elapsed = time.monotonic() - start_time
+                    print(
+                        f"Fetched {completed}/{total} courses in {elapsed:.1f}s "
+                        f"(concurrency {controller.current}, "
+                        f"error rate {controller.error_rate:.0%})"
+                    )
+
+    return failed
@@ -2,6 +2,12 @@
 PROJECT_ID = "jeremy-chia"
 BASE_URL = "https://www.myskillsfuture.gov.sg/services/tex/individual/course-detail"
 COURSE_DETAIL_URL_TEMPLATE = "https://www.myskillsfuture.gov.sg/content/portal/en/training-exchange/course-directory/course-detail.html?courseReferenceNumber={}"
+API_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36",
+    "X-Requested-With": "XMLHttpRequest",
+}
 CHUNK_SIZE = 100
 PRIMARY_KEY = {
     "sg_skillsfuture.course_details": ["course_reference_number"],
@@ -13,3 +19,51 @@ PRIMARY_KEY = {
     ],
     "sg_skillsfuture.course_runs": ["course_run_id"],
 }
+# Tables are partitioned by the day of _accessed_at and clustered by these columns
+CLUSTER_COLUMNS = {
+    "sg_skillsfuture.course_details": ["course_reference_number"],
+    "sg_skillsfuture.trainers": ["course_reference_number", "course_run_id"],
+    "sg_skillsfuture.job_roles": ["course_reference_number"],
+    "sg_skillsfuture.mode_of_trainings": ["course_reference_number"],
+    "sg_skillsfuture.course_runs": ["course_reference_number", "course_run_id"],
+    "sg_skillsfuture.course_detail_fingerprints": ["course_reference_number"],
+    "sg_skillsfuture.course_detail_shard_runs": ["run_id"],
+}
+# Tables in the order returned by CourseDetailRows.to_dataframes
+DETAIL_TABLES = [
+    "sg_skillsfuture.course_details",
+    "sg_skillsfuture.trainers",
+    "sg_skillsfuture.job_roles",
+    "sg_skillsfuture.mode_of_trainings",
+    "sg_skillsfuture.course_runs",
+]
+
+# Incremental refresh: course-search columns whose changes trigger a detail re-fetch
+FINGERPRINT_TABLE = "sg_skillsfuture.course_detail_fingerprints"
+FINGERPRINT_COLUMNS = [
+    "course_title",
+    "course_created_date",
+    "course_nearest_start_date",
+    "course_funding_method",
+    "course_duration",
+    "course_fees",
+    "quality_count_respondents",
+    "quality_rating_out_of_5",
+    "training_partner_uen",
+    "training_partner_name",
+]
+DETAIL_TTL_DAYS = 7
+
+# Parsed chunks are spilled here and merged into the tables every
+# DETAIL_SPILL_MERGE_CHUNKS chunks, while later chunks are fetched
+DETAIL_SPILL_DIR = ".crawl_checkpoint/course_details"
+DETAIL_SPILL_MERGE_CHUNKS = 20
+
+# Shared work queue for multi-worker runs (--work-queue)
+WORK_QUEUE_PATH = ".work_queue/course_details.sqlite"
+WORK_QUEUE_LEASE_SECONDS = 600
+# Leases a course may expire before it is failed rather than leased again
+WORK_QUEUE_MAX_ATTEMPTS = 3
+
+# Sharded runs (--shard-index/--shard-count): one row per finished shard
+SHARD_RUNS_TABLE = "sg_skillsfuture.course_detail_shard_runs"
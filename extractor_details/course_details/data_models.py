@@ -1,22 +1,24 @@
 from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class ModeOfTraining:
     course_reference_number: str
     mode_of_training_description: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CourseRun:
     course_reference_number: str
     course_run_id: str
-    course_run_start_date: str
-    course_run_end_date: str
-    registration_start_date: str
-    registration_end_date: str
+    course_run_start_date: Optional[datetime]
+    course_run_end_date: Optional[datetime]
+    registration_start_date: Optional[datetime]
+    registration_end_date: Optional[datetime]
     course_run_training_mode: str
-    course_intake_size: str
+    course_intake_size: Optional[int]
     address_block: str
     address_street: str
     address_floor: str
@@ -26,7 +28,7 @@ class CourseRun:
     address_room: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Trainer:
     course_reference_number: str
     course_run_id: str
@@ -41,21 +43,21 @@ class Trainer:
     trainer_experience: str
 
 
-@dataclass
+@dataclass(slots=True)
 class JobRoleCourseDetails:
     course_reference_number: str
     job_role: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CourseDetails:
     course_reference_number: str
     course_title: str
     course_objective: str
     course_content: str
     entry_requirement: str
-    training_days: str
-    training_duration_hours: str
-    count_attendees: str
+    training_days: Optional[int]
+    training_duration_hours: Optional[float]
+    count_attendees: Optional[int]
     qualification_attained_id: str
     qualification_attained_name: str
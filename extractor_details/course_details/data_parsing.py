@@ -1,3 +1,6 @@
+from common.columnar import ColumnBuilder
+from common.frame_types import apply_column_types
+from course_details.config import DETAIL_TABLES
 from course_details.data_models import (
     CourseDetails,
     CourseRun,
@@ -5,6 +8,17 @@ from course_details.data_models import (
     ModeOfTraining,
     Trainer,
 )
+from course_details.schemas import DETAIL_TABLE_DTYPES
+
+
+def _mode_of_training_descriptions(course_detail_dict):
+    mode_of_trainings = course_detail_dict.get("modeOfTrainings", [])
+    if not isinstance(mode_of_trainings, list):
+        return []
+    return [
+        training_mode.get("description", "") if isinstance(training_mode, dict) else ""
+        for training_mode in mode_of_trainings
+    ]
 
 
 def parse_mode_of_trainings(course_detail_dict):
@@ -13,19 +27,84 @@ def parse_mode_of_trainings(course_detail_dict):
         course_detail_dict = {}
 
     course_reference_number = course_detail_dict.get("courseReferenceNumber", "")
-    mode_of_trainings = course_detail_dict.get("modeOfTrainings", [])
-
-    if not isinstance(mode_of_trainings, list):
-        mode_of_trainings = []
-
     return [
         ModeOfTraining(
             course_reference_number=course_reference_number,
-            mode_of_training_description=training_mode.get("description", "")
-            if isinstance(training_mode, dict)
-            else "",
+            mode_of_training_description=description,
         )
-        for training_mode in mode_of_trainings
+        for description in _mode_of_training_descriptions(course_detail_dict)
+    ]
+
+
+COURSE_RUN_COLUMNS = ColumnBuilder.for_dataclass(CourseRun).columns
+TRAINER_COLUMNS = ColumnBuilder.for_dataclass(Trainer).columns
+
+
+def _course_run_values(course_reference_number, course_run):
+    """Returns a course run's values in the column order of `CourseRun`."""
+    return (
+        course_reference_number,
+        course_run.get("courseRunId", ""),
+        course_run.get("courseStartDate", ""),
+        course_run.get("courseEndDate", ""),
+        course_run.get("registrationOpeningDate", ""),
+        course_run.get("registrationClosingDate", ""),
+        course_run.get("modeOfTraining", ""),
+        course_run.get("intakeSize", ""),
+        course_run.get("block", ""),
+        course_run.get("street", ""),
+        course_run.get("floor", ""),
+        course_run.get("unit", ""),
+        course_run.get("building", ""),
+        course_run.get("postalCode", ""),
+        course_run.get("room", ""),
+    )
+
+
+def _parse_course_run(course_reference_number, course_run):
+    return dict(
+        zip(COURSE_RUN_COLUMNS, _course_run_values(course_reference_number, course_run))
+    )
+
+
+def _run_trainer_values(course_reference_number, course_run):
+    """Returns the trainers of a course run as value tuples in `Trainer` order."""
+    link_course_run_trainer = course_run.get("linkCourseRunTrainer", [])
+    if not isinstance(link_course_run_trainer, list):
+        return []
+
+    trainer_list = []
+    for trainer in link_course_run_trainer:
+        if not isinstance(trainer, dict):
+            continue
+
+        trainer_dict = trainer.get("trainer", {})
+        if not isinstance(trainer_dict, dict):
+            trainer_dict = {}
+
+        trainer_list.append(
+            (
+                course_reference_number,
+                course_run.get("courseRunId", ""),
+                trainer_dict.get("trainerId", ""),
+                trainer_dict.get("idNumber", ""),
+                trainer_dict.get("idTypeCode", ""),
+                trainer_dict.get("uuid", ""),
+                trainer_dict.get("name", ""),
+                trainer_dict.get("email", ""),
+                trainer_dict.get("domainAreaOfPractice", ""),
+                trainer_dict.get("qualificationLevel", ""),
+                trainer_dict.get("experience", ""),
+            )
+        )
+
+    return trainer_list
+
+
+def _parse_run_trainers(course_reference_number, course_run):
+    return [
+        dict(zip(TRAINER_COLUMNS, values))
+        for values in _run_trainer_values(course_reference_number, course_run)
     ]
 
 
@@ -40,31 +119,11 @@ def parse_course_runs(course_detail_dict):
     if not isinstance(course_run_list, list):
         course_run_list = []
 
-    course_runs = []
-    for course_run in course_run_list:
-        if not isinstance(course_run, dict):
-            continue
-
-        course_run_instance = {
-            "course_reference_number": course_reference_number,
-            "course_run_id": course_run.get("courseRunId", ""),
-            "course_run_start_date": course_run.get("courseStartDate", ""),
-            "course_run_end_date": course_run.get("courseEndDate", ""),
-            "registration_start_date": course_run.get("registrationOpeningDate", ""),
-            "registration_end_date": course_run.get("registrationClosingDate", ""),
-            "course_run_training_mode": course_run.get("modeOfTraining", ""),
-            "course_intake_size": course_run.get("intakeSize", ""),
-            "address_block": course_run.get("block", ""),
-            "address_street": course_run.get("street", ""),
-            "address_floor": course_run.get("floor", ""),
-            "address_unit": course_run.get("unit", ""),
-            "address_building": course_run.get("building", ""),
-            "address_postal_code": course_run.get("postalCode", ""),
-            "address_room": course_run.get("room", ""),
-        }
-        course_runs.append(course_run_instance)
-
-    return course_runs
+    return [
+        _parse_course_run(course_reference_number, course_run)
+        for course_run in course_run_list
+        if isinstance(course_run, dict)
+    ]
 
 
 def parse_trainers(course_detail_dict):
@@ -82,35 +141,7 @@ def parse_trainers(course_detail_dict):
     for course_run in course_runs:
         if not isinstance(course_run, dict):
             continue
-
-        link_course_run_trainer = course_run.get("linkCourseRunTrainer", [])
-        if not isinstance(link_course_run_trainer, list):
-            continue
-
-        for trainer in link_course_run_trainer:
-            if not isinstance(trainer, dict):
-                continue
-
-            trainer_dict = trainer.get("trainer", {})
-            if not isinstance(trainer_dict, dict):
-                trainer_dict = {}
-
-            trainer_instance = {
-                "course_reference_number": course_reference_number,
-                "course_run_id": course_run.get("courseRunId", ""),
-                "trainer_id": trainer_dict.get("trainerId", ""),
-                "trainer_id_number": trainer_dict.get("idNumber", ""),
-                "trainer_id_type_code": trainer_dict.get("idTypeCode", ""),
-                "trainer_uuid": trainer_dict.get("uuid", ""),
-                "trainer_name": trainer_dict.get("name", ""),
-                "trainer_email": trainer_dict.get("email", ""),
-                "trainer_practice_area": trainer_dict.get("domainAreaOfPractice", ""),
-                "trainer_qualification_level": trainer_dict.get(
-                    "qualificationLevel", ""
-                ),
-                "trainer_experience": trainer_dict.get("experience", ""),
-            }
-            trainer_list.append(trainer_instance)
+        trainer_list.extend(_parse_run_trainers(course_reference_number, course_run))
 
     return trainer_list
 
@@ -121,42 +152,101 @@ def parse_job_roles(course_detail_dict):
         course_detail_dict = {}
 
     course_reference_number = course_detail_dict.get("courseReferenceNumber", "")
-    relevant_job_roles = course_detail_dict.get("relevantJobRoles", "")
-
-    if not isinstance(relevant_job_roles, str):
-        relevant_job_roles = ""
-
-    job_roles = [role.strip() for role in relevant_job_roles.split(",") if role.strip()]
-
     return [
         JobRoleCourseDetails(
             course_reference_number=course_reference_number, job_role=role
         )
-        for role in job_roles
+        for role in _job_roles(course_detail_dict)
     ]
 
 
+def _job_roles(course_detail_dict):
+    relevant_job_roles = course_detail_dict.get("relevantJobRoles", "")
+    if not isinstance(relevant_job_roles, str):
+        return []
+    return [role.strip() for role in relevant_job_roles.split(",") if role.strip()]
+
+
 def parse_course_details(course_detail_dict):
     """Parse course details and return the CourseDetails dataclass, handling None values safely."""
     if not isinstance(course_detail_dict, dict):
         course_detail_dict = {}
 
+    return CourseDetails(*_course_details_values(course_detail_dict))
+
+
+def _course_details_values(course_detail_dict):
+    """Returns a course's detail values in the field order of `CourseDetails`."""
     qualification_attained = course_detail_dict.get("qualificationAttained", {})
     if not isinstance(qualification_attained, dict):
         qualification_attained = {}
 
-    course_details = CourseDetails(
-        course_reference_number=course_detail_dict.get("courseReferenceNumber", ""),
-        course_title=course_detail_dict.get("courseTitle", ""),
-        course_objective=course_detail_dict.get("courseObjective", ""),
-        course_content=course_detail_dict.get("courseContent", ""),
-        entry_requirement=course_detail_dict.get("entryRequirement", ""),
-        training_days=course_detail_dict.get("numberOfTrainingDay", ""),
-        training_duration_hours=course_detail_dict.get("totalTrainingDurationHour", ""),
-        count_attendees=course_detail_dict.get("courseAttendeeCount", ""),
-        qualification_attained_id=qualification_attained.get(
-            "qualificationAttainedCode", ""
-        ),
-        qualification_attained_name=qualification_attained.get("description", ""),
+    return (
+        course_detail_dict.get("courseReferenceNumber", ""),
+        course_detail_dict.get("courseTitle", ""),
+        course_detail_dict.get("courseObjective", ""),
+        course_detail_dict.get("courseContent", ""),
+        course_detail_dict.get("entryRequirement", ""),
+        course_detail_dict.get("numberOfTrainingDay", ""),
+        course_detail_dict.get("totalTrainingDurationHour", ""),
+        course_detail_dict.get("courseAttendeeCount", ""),
+        qualification_attained.get("qualificationAttainedCode", ""),
+        qualification_attained.get("description", ""),
     )
-    return course_details
+
+
+class CourseDetailRows:
+    """
+    Collects the rows of the five course-detail tables as payloads arrive.
+
+    Values go straight into per-column lists, and `courseRuns` is walked once per
+    payload for both the course run and the trainer rows.
+    """
+
+    def __init__(self):
+        self.courses = ColumnBuilder.for_dataclass(CourseDetails)
+        self.trainers = ColumnBuilder.for_dataclass(Trainer)
+        self.job_roles = ColumnBuilder.for_dataclass(JobRoleCourseDetails)
+        self.mode_of_trainings = ColumnBuilder.for_dataclass(ModeOfTraining)
+        self.course_runs = ColumnBuilder.for_dataclass(CourseRun)
+
+    def add(self, course_detail_dict):
+        if not isinstance(course_detail_dict, dict):
+            course_detail_dict = {}
+
+        course_reference_number = course_detail_dict.get("courseReferenceNumber", "")
+        self.courses.append(*_course_details_values(course_detail_dict))
+        self.mode_of_trainings.extend_keyed(
+            course_reference_number, _mode_of_training_descriptions(course_detail_dict)
+        )
+        self.job_roles.extend_keyed(
+            course_reference_number, _job_roles(course_detail_dict)
+        )
+
+        course_run_list = course_detail_dict.get("courseRuns", [])
+        if not isinstance(course_run_list, list):
+            return
+        for course_run in course_run_list:
+            if not isinstance(course_run, dict):
+                continue
+            self.course_runs.append(
+                *_course_run_values(course_reference_number, course_run)
+            )
+            for trainer_values in _run_trainer_values(
+                course_reference_number, course_run
+            ):
+                self.trainers.append(*trainer_values)
+
+    def to_dataframes(self):
+        """Returns typed DataFrames in the order of `config.DETAIL_TABLES`."""
+        dataframes = (
+            self.courses.to_dataframe(),
+            self.trainers.to_dataframe(),
+            self.job_roles.to_dataframe(),
+            self.mode_of_trainings.to_dataframe(),
+            self.course_runs.to_dataframe(),
+        )
+        return tuple(
+            apply_column_types(df, DETAIL_TABLE_DTYPES[table_name], table_name)
+            for df, table_name in zip(dataframes, DETAIL_TABLES)
+        )
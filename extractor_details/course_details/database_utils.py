@@ -1,8 +1,22 @@
-from datetime import datetime
+import glob
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
 
-import pandas_gbq
-from course_details.config import PROJECT_ID
+import pandas as pd
+import pyarrow.parquet as pq
+from common.arrow_schema import merge_schemas, to_arrow_table
+from common.frame_types import conversion_report
+from common.warehouse import get_warehouse
+from course_details.config import CLUSTER_COLUMNS, PRIMARY_KEY, PROJECT_ID
+from course_details.schemas import DETAIL_TABLE_SCHEMAS
 
+# Records the process that owns a spill directory
+SPILL_OWNER_FILE = "owner.pid"
+_SPILLED_TABLES = {name.split(".")[-1]: name for name in DETAIL_TABLE_SCHEMAS}
 
 def get_course_reference_numbers(start_from_course_reference_number=None):
     sql = """SELECT DISTINCT course_reference_number FROM `jeremy-chia.sg_skillsfuture.courses`"""
@@ -11,17 +25,165 @@ def get_course_reference_numbers(start_from_course_reference_number=None):
             f" WHERE course_reference_number >= '{start_from_course_reference_number}'"
         )
     sql += " ORDER BY course_reference_number"
-    return list(
-        pandas_gbq.read_gbq(sql, project_id=PROJECT_ID)["course_reference_number"]
-    )
+    return list(get_warehouse(PROJECT_ID).read_sql(sql)["course_reference_number"])
+
 
+def upload_to_gbq(dataframe, table_name, destination=None):
+    """
+    Merges a run's rows into `table_name`, keeping the latest row per primary key.
 
-def upload_to_gbq(dataframe, table_name):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    dataframe["_accessed_at"] = timestamp
-    pandas_gbq.to_gbq(
-        dataframe=dataframe,
-        destination_table=table_name,
-        project_id=PROJECT_ID,
-        if_exists="append",
+    `destination` writes the rows to another table with the same primary key,
+    such as a shard's own copy of `table_name`.
+    """
+    destination = destination or table_name
+    dataframe["_accessed_at"] = datetime.now(timezone.utc)
+    merged_rows = get_warehouse(PROJECT_ID).upsert(
+        dataframe,
+        destination,
+        PRIMARY_KEY[table_name],
+        schema=DETAIL_TABLE_SCHEMAS[table_name],
+        cluster_by=CLUSTER_COLUMNS[table_name],
     )
+    print(f"Table {destination}: {merged_rows} rows inserted or updated.")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def spill_in_use(directory: str) -> bool:
+    """Whether another live process owns the spill in `directory`."""
+    try:
+        with open(os.path.join(directory, SPILL_OWNER_FILE)) as f:
+            owner = int(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return False
+    return owner != os.getpid() and _process_alive(owner)
+
+
+class DetailSpill:
+    """
+    Collects a run's parsed chunks as Parquet files, one per chunk and table, so
+    that each table is merged into the warehouse once per upload instead of once
+    per chunk. Chunks of different tables may be added from different threads.
+
+    Spill files stay on disk until their table has been merged, so the chunks of
+    a run that crashed, or whose merge failed, are picked up by the next spill
+    opened on the same directory. A directory belongs to one live process at a
+    time.
+    """
+
+    def __init__(self, directory: str):
+        if spill_in_use(directory):
+            raise RuntimeError(f"Spill {directory} is in use by another process")
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, SPILL_OWNER_FILE), "w") as f:
+            f.write(str(os.getpid()))
+        # Next chunk index of each table, after any chunks already on disk
+        self._chunks = {}
+        for path in glob.glob(os.path.join(directory, "*.parquet")):
+            table, index = os.path.basename(path)[: -len(".parquet")].rsplit("-", 1)
+            table_name = _SPILLED_TABLES[table]
+            self._chunks[table_name] = max(
+                self._chunks.get(table_name, 0), int(index) + 1
+            )
+
+    def _prefix(self, table_name: str) -> str:
+        return os.path.join(self.directory, table_name.split(".")[-1])
+
+    def _paths(self, table_name: str) -> List[str]:
+        return sorted(glob.glob(f"{self._prefix(table_name)}-*.parquet"))
+
+    def add(self, dataframe: pd.DataFrame, table_name: str) -> None:
+        if dataframe.empty:
+            return
+        with self._lock:
+            index = self._chunks.get(table_name, 0)
+            self._chunks[table_name] = index + 1
+        pq.write_table(
+            to_arrow_table(
+                dataframe,
+                merge_schemas(DETAIL_TABLE_SCHEMAS[table_name]),
+                table_name,
+                conversion_report,
+            ),
+            f"{self._prefix(table_name)}-{index:05d}.parquet",
+        )
+
+    @property
+    def empty(self) -> bool:
+        return not glob.glob(os.path.join(self.directory, "*.parquet"))
+
+    def read_table(self, table_name: str) -> pd.DataFrame:
+        return _read_parquet_files(self._paths(table_name))
+
+    def upload(self, destination: Optional[Callable[[str], str]] = None) -> None:
+        """
+        Merges every spilled table into the warehouse, or into `destination(table)`
+        when given, with the tables merged in parallel. A table's spill files are
+        removed once it has been merged; those of tables whose merge failed are
+        kept for the next upload, and a RuntimeError naming them is raised once
+        every table has been tried.
+        """
+        failures = {}
+
+        def merge(table_name, paths):
+            try:
+                upload_to_gbq(
+                    _read_parquet_files(paths),
+                    table_name,
+                    destination(table_name) if destination else None,
+                )
+            except Exception as e:
+                print(f"Table {table_name}: merge failed, spill kept: {e}")
+                failures[table_name] = e
+                return
+            for path in paths:
+                os.remove(path)
+
+        # Chunks added while the tables merge are left for the next upload
+        tables = {table: self._paths(table) for table in sorted(self._chunks)}
+        tables = {table: paths for table, paths in tables.items() if paths}
+        if not tables:
+            return
+        with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+            for table_name, paths in tables.items():
+                executor.submit(merge, table_name, paths)
+        if failures:
+            raise RuntimeError(
+                f"Merging the spill in {self.directory} failed for "
+                + ", ".join(f"{table}: {e!r}" for table, e in failures.items())
+            )
+
+    def close(self) -> None:
+        """Removes the spill, unless it still holds chunks that were not merged."""
+        if self.empty:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        else:
+            os.remove(os.path.join(self.directory, SPILL_OWNER_FILE))
+            print(f"Unmerged chunks kept in {self.directory} for the next run")
+
+
+def _read_parquet_files(paths: List[str]) -> pd.DataFrame:
+    return pd.concat((pd.read_parquet(path) for path in paths), ignore_index=True)
+
+
+def migrate_tables(table_names, legacy_utc_offset=None):
+    """
+    Rebuilds tables partitioned by day, clustered and with a TIMESTAMP
+    `_accessed_at`, skipping tables that already are.
+    """
+    warehouse = get_warehouse(PROJECT_ID)
+    for table_name in table_names:
+        rebuilt = warehouse.migrate_table(
+            table_name, CLUSTER_COLUMNS[table_name], legacy_utc_offset
+        )
+        print(f"Table {table_name}: {'rebuilt' if rebuilt else 'already up to date'}")
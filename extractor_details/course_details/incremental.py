@@ -0,0 +1,97 @@
+"""Selects the courses whose details need re-fetching on an incremental run."""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from common.warehouse import get_warehouse
+from course_details.config import (
+    CLUSTER_COLUMNS,
+    DETAIL_TTL_DAYS,
+    FINGERPRINT_COLUMNS,
+    FINGERPRINT_TABLE,
+    PROJECT_ID,
+)
+
+
+def fingerprint_courses(courses_df):
+    """Hashes the fingerprint columns of each course-search row."""
+    values = courses_df[FINGERPRINT_COLUMNS].astype(str).agg("\x1f".join, axis=1)
+    return values.map(lambda value: hashlib.md5(value.encode()).hexdigest())
+
+
+def select_courses_to_refresh(ttl_days=DETAIL_TTL_DAYS):
+    """
+    Returns course reference numbers to re-fetch and their current fingerprints.
+
+    A course is selected when it has never been fetched, when its course-search
+    fingerprint (nearest start date, fees, ratings and so on) differs from the one
+    recorded at its last fetch, or when that fetch is older than `ttl_days`.
+
+    Returns:
+        (sorted list of course reference numbers, dict of reference -> fingerprint)
+    """
+    warehouse = get_warehouse(PROJECT_ID)
+    columns = ", ".join(["course_reference_number"] + FINGERPRINT_COLUMNS)
+    courses_df = warehouse.read_sql(
+        f"""SELECT {columns} FROM `jeremy-chia.sg_skillsfuture.courses`
+        WHERE true
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY course_reference_number ORDER BY _accessed_at DESC
+        ) = 1"""
+    )
+    courses_df["fingerprint"] = fingerprint_courses(courses_df)
+
+    if warehouse.table_exists(FINGERPRINT_TABLE):
+        state_df = warehouse.read_sql(
+            f"""SELECT course_reference_number, fingerprint AS last_fingerprint,
+            _accessed_at AS last_fetched_at
+            FROM `{PROJECT_ID}.{FINGERPRINT_TABLE}`"""
+        )
+    else:
+        state_df = pd.DataFrame(
+            columns=["course_reference_number", "last_fingerprint", "last_fetched_at"]
+        )
+
+    merged = courses_df.merge(state_df, on="course_reference_number", how="left")
+    last_fetched_at = pd.to_datetime(
+        merged["last_fetched_at"], errors="coerce", utc=True
+    )
+    is_new = merged["last_fingerprint"].isna()
+    is_changed = ~is_new & (merged["fingerprint"] != merged["last_fingerprint"])
+    is_stale = ~is_new & ~is_changed & (
+        last_fetched_at < datetime.now(timezone.utc) - timedelta(days=ttl_days)
+    )
+    selected = merged[is_new | is_changed | is_stale].sort_values(
+        "course_reference_number"
+    )
+
+    print(
+        f"Incremental refresh: {is_new.sum()} new, {is_changed.sum()} changed, "
+        f"{is_stale.sum()} older than {ttl_days} days, "
+        f"{len(selected)} of {len(merged)} courses to fetch"
+    )
+    return (
+        list(selected["course_reference_number"]),
+        dict(zip(selected["course_reference_number"], selected["fingerprint"])),
+    )
+
+
+def record_fingerprints(
+    course_reference_numbers, fingerprints, table=FINGERPRINT_TABLE
+):
+    """Records the fingerprints of successfully fetched courses."""
+    fetched = [ref for ref in course_reference_numbers if ref in fingerprints]
+    state_df = pd.DataFrame(
+        {
+            "course_reference_number": fetched,
+            "fingerprint": [fingerprints[ref] for ref in fetched],
+            "_accessed_at": datetime.now(timezone.utc),
+        }
+    )
+    get_warehouse(PROJECT_ID).upsert(
+        state_df,
+        table,
+        ["course_reference_number"],
+        cluster_by=CLUSTER_COLUMNS[FINGERPRINT_TABLE],
+    )
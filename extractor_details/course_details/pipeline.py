@@ -0,0 +1,182 @@
+"""Pipelined fetch, parse, spill and merge of course-detail chunks."""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    queue_depths: List[int] = field(default_factory=list)
+
+    def utilisation(self, wall_seconds: float) -> float:
+        return self.busy_seconds / wall_seconds if wall_seconds else 0.0
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    """Blocks until `item` is queued, giving up once another stage has failed."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(
+    chunks: Iterable[list],
+    fetch_chunk: Callable[[list], list],
+    parse_chunk: Callable[[list], tuple],
+    spill_table: Callable,
+    table_names: List[str],
+    queue_size: int = 2,
+    on_chunk_spilled: Optional[Callable[[tuple], None]] = None,
+    merge_spill: Optional[Callable[[], None]] = None,
+    merge_every: int = 1,
+) -> List[StageStats]:
+    """
+    Runs fetch, parse and upload as concurrent stages joined by bounded queues.
+
+    The upload stage spills the DataFrames of each chunk to their tables in
+    parallel, and every `merge_every` chunks, and once at the end, calls
+    `merge_spill` to merge the spilled chunks into the warehouse. Later chunks are
+    fetched and parsed while a merge runs. `queue_size` bounds how many chunks
+    may wait between stages, which caps memory when one stage is slower than the
+    others.
+
+    Args:
+        chunks: Lists of course reference numbers.
+        fetch_chunk: Returns the course-detail payloads for one chunk.
+        parse_chunk: Turns a chunk's payloads into one DataFrame per table.
+        spill_table: Called as `spill_table(dataframe, table_name)`.
+        table_names: Destination tables, in the order returned by `parse_chunk`.
+        queue_size: Maximum chunks waiting in each queue.
+        on_chunk_spilled: Called with a chunk's DataFrames once all are spilled.
+        merge_spill: Merges the chunks spilled so far into the warehouse.
+        merge_every: Chunks spilled between merges.
+
+    Returns:
+        Statistics for the fetch and parse stages, and for the spill writes and
+        warehouse merges of the upload stage.
+    """
+    fetched = queue.Queue(maxsize=queue_size)
+    parsed = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    fetch_stats = StageStats("fetch")
+    parse_stats = StageStats("parse")
+    spill_stats = StageStats("spill")
+    merge_stats = StageStats("merge")
+
+    def fetch_stage():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                start_time = time.monotonic()
+                payloads = fetch_chunk(chunk)
+                fetch_stats.busy_seconds += time.monotonic() - start_time
+                fetch_stats.items += 1
+                _put(fetched, payloads, stop)
+                fetch_stats.queue_depths.append(fetched.qsize())
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(fetched, _DONE, stop)
+
+    def parse_stage():
+        try:
+            while (payloads := _get(fetched, stop)) is not _DONE:
+                start_time = time.monotonic()
+                dataframes = parse_chunk(payloads)
+                parse_stats.busy_seconds += time.monotonic() - start_time
+                parse_stats.items += 1
+                _put(parsed, dataframes, stop)
+                parse_stats.queue_depths.append(parsed.qsize())
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(parsed, _DONE, stop)
+
+    pipeline_start = time.monotonic()
+    threads = [
+        threading.Thread(target=fetch_stage, name="fetch", daemon=True),
+        threading.Thread(target=parse_stage, name="parse", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    def merge():
+        start_time = time.monotonic()
+        merge_spill()
+        merge_stats.busy_seconds += time.monotonic() - start_time
+        merge_stats.items += 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(table_names)) as executor:
+            while (dataframes := _get(parsed, stop)) is not _DONE:
+                start_time = time.monotonic()
+                futures = [
+                    executor.submit(spill_table, df, table_name)
+                    for df, table_name in zip(dataframes, table_names)
+                ]
+                for future in futures:
+                    future.result()
+                if on_chunk_spilled:
+                    on_chunk_spilled(dataframes)
+                spill_stats.busy_seconds += time.monotonic() - start_time
+                spill_stats.items += 1
+                print(
+                    f"Spilled chunk {spill_stats.items}: "
+                    f"{fetched.qsize()}/{queue_size} chunks waiting to parse, "
+                    f"{parsed.qsize()}/{queue_size} waiting to upload"
+                )
+                if merge_spill and spill_stats.items % merge_every == 0:
+                    merge()
+        if merge_spill and not errors and spill_stats.items % merge_every:
+            merge()
+    except Exception:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    wall_seconds = time.monotonic() - pipeline_start
+    stats = [fetch_stats, parse_stats, spill_stats, merge_stats]
+    for stage in stats:
+        depths = stage.queue_depths
+        depth_text = (
+            f", mean output queue depth {sum(depths) / len(depths):.1f}"
+            if depths
+            else ""
+        )
+        print(
+            f"Stage {stage.name}: {stage.items} "
+            f"{'merges' if stage is merge_stats else 'chunks'}, "
+            f"{stage.utilisation(wall_seconds):.0%} busy over {wall_seconds:.1f}s"
+            f"{depth_text}"
+        )
+    return stats
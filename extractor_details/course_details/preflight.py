@@ -6,6 +6,7 @@ import subprocess
 import sys
 
 import requests
+from common.warehouse import get_warehouse, warehouse_backend
 from course_details.config import BASE_URL, PRIMARY_KEY, PROJECT_ID
 
 
@@ -107,32 +108,31 @@ def check_api_connectivity() -> bool:
         return False
 
 
-def check_bigquery_connectivity() -> bool:
-    """Check if BigQuery is accessible."""
+def check_warehouse_connectivity() -> bool:
+    """Check if the configured warehouse (BigQuery or local) is accessible."""
+    backend = warehouse_backend()
     try:
-        import pandas_gbq
-
         # Try a simple query to verify connectivity
         test_query = "SELECT 1 as test"
-        result = pandas_gbq.read_gbq(test_query, project_id=PROJECT_ID)
+        result = get_warehouse(PROJECT_ID).read_sql(test_query)
         if len(result) > 0:
-            print(f"✓ BigQuery connection successful (project: {PROJECT_ID})")
+            print(
+                f"✓ {backend} warehouse connection successful (project: {PROJECT_ID})"
+            )
             return True
         else:
-            print("✗ BigQuery query returned no results")
+            print(f"✗ {backend} warehouse query returned no results")
             return False
     except Exception as e:
-        print(f"✗ BigQuery connection failed: {e}")
+        print(f"✗ {backend} warehouse connection failed: {e}")
         return False
 
 
 def check_source_table_exists() -> bool:
     """Check if the source courses table exists and has data."""
     try:
-        import pandas_gbq
-
         query = "SELECT COUNT(*) as count FROM `jeremy-chia.sg_skillsfuture.courses`"
-        result = pandas_gbq.read_gbq(query, project_id=PROJECT_ID)
+        result = get_warehouse(PROJECT_ID).read_sql(query)
         count = result["count"].iloc[0]
         if count > 0:
             print(f"✓ Source table exists with {count:,} courses")
@@ -192,10 +192,16 @@ def run_preflight(
         ("uv Installation", check_uv_installed),
         ("uv Environment", check_uv_environment),
         ("Dependencies", check_dependencies_installed),
-        ("Credentials File", lambda: check_credentials_file(credentials_path)),
+    ]
+    # The local warehouse needs no GCP credentials
+    if warehouse_backend() == "bigquery":
+        checks.append(
+            ("Credentials File", lambda: check_credentials_file(credentials_path))
+        )
+    checks += [
         ("Configuration", check_config),
         ("API Connectivity", check_api_connectivity),
-        ("BigQuery Connectivity", check_bigquery_connectivity),
+        ("Warehouse Connectivity", check_warehouse_connectivity),
         ("Source Table", check_source_table_exists),
     ]
 
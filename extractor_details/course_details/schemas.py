@@ -0,0 +1,36 @@
+from common.arrow_schema import dataclass_schema
+from common.frame_types import dataclass_dtypes
+from course_details.data_models import (
+    CourseDetails,
+    CourseRun,
+    JobRoleCourseDetails,
+    ModeOfTraining,
+    Trainer,
+)
+
+# Arrow schema of each detail table
+DETAIL_TABLE_SCHEMAS = {
+    "sg_skillsfuture.course_details": dataclass_schema(CourseDetails),
+    "sg_skillsfuture.trainers": dataclass_schema(Trainer),
+    "sg_skillsfuture.job_roles": dataclass_schema(JobRoleCourseDetails),
+    "sg_skillsfuture.mode_of_trainings": dataclass_schema(ModeOfTraining),
+    "sg_skillsfuture.course_runs": dataclass_schema(CourseRun),
+}
+
+# Typed pandas columns of each detail table; the remaining columns stay strings
+DETAIL_TABLE_DTYPES = {
+    "sg_skillsfuture.course_details": dataclass_dtypes(CourseDetails),
+    "sg_skillsfuture.trainers": dataclass_dtypes(
+        Trainer,
+        categorical=["trainer_id_type_code", "trainer_qualification_level"],
+    ),
+    "sg_skillsfuture.job_roles": dataclass_dtypes(
+        JobRoleCourseDetails, categorical=["job_role"]
+    ),
+    "sg_skillsfuture.mode_of_trainings": dataclass_dtypes(
+        ModeOfTraining, categorical=["mode_of_training_description"]
+    ),
+    "sg_skillsfuture.course_runs": dataclass_dtypes(
+        CourseRun, categorical=["course_run_training_mode"]
+    ),
+}
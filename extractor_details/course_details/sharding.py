@@ -0,0 +1,128 @@
+"""Deterministic sharding of the course-detail crawl across nodes."""
+
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import List
+
+import pandas as pd
+from common.warehouse import get_warehouse
+from course_details.config import (
+    CLUSTER_COLUMNS,
+    FINGERPRINT_TABLE,
+    PRIMARY_KEY,
+    PROJECT_ID,
+    SHARD_RUNS_TABLE,
+)
+
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+def shard_of(course_reference_number: str, shard_count: int) -> int:
+    """Returns the shard of a course; stable across processes, hosts and runs."""
+    digest = hashlib.md5(course_reference_number.encode()).hexdigest()
+    return int(digest[:16], 16) % shard_count
+
+
+def select_shard(
+    course_reference_numbers: List[str], shard_index: int, shard_count: int
+) -> List[str]:
+    return [
+        ref
+        for ref in course_reference_numbers
+        if shard_of(ref, shard_count) == shard_index
+    ]
+
+
+def shard_table(table_name: str, run_id: str, shard_index: int) -> str:
+    """Names the table holding one shard's rows of `table_name` for a run."""
+    dataset, name = table_name.split(".")
+    return f"{dataset}._shard_{run_id}_{shard_index:03d}_{name}"
+
+
+def validate_run_id(run_id: str) -> None:
+    if not RUN_ID_PATTERN.match(run_id):
+        raise ValueError(
+            f"Run id {run_id!r} may only contain letters, digits and underscores"
+        )
+
+
+def record_shard_finished(
+    run_id: str, shard_index: int, shard_count: int, course_count: int
+) -> None:
+    """Marks a shard of a run as finished so that the merge step can check it."""
+    marker = pd.DataFrame(
+        {
+            "run_id": [run_id],
+            "shard_index": [shard_index],
+            "shard_count": [shard_count],
+            "course_count": [course_count],
+            "_accessed_at": [datetime.now(timezone.utc)],
+        }
+    )
+    get_warehouse(PROJECT_ID).upsert(
+        marker,
+        SHARD_RUNS_TABLE,
+        ["run_id", "shard_index"],
+        cluster_by=CLUSTER_COLUMNS[SHARD_RUNS_TABLE],
+    )
+
+
+def finished_shards(run_id: str) -> List[int]:
+    warehouse = get_warehouse(PROJECT_ID)
+    if not warehouse.table_exists(SHARD_RUNS_TABLE):
+        return []
+    finished = warehouse.read_sql(
+        f"""SELECT shard_index FROM `{PROJECT_ID}.{SHARD_RUNS_TABLE}`
+        WHERE run_id = '{run_id}'"""
+    )
+    return sorted(finished["shard_index"])
+
+
+def merge_shards(
+    table_names: List[str], run_id: str, shard_count: int, keep: bool = False
+) -> None:
+    """
+    Merges every shard's tables for a run into the target tables.
+
+    Shards hold disjoint courses, and rows are merged on each table's primary key
+    keeping the latest row, so re-running a merge never double counts. Raises if
+    a shard has not recorded that it finished, so that a partial run is not
+    mistaken for a complete one. Shard tables are dropped after a successful merge
+    unless `keep` is set.
+    """
+    warehouse = get_warehouse(PROJECT_ID)
+    tables = list(table_names) + [FINGERPRINT_TABLE]
+    keys = {**PRIMARY_KEY, FINGERPRINT_TABLE: ["course_reference_number"]}
+
+    finished = set(finished_shards(run_id))
+    missing = [
+        shard_index for shard_index in range(shard_count) if shard_index not in finished
+    ]
+    if missing:
+        raise RuntimeError(
+            f"Run {run_id}: shards {missing} of {shard_count} have not finished"
+        )
+
+    for table_name in tables:
+        sources = [
+            shard_table(table_name, run_id, shard_index)
+            for shard_index in range(shard_count)
+        ]
+        sources = [source for source in sources if warehouse.table_exists(source)]
+        if not sources:
+            print(f"Table {table_name}: no shard rows to merge")
+            continue
+        merged_rows = warehouse.merge_tables(
+            sources,
+            table_name,
+            keys[table_name],
+            cluster_by=CLUSTER_COLUMNS[table_name],
+        )
+        print(
+            f"Table {table_name}: merged {len(sources)} shards, "
+            f"{merged_rows} rows inserted or updated"
+        )
+        if not keep:
+            for source in sources:
+                warehouse.drop_table(source)
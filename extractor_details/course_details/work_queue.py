@@ -0,0 +1,201 @@
+"""SQLite work queue that lets several workers share the course-detail crawl."""
+
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkQueue:
+    """
+    Tracks the status of every course reference number in a SQLite database.
+
+    Each course is pending, in flight, done or failed, with its attempt count and
+    last error. Workers lease batches inside an immediate transaction, so several
+    processes can share one WAL-mode database without leasing the same course
+    twice. A lease expires after `lease_seconds`, which hands the courses of a
+    crashed worker back to the others, until a course has been leased
+    `max_attempts` times and is failed instead. Only the worker holding a lease
+    can finish its courses; failed courses stay failed until `retry_failed` is
+    called.
+    """
+
+    def __init__(
+        self, path: str, lease_seconds: float = 600.0, max_attempts: int = 3
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute("pragma journal_mode=wal")
+        self.connection.execute("pragma synchronous=normal")
+        self.connection.execute(
+            """create table if not exists courses (
+                course_reference_number text primary key,
+                status text not null default 'pending',
+                attempts integer not null default 0,
+                last_error text,
+                fingerprint text,
+                leased_by text,
+                leased_until real,
+                updated_at real
+            )"""
+        )
+        self.connection.execute(
+            "create index if not exists courses_by_status on courses (status)"
+        )
+
+    def enqueue(
+        self,
+        course_reference_numbers: Iterable[str],
+        fingerprints: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Adds courses as pending. Courses already queued keep their status, except
+        that finished courses are queued again.
+
+        Returns:
+            The number of courses that became pending.
+        """
+        fingerprints = fingerprints or {}
+        rows = [
+            (ref, fingerprints.get(ref), time.time())
+            for ref in course_reference_numbers
+        ]
+        with self.connection:
+            self.connection.execute("begin immediate")
+            before = self.counts().get(PENDING, 0)
+            self.connection.executemany(
+                """insert into courses (course_reference_number, fingerprint,
+                    updated_at)
+                values (?, ?, ?)
+                on conflict (course_reference_number) do update set
+                    status = case when status = 'done' then 'pending' else status end,
+                    fingerprint = coalesce(excluded.fingerprint, fingerprint),
+                    updated_at = excluded.updated_at""",
+                rows,
+            )
+            return self.counts().get(PENDING, 0) - before
+
+    def lease(self, worker_id: str, batch_size: int) -> List[str]:
+        """
+        Leases up to `batch_size` pending or expired courses to `worker_id`, after
+        failing the expired courses that have used up their attempts.
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.execute("begin immediate")
+            self.connection.execute(
+                """update courses set status = 'failed', last_error = ?,
+                    leased_by = null, leased_until = null, updated_at = ?
+                where status = 'in_flight' and leased_until < ? and attempts >= ?""",
+                (
+                    f"lease expired after {self.max_attempts} attempts",
+                    now,
+                    now,
+                    self.max_attempts,
+                ),
+            )
+            refs = [
+                row[0]
+                for row in self.connection.execute(
+                    """select course_reference_number from courses
+                    where status = 'pending'
+                        or (status = 'in_flight' and leased_until < ?)
+                    order by course_reference_number
+                    limit ?""",
+                    (now, batch_size),
+                )
+            ]
+            self.connection.executemany(
+                """update courses set status = 'in_flight', attempts = attempts + 1,
+                    leased_by = ?, leased_until = ?, updated_at = ?
+                where course_reference_number = ?""",
+                [(worker_id, now + self.lease_seconds, now, ref) for ref in refs],
+            )
+        return refs
+
+    def _finish(
+        self,
+        refs: Iterable[str],
+        worker_id: str,
+        status: str,
+        error: Optional[str],
+    ) -> int:
+        """
+        Sets the status of the courses still leased to `worker_id`; courses whose
+        lease expired and passed to another worker are left to that worker.
+
+        Returns:
+            The number of courses updated.
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.execute("begin immediate")
+            cursor = self.connection.executemany(
+                """update courses set status = ?, last_error = ?, leased_by = null,
+                    leased_until = null, updated_at = ?
+                where course_reference_number = ? and leased_by = ?""",
+                [(status, error, now, ref, worker_id) for ref in refs],
+            )
+        return cursor.rowcount
+
+    def mark_done(self, refs: Iterable[str], worker_id: str) -> int:
+        return self._finish(refs, worker_id, DONE, None)
+
+    def mark_failed(self, refs: Iterable[str], worker_id: str, error: str) -> int:
+        return self._finish(refs, worker_id, FAILED, error)
+
+    def retry_failed(self) -> int:
+        """
+        Returns failed courses to pending with a fresh attempt count; returns how
+        many were re-queued.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                """update courses set status = 'pending', attempts = 0
+                where status = 'failed'"""
+            )
+        return cursor.rowcount
+
+    def fingerprints(self, refs: Iterable[str]) -> Dict[str, str]:
+        """Returns the fingerprints recorded at enqueue time for `refs`."""
+        refs = list(refs)
+        if not refs:
+            return {}
+        placeholders = ", ".join("?" for _ in refs)
+        return dict(
+            self.connection.execute(
+                f"""select course_reference_number, fingerprint from courses
+                where fingerprint is not null
+                    and course_reference_number in ({placeholders})""",
+                refs,
+            ).fetchall()
+        )
+
+    def counts(self) -> Dict[str, int]:
+        return dict(
+            self.connection.execute(
+                "select status, count(*) from courses group by status"
+            ).fetchall()
+        )
+
+    def print_counts(self) -> None:
+        counts = self.counts()
+        print(
+            "Work queue: "
+            + ", ".join(
+                f"{counts.get(status, 0)} {status}"
+                for status in (PENDING, IN_FLIGHT, DONE, FAILED)
+            )
+        )
+
+    def close(self) -> None:
+        self.connection.close()
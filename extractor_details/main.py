@@ -1,20 +1,60 @@
 import argparse
+import asyncio
+import glob
+import multiprocessing
 import os
+import socket
+import sys
 import time
 
-import pandas as pd
-import pandas_gbq
-from course_details.api_utils import fetch_course_details
-from course_details.config import CHUNK_SIZE, PRIMARY_KEY, PROJECT_ID
-from course_details.data_parsing import (
-    parse_course_details,
-    parse_course_runs,
-    parse_job_roles,
-    parse_mode_of_trainings,
-    parse_trainers,
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.frame_types import conversion_report
+from common.http_client import configure_response_cache, get_client
+from common.response_cache import DEFAULT_CACHE_DIR
+from common.warehouse import (
+    DEFAULT_WAREHOUSE_DIR,
+    WAREHOUSE_BACKENDS,
+    configure_warehouse,
+    warehouse_backend,
+)
+from course_details.api_utils import (
+    cached_course_reference_numbers,
+    decode_course_details,
+    fetch_course_details,
+)
+from course_details.async_fetch import AIMDController, fetch_course_details_async
+from course_details.config import (
+    CHUNK_SIZE,
+    DETAIL_SPILL_DIR,
+    DETAIL_SPILL_MERGE_CHUNKS,
+    DETAIL_TABLES,
+    DETAIL_TTL_DAYS,
+    FINGERPRINT_TABLE,
+    SHARD_RUNS_TABLE,
+    WORK_QUEUE_LEASE_SECONDS,
+    WORK_QUEUE_MAX_ATTEMPTS,
+    WORK_QUEUE_PATH,
+)
+from course_details.data_parsing import CourseDetailRows
+from course_details.database_utils import (
+    DetailSpill,
+    get_course_reference_numbers,
+    migrate_tables,
+    spill_in_use,
 )
-from course_details.database_utils import get_course_reference_numbers, upload_to_gbq
+from course_details.incremental import record_fingerprints, select_courses_to_refresh
+from course_details.pipeline import run_pipeline
 from course_details.preflight import run_preflight
+from course_details.sharding import (
+    merge_shards,
+    record_shard_finished,
+    select_shard,
+    shard_table,
+    validate_run_id,
+)
+from course_details.work_queue import WorkQueue
 
 
 def chunk_list(input_list, chunk_size=1000):
@@ -23,31 +63,37 @@ def chunk_list(input_list, chunk_size=1000):
     ]
 
 
-def get_all_courses_data(course_reference_numbers):
-    all_courses = []
-    all_trainers = []
-    all_job_roles = []
-    all_mode_of_trainings = []
-    all_course_runs = []
+def fetch_courses(course_reference_numbers, on_course_detail, concurrency=1):
+    """
+    Fetches course details, passing each course's `data` payload to a callback.
+
+    Args:
+        course_reference_numbers (list): Course reference numbers to fetch.
+        on_course_detail (callable): Called with each course-detail payload.
+        concurrency (int): Maximum requests in flight. Above 1, the asyncio engine
+            fetches courses concurrently under AIMD control; 1 fetches serially.
+    """
+    if concurrency > 1:
+        controller = AIMDController(limit=min(4, concurrency), max_limit=concurrency)
+        failed = asyncio.run(
+            fetch_course_details_async(
+                course_reference_numbers, on_course_detail, controller
+            )
+        )
+        if failed:
+            print(f"Failed to fetch {len(failed)} courses: {', '.join(failed)}")
+        return
 
     total_courses = len(course_reference_numbers)
     start_time = time.time()
 
     for idx, course_reference in enumerate(course_reference_numbers):
-        start_course_time = time.time()
-        response = fetch_course_details(course_reference)
-        if response and response.status_code == 200 and "data" in response.json():
-            course_detail_dict = response.json().get("data", {})
-
-            course_details = parse_course_details(course_detail_dict)
-            all_courses.append(course_details)
-
-            all_mode_of_trainings.extend(parse_mode_of_trainings(course_detail_dict))
-            all_course_runs.extend(parse_course_runs(course_detail_dict))
-            all_trainers.extend(parse_trainers(course_detail_dict))
-            all_job_roles.extend(parse_job_roles(course_detail_dict))
+        course_detail_dict = decode_course_details(
+            fetch_course_details(course_reference)
+        )
+        if course_detail_dict is not None:
+            on_course_detail(course_detail_dict)
 
-        course_time_taken = time.time() - start_course_time
         courses_processed = idx + 1
         courses_remaining = total_courses - courses_processed
 
@@ -67,24 +113,174 @@ def get_all_courses_data(course_reference_numbers):
         else:
             print("Estimating remaining time...")
 
-    course_details_df = pd.DataFrame([course.__dict__ for course in all_courses])
-    trainers_df = pd.DataFrame(all_trainers)
-    job_roles_df = pd.DataFrame([job_role.__dict__ for job_role in all_job_roles])
-    mode_of_trainings_df = pd.DataFrame(
-        [mode.__dict__ for mode in all_mode_of_trainings]
+
+def get_all_courses_data(course_reference_numbers, concurrency=1):
+    """
+    Fetches and parses course details for the given course reference numbers.
+
+    Returns:
+        DataFrames for course_details, trainers, job_roles, mode_of_trainings and
+        course_runs.
+    """
+    rows = CourseDetailRows()
+    fetch_courses(course_reference_numbers, rows.add, concurrency=concurrency)
+    return rows.to_dataframes()
+
+
+def parse_courses_data(course_detail_dicts):
+    """Parses already-fetched course-detail payloads into the five DataFrames."""
+    rows = CourseDetailRows()
+    for course_detail_dict in course_detail_dicts:
+        rows.add(course_detail_dict)
+    return rows.to_dataframes()
+
+
+def fetch_courses_data(course_reference_numbers, concurrency=1):
+    """Fetches course-detail payloads for one chunk without parsing them."""
+    course_detail_dicts = []
+    fetch_courses(
+        course_reference_numbers, course_detail_dicts.append, concurrency=concurrency
     )
-    course_runs_df = pd.DataFrame(all_course_runs)
+    return course_detail_dicts
+
+
+def select_course_reference_numbers(args):
+    """
+    Returns the course reference numbers a run should fetch, and their fingerprints
+    on an incremental run (None otherwise).
+    """
+    fingerprints = None
+    if args.replay:
+        course_reference_numbers = cached_course_reference_numbers(
+            args.start_from_course
+        )
+        print(f"Replaying {len(course_reference_numbers)} cached courses")
+    elif args.incremental:
+        course_reference_numbers, fingerprints = select_courses_to_refresh(
+            ttl_days=args.ttl_days
+        )
+        if args.start_from_course:
+            course_reference_numbers = [
+                ref for ref in course_reference_numbers if ref >= args.start_from_course
+            ]
+    else:
+        course_reference_numbers = get_course_reference_numbers(
+            args.start_from_course
+        )
+    return course_reference_numbers, fingerprints
+
 
-    return (
-        course_details_df,
-        trainers_df,
-        job_roles_df,
-        mode_of_trainings_df,
-        course_runs_df,
+def run_queue_worker(queue_path, concurrency=1, cache_dir=None, replay=False):
+    """
+    Leases chunks from the work queue and fetches and parses them until no pending
+    courses remain. Courses missing from a chunk's results are marked failed, as
+    is the whole chunk if fetching it fails.
+
+    Parsed chunks are spilled locally and merged into the tables once the queue
+    is empty, or sooner when the oldest spilled lease is half way to expiring;
+    their courses are marked done, or failed if the merge fails, at that point.
+    """
+    configure_response_cache(cache_dir, replay=replay)
+    work_queue = WorkQueue(
+        queue_path,
+        lease_seconds=WORK_QUEUE_LEASE_SECONDS,
+        max_attempts=WORK_QUEUE_MAX_ATTEMPTS,
     )
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    spill = DetailSpill(os.path.join(DETAIL_SPILL_DIR, "queue", str(os.getpid())))
+    spilled = []
+    spill_started = None
+
+    def upload_spilled():
+        try:
+            spill.upload()
+        except Exception as e:
+            print(f"Worker {worker_id}: upload failed: {e}")
+            work_queue.mark_failed(spilled, worker_id, repr(e))
+        else:
+            work_queue.mark_done(spilled, worker_id)
+            fingerprints = work_queue.fingerprints(spilled)
+            if fingerprints:
+                record_fingerprints(spilled, fingerprints)
+        spilled.clear()
+
+    while course_references := work_queue.lease(worker_id, CHUNK_SIZE):
+        if spill_started is None:
+            spill_started = time.monotonic()
+        try:
+            dataframes = get_all_courses_data(
+                course_references, concurrency=concurrency
+            )
+        except Exception as e:
+            print(f"Worker {worker_id}: chunk failed: {e}")
+            work_queue.mark_failed(course_references, worker_id, repr(e))
+            continue
+
+        for df, table_name in zip(dataframes, DETAIL_TABLES):
+            spill.add(df, table_name)
+        fetched = set(dataframes[0].get("course_reference_number", []))
+        spilled.extend(ref for ref in course_references if ref in fetched)
+        work_queue.mark_failed(
+            [ref for ref in course_references if ref not in fetched],
+            worker_id,
+            "course details could not be fetched",
+        )
+        if time.monotonic() - spill_started > work_queue.lease_seconds / 2:
+            upload_spilled()
+            spill_started = None
 
+    if spilled:
+        upload_spilled()
+    spill.close()
+    work_queue.close()
 
-def main():
+
+def merge_stale_worker_spills():
+    """
+    Merges the chunks left in the spills of queue workers that are no longer
+    running. Their courses are leased again once the leases expire, so these
+    merges only save work; a failed one leaves the spill for the next run.
+    """
+    pattern = os.path.join(DETAIL_SPILL_DIR, "queue", "*")
+    for directory in glob.glob(pattern):
+        if spill_in_use(directory):
+            continue
+        spill = DetailSpill(directory)
+        if not spill.empty:
+            print(f"Merging chunks left in {directory} by a stopped worker")
+            try:
+                spill.upload()
+            except RuntimeError as e:
+                print(e)
+        spill.close()
+
+
+def run_work_queue(queue_path, workers, concurrency, cache_dir, replay):
+    """
+    Runs `workers` queue workers, in this process when there is only one, after
+    merging any chunks stopped workers left behind.
+    """
+    merge_stale_worker_spills()
+    if workers <= 1:
+        run_queue_worker(queue_path, concurrency, cache_dir, replay)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_queue_worker,
+            args=(queue_path, concurrency, cache_dir, replay),
+            name=f"course-details-worker-{index}",
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Process SkillsFuture course data.")
     parser.add_argument(
         "--start_from_course",
@@ -92,6 +288,125 @@ def main():
         default=None,
         help="Course reference number to start processing from.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum course-detail requests in flight (1 fetches serially).",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap fetching and parsing of later chunks with spilling and "
+        "merging earlier ones.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=2,
+        help="Maximum chunks waiting between pipeline stages.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch new or changed courses and those older than --ttl-days.",
+    )
+    parser.add_argument(
+        "--ttl-days",
+        type=float,
+        default=DETAIL_TTL_DAYS,
+        help="Re-fetch unchanged courses last fetched more than this many days ago.",
+    )
+    parser.add_argument(
+        "--work-queue",
+        nargs="?",
+        const=WORK_QUEUE_PATH,
+        default=None,
+        help="Lease courses from a shared SQLite work queue "
+        f"(default path {WORK_QUEUE_PATH}).",
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="Add the selected courses to the work queue before working on it.",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Return failed courses in the work queue to pending.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes leasing from the work queue.",
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=None,
+        help="Fetch only the courses hashed to this shard (0-based).",
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=1,
+        help="Number of shards the crawl is split into.",
+    )
+    parser.add_argument(
+        "--run-id",
+        default=None,
+        help="Tag shared by the shards of one run; names their output tables.",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        action="store_true",
+        help="Merge the output of every shard of --run-id into the target tables.",
+    )
+    parser.add_argument(
+        "--keep-shards",
+        action="store_true",
+        help="Keep the shard tables after --merge-shards.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Directory in which raw API responses are cached.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not keep raw API responses.",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Re-run parsing and loading of every cached course without the API.",
+    )
+    parser.add_argument(
+        "--warehouse",
+        choices=WAREHOUSE_BACKENDS,
+        default=warehouse_backend(),
+        help="Warehouse to read courses from and load into: BigQuery, or local "
+        "Parquet files queried with DuckDB.",
+    )
+    parser.add_argument(
+        "--warehouse-dir",
+        default=None,
+        help=f"Directory of the local warehouse (default {DEFAULT_WAREHOUSE_DIR}).",
+    )
+    parser.add_argument(
+        "--migrate-tables",
+        action="store_true",
+        help="Rebuild the detail tables partitioned by day and with a TIMESTAMP "
+        "_accessed_at, then exit.",
+    )
+    parser.add_argument(
+        "--legacy-utc-offset",
+        default=None,
+        help="UTC offset, such as +08:00, of string _accessed_at values rebuilt by "
+        "--migrate-tables (default: this machine's).",
+    )
     parser.add_argument(
         "--skip-preflight",
         action="store_true",
@@ -102,12 +417,40 @@ def main():
         action="store_true",
         help="Run preflight checks only without processing data.",
     )
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    configure_warehouse(args.warehouse, args.warehouse_dir)
 
-    start_from_course_reference_number = args.start_from_course
+    if args.replay and args.incremental:
+        parser.error("--replay cannot be combined with --incremental")
+    if (args.enqueue or args.retry_failed or args.workers > 1) and not args.work_queue:
+        parser.error("--enqueue, --retry-failed and --workers need --work-queue")
+    sharded = args.shard_index is not None
+    if sharded or args.merge_shards:
+        if not args.run_id or args.shard_count < 2:
+            parser.error("Sharded runs need --run-id and a --shard-count above 1")
+        validate_run_id(args.run_id)
+    if sharded and not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1")
+    if sharded and args.work_queue:
+        parser.error("--shard-index cannot be combined with --work-queue")
+
+    if args.migrate_tables:
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
+        migrate_tables(
+            DETAIL_TABLES + [FINGERPRINT_TABLE, SHARD_RUNS_TABLE],
+            args.legacy_utc_offset,
+        )
+        return
+
+    if args.merge_shards:
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
+        merge_shards(
+            DETAIL_TABLES, args.run_id, args.shard_count, keep=args.keep_shards
+        )
+        return
 
     # Run preflight checks
-    if not args.skip_preflight:
+    if not args.skip_preflight and not args.replay:
         run_preflight(exit_on_failure=not args.preflight_only)
         if args.preflight_only:
             return
@@ -116,57 +459,114 @@ def main():
         # Set Google Cloud credentials
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
 
-        course_reference_numbers = get_course_reference_numbers(
-            start_from_course_reference_number
-        )
-        course_reference_numbers_list = chunk_list(course_reference_numbers, CHUNK_SIZE)
+        cache_dir = None if args.no_cache else args.cache_dir
+        configure_response_cache(cache_dir, replay=args.replay)
+
+        if args.work_queue:
+            work_queue = WorkQueue(
+                args.work_queue,
+                lease_seconds=WORK_QUEUE_LEASE_SECONDS,
+                max_attempts=WORK_QUEUE_MAX_ATTEMPTS,
+            )
+            if args.enqueue:
+                queued = work_queue.enqueue(*select_course_reference_numbers(args))
+                print(f"Queued {queued} courses in {args.work_queue}")
+            if args.retry_failed:
+                print(f"Re-queued {work_queue.retry_failed()} failed courses")
+            work_queue.print_counts()
+            run_work_queue(
+                args.work_queue, args.workers, args.concurrency, cache_dir, args.replay
+            )
+            work_queue.print_counts()
+            return
 
-        for course_references in course_reference_numbers_list:
-            (
-                course_details_df,
-                trainers_df,
-                job_roles_df,
-                mode_of_trainings_df,
-                course_runs_df,
-            ) = get_all_courses_data(course_references)
+        course_reference_numbers, fingerprints = select_course_reference_numbers(args)
 
-            upload_to_gbq(course_details_df, "sg_skillsfuture.course_details")
-            upload_to_gbq(trainers_df, "sg_skillsfuture.trainers")
-            upload_to_gbq(job_roles_df, "sg_skillsfuture.job_roles")
-            upload_to_gbq(mode_of_trainings_df, "sg_skillsfuture.mode_of_trainings")
-            upload_to_gbq(course_runs_df, "sg_skillsfuture.course_runs")
+        fingerprint_table = FINGERPRINT_TABLE
+        if sharded:
+            course_reference_numbers = select_shard(
+                course_reference_numbers, args.shard_index, args.shard_count
+            )
+            print(
+                f"Run {args.run_id}, shard {args.shard_index} of {args.shard_count}: "
+                f"{len(course_reference_numbers)} courses"
+            )
+            fingerprint_table = shard_table(
+                FINGERPRINT_TABLE, args.run_id, args.shard_index
+            )
 
-    except Exception as e:
-        print(f"Error during data processing: {e}")
+        # Chunks are spilled locally and merged into the tables every
+        # DETAIL_SPILL_MERGE_CHUNKS chunks. A shard writes to its own copy of each
+        # table until the merge step
+        if sharded:
+            spill_name = f"shard-{args.run_id}-{args.shard_index}"
 
-    finally:
-        # Deduplication should always run
-        for table_path in PRIMARY_KEY:
-            try:
-                df = pandas_gbq.read_gbq(table_path, project_id=PROJECT_ID)
+            def destination(table_name):
+                return shard_table(table_name, args.run_id, args.shard_index)
 
-                before_dedup_rows = len(df)
+        else:
+            spill_name, destination = "run", None
+        spill = DetailSpill(os.path.join(DETAIL_SPILL_DIR, spill_name))
+        if not spill.empty:
+            print(f"Merging chunks left in {spill.directory} by an earlier run")
+            spill.upload(destination)
+        fetched = []
 
-                df = df.sort_values(by="_accessed_at", ascending=False)
-                df_deduped = df.drop_duplicates(
-                    subset=PRIMARY_KEY[table_path], keep="first"
-                )
+        def on_chunk_spilled(dataframes):
+            if not dataframes[0].empty:
+                fetched.extend(dataframes[0]["course_reference_number"])
 
-                after_dedup_rows = len(df_deduped)
+        def merge_spill():
+            spill.upload(destination)
+            # Only courses whose details were fetched and merged are recorded
+            if fingerprints is not None and fetched:
+                record_fingerprints(fetched, fingerprints, table=fingerprint_table)
+            fetched.clear()
 
-                pandas_gbq.to_gbq(
-                    dataframe=df_deduped,
-                    destination_table=table_path,
-                    project_id=PROJECT_ID,
-                    if_exists="replace",
-                )
+        course_reference_numbers_list = chunk_list(course_reference_numbers, CHUNK_SIZE)
 
-                print(
-                    f"Table {table_path}: Before {before_dedup_rows} rows, After {after_dedup_rows} rows. Deduplication complete."
+        try:
+            if args.pipeline:
+                run_pipeline(
+                    course_reference_numbers_list,
+                    fetch_chunk=lambda chunk: fetch_courses_data(
+                        chunk, concurrency=args.concurrency
+                    ),
+                    parse_chunk=parse_courses_data,
+                    spill_table=spill.add,
+                    table_names=DETAIL_TABLES,
+                    queue_size=args.queue_size,
+                    on_chunk_spilled=on_chunk_spilled,
+                    merge_spill=merge_spill,
+                    merge_every=DETAIL_SPILL_MERGE_CHUNKS,
                 )
+            else:
+                for index, course_references in enumerate(
+                    course_reference_numbers_list, 1
+                ):
+                    dataframes = get_all_courses_data(
+                        course_references, concurrency=args.concurrency
+                    )
+                    for df, table_name in zip(dataframes, DETAIL_TABLES):
+                        spill.add(df, table_name)
+                    on_chunk_spilled(dataframes)
+                    if index % DETAIL_SPILL_MERGE_CHUNKS == 0:
+                        merge_spill()
+                merge_spill()
+        finally:
+            spill.close()
 
-            except Exception as e:
-                print(f"Error processing table {table_path}: {e}")
+        if sharded:
+            record_shard_finished(
+                args.run_id,
+                args.shard_index,
+                args.shard_count,
+                len(course_reference_numbers),
+            )
+
+    finally:
+        get_client().print_stats()
+        conversion_report.print_summary()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+"""
+Benchmark the bytes a modelling run scans with and without the staging layer.
+
+Without it, every model deduplicates the raw tables itself: each staging table a
+model reads is replaced by its staging query over the raw tables, as the models
+did before. With it, the staging tables are built once and the models read them.
+Bytes come from dry runs, so no model is rebuilt; the staging tables are built
+first, as dry runs of the models need them to exist.
+
+On the local warehouse, the bytes scanned are the sizes of the Parquet files each
+statement reads.
+
+Usage:
+    python modelling/benchmark_staging.py
+    python modelling/benchmark_staging.py --warehouse local --skip-build
+"""
+
+import argparse
+import importlib
+import os
+import re
+import sys
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import staging
+from common.materialise import format_bytes
+from common.warehouse import WAREHOUSE_BACKENDS, configure_warehouse, get_warehouse
+
+MODELS = [
+    "courses",
+    "course_runs",
+    "training_providers",
+    "training_locations",
+    "trainers",
+]
+
+_STAGING_TABLE = re.compile(r"`{}\.(\w+)`".format(re.escape(staging.target_schema)))
+
+
+def inline_staging(sql: str) -> str:
+    """Replaces every staging table in `sql` with its query over the raw tables."""
+    return _STAGING_TABLE.sub(
+        lambda match: f"({inline_staging(staging.tables[match.group(1)])})", sql
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--warehouse", choices=WAREHOUSE_BACKENDS, default=None, help="Backend."
+    )
+    parser.add_argument(
+        "--warehouse-dir", default=None, help="Directory of the local warehouse."
+    )
+    parser.add_argument(
+        "--skip-build",
+        action="store_true",
+        help="Use the staging tables as they are instead of rebuilding them.",
+    )
+    args = parser.parse_args(argv)
+    if args.warehouse:
+        configure_warehouse(args.warehouse, args.warehouse_dir)
+
+    warehouse = get_warehouse(staging.project_id)
+    if not args.skip_build:
+        staging.materialise_staging(warehouse)
+
+    print(f"\n{'statement':<34} {'raw tables':>12} {'staging':>12}")
+    before_total = after_total = 0
+    for table, table_sql in staging.tables.items():
+        after = warehouse.dry_run(table_sql)
+        after_total += after
+        print(f"{'staging.' + table:<34} {'':>12} {format_bytes(after):>12}")
+    for model_name in MODELS:
+        model = importlib.import_module(model_name)
+        before = warehouse.dry_run(inline_staging(model.sql))
+        after = warehouse.dry_run(model.sql)
+        before_total += before
+        after_total += after
+        print(
+            f"{'models.' + model_name:<34} {format_bytes(before):>12} "
+            f"{format_bytes(after):>12}"
+        )
+    print(
+        f"{'total':<34} {format_bytes(before_total):>12} "
+        f"{format_bytes(after_total):>12}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
+import argparse
 import os
-import pandas_gbq 
+import sys
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.materialise import compare_with_full_refresh, materialise_incremental
+from common.warehouse import get_warehouse
 
 project_id = "jeremy-chia"
 target_schema = "jeremy-chia.sg_skillsfuture_models"
+# Identifies the model's rows when checking incremental runs against a rebuild
+unique_key = ["course_run_id"]
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
 sql = """
 with
@@ -38,37 +47,29 @@ with
                 ),
                 null
             ) as address_room_uuid,
-        from `jeremy-chia.sg_skillsfuture.course_runs`
+        from `jeremy-chia.sg_skillsfuture_staging.course_runs`
     ),
 
     training_areas as (
         select course_reference_number, area_of_training_id, area_of_training_text,
-        from `jeremy-chia.sg_skillsfuture.training_areas`
-        qualify
-            row_number() over (
-                partition by course_reference_number
-                order by _accessed_at desc, area_of_training_id
-            )
-            = 1
+        from `jeremy-chia.sg_skillsfuture_staging.primary_training_areas`
     ),
 
     trainers as (
         select
             course_run_id,
-            array_agg(distinct coalesce(trainer_uuid, "")) as trainer_uuids,
+            array_agg(
+                distinct coalesce(trainer_uuid, "")
+                order by coalesce(trainer_uuid, "")
+            ) as trainer_uuids,
             count(distinct trainer_uuid) as count_trainers_with_info,
-        from `jeremy-chia.sg_skillsfuture.trainers`
+        from `jeremy-chia.sg_skillsfuture_staging.trainers`
         group by all
     ),
 
     course as (
         select course_reference_number, training_partner_uen, training_partner_name
-        from `jeremy-chia.sg_skillsfuture.courses`
-        qualify
-            row_number() over (
-                partition by course_reference_number order by _accessed_at desc
-            )
-            = 1
+        from `jeremy-chia.sg_skillsfuture_staging.courses`
     ),
 
     joined as (
@@ -122,14 +123,25 @@ from calculations
 order by course_reference_number desc, course_run_id
 """
 
-df = pandas_gbq.read_gbq(
-    query_or_table=sql,
-    project_id=project_id
-)
-
-pandas_gbq.to_gbq(
-    dataframe=df,
-    destination_table=f"{target_schema}.course_runs",
-    project_id=project_id,
-    if_exists="replace"
-)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the course_runs model.")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Rebuild every course run instead of those whose sources changed.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare the model with a full rebuild afterwards, failing if they "
+        "differ.",
+    )
+    args = parser.parse_args()
+    warehouse = get_warehouse(project_id)
+    materialise_incremental(
+        warehouse, sql, f"{target_schema}.course_runs", full_refresh=args.full_refresh
+    )
+    if args.check and not compare_with_full_refresh(
+        warehouse, sql, f"{target_schema}.course_runs", unique_key
+    ).empty:
+        sys.exit(1)
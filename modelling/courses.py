@@ -1,8 +1,17 @@
+import argparse
 import os
-import pandas_gbq 
+import sys
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.materialise import compare_with_full_refresh, materialise_incremental
+from common.warehouse import get_warehouse
 
 project_id = "jeremy-chia"
 target_schema = "jeremy-chia.sg_skillsfuture_models"
+# Identifies the model's rows when checking incremental runs against a rebuild
+unique_key = ["course_reference_number"]
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
 sql = """
 
@@ -33,7 +42,7 @@ with
             training_partner_uen,
             training_partner_name,
             _accessed_at
-        from `jeremy-chia.sg_skillsfuture.courses`
+        from `jeremy-chia.sg_skillsfuture_staging.courses`
     ),
 
     details as (
@@ -43,29 +52,24 @@ with
             course_content,
             entry_requirement,
             cast(training_duration_hours as float64) as training_duration_hours,
-            count_attendees,
+            safe_cast(count_attendees as int64) as count_attendees,
             case
                 when qualification_attained_id != "" then qualification_attained_id
             end as qualification_attained_id,
             case
                 when qualification_attained_name != "" then qualification_attained_name
             end as qualification_attained_name
-        from `jeremy-chia.sg_skillsfuture.course_details`
-        qualify
-            row_number() over (
-                partition by course_reference_number order by _accessed_at desc
-            )
-            = 1
+        from `jeremy-chia.sg_skillsfuture_staging.course_details`
     ),
 
     union_initiatives as (
         select distinct
             course_reference_number, featured_initiatives_tag as initiatives_tag
-        from `jeremy-chia.sg_skillsfuture.featured_initiatives`
+        from `jeremy-chia.sg_skillsfuture_staging.featured_initiatives`
         union all
         select distinct
             course_reference_number, skillsfuture_initiatives_tag as initiatives_tag
-        from `jeremy-chia.sg_skillsfuture.skillsfuture_initiatives`
+        from `jeremy-chia.sg_skillsfuture_staging.skillsfuture_initiatives`
     ),
 
     initiatives as (
@@ -85,7 +89,7 @@ with
                 distinct language_of_instruction order by language_of_instruction
             ) as languages_of_instruction,
             count(distinct language_of_instruction) as count_languages
-        from `jeremy-chia.sg_skillsfuture.languages`
+        from `jeremy-chia.sg_skillsfuture_staging.languages`
         group by all
     ),
 
@@ -93,24 +97,18 @@ with
         select
             course_reference_number,
             array_agg(distinct job_role order by job_role) as job_roles,
-        from `jeremy-chia.sg_skillsfuture.job_roles`
+        from `jeremy-chia.sg_skillsfuture_staging.job_roles`
         group by all
     ),
 
     training_areas as (
         select course_reference_number, area_of_training_id, area_of_training_text,
-        from `jeremy-chia.sg_skillsfuture.training_areas`
-        qualify
-            row_number() over (
-                partition by course_reference_number
-                order by _accessed_at desc, area_of_training_id
-            )
-            = 1
+        from `jeremy-chia.sg_skillsfuture_staging.primary_training_areas`
     ),
 
     mode_of_training as (
         select course_reference_number, mode_of_training_description,
-        from `jeremy-chia.sg_skillsfuture.mode_of_trainings`
+        from `jeremy-chia.sg_skillsfuture_staging.mode_of_trainings`
         qualify
             row_number() over (
                 partition by course_reference_number order by _accessed_at desc
@@ -179,14 +177,25 @@ select *
 from joined
 """
 
-df = pandas_gbq.read_gbq(
-    query_or_table=sql,
-    project_id=project_id
-)
-
-pandas_gbq.to_gbq(
-    dataframe=df,
-    destination_table=f"{target_schema}.courses",
-    project_id=project_id,
-    if_exists="replace"
-)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the courses model.")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Rebuild every course instead of those whose sources changed.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare the model with a full rebuild afterwards, failing if they "
+        "differ.",
+    )
+    args = parser.parse_args()
+    warehouse = get_warehouse(project_id)
+    materialise_incremental(
+        warehouse, sql, f"{target_schema}.courses", full_refresh=args.full_refresh
+    )
+    if args.check and not compare_with_full_refresh(
+        warehouse, sql, f"{target_schema}.courses", unique_key
+    ).empty:
+        sys.exit(1)
@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.materialise import materialise_model, materialise_unless_unchanged
+from common.warehouse import QueryResult, Warehouse, get_warehouse
+
+project_id = "jeremy-chia"
+source_schema = "jeremy-chia.sg_skillsfuture"
+target_schema = "jeremy-chia.sg_skillsfuture_staging"
+os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
+
+# Keys the extractors merge each raw table on
+primary_keys = {
+    "courses": ["course_reference_number"],
+    "training_areas": ["course_reference_number", "area_of_training_id"],
+    "languages": ["course_reference_number", "language_of_instruction"],
+    "featured_initiatives": ["course_reference_number", "featured_initiatives_tag"],
+    "skillsfuture_initiatives": [
+        "course_reference_number",
+        "skillsfuture_initiatives_tag",
+    ],
+    "course_details": ["course_reference_number"],
+    "trainers": ["course_run_id", "trainer_id_number", "trainer_uuid"],
+    "job_roles": ["course_reference_number", "job_role"],
+    "mode_of_trainings": ["course_reference_number", "mode_of_training_description"],
+    "course_runs": ["course_run_id"],
+}
+
+
+def latest_snapshot_sql(table: str, keys: List[str]) -> str:
+    return f"""
+select *
+from `{source_schema}.{table}`
+qualify
+    row_number() over (partition by {", ".join(keys)} order by _accessed_at desc)
+    = 1
+"""
+
+
+# Staging tables in build order; later ones may read earlier ones
+tables: Dict[str, str] = {
+    table: latest_snapshot_sql(table, keys) for table, keys in primary_keys.items()
+}
+
+# The area of training a course is filed under, the lowest id of its latest areas
+tables["primary_training_areas"] = f"""
+select
+    course_reference_number, area_of_training_id, area_of_training_text, _accessed_at
+from `{target_schema}.training_areas`
+qualify
+    row_number() over (
+        partition by course_reference_number
+        order by _accessed_at desc, area_of_training_id
+    )
+    = 1
+"""
+
+
+def materialise_staging(
+    warehouse: Warehouse, refresh: bool = False
+) -> List[QueryResult]:
+    """
+    Rebuilds the staging tables from the raw tables, in build order, skipping those
+    whose sources are unchanged since they were last built unless `refresh` is set.
+    """
+    results = []
+    for table, table_sql in tables.items():
+        destination_table = f"{target_schema}.{table}"
+        results.append(
+            materialise_unless_unchanged(
+                warehouse,
+                table_sql,
+                destination_table,
+                lambda: materialise_model(warehouse, table_sql, destination_table),
+                refresh=refresh,
+            )
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the staging tables.")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Rebuild every staging table, even those whose sources are unchanged.",
+    )
+    args = parser.parse_args()
+    materialise_staging(get_warehouse(project_id), refresh=args.full_refresh)
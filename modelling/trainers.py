@@ -1,5 +1,11 @@
 import os
-import pandas_gbq 
+import sys
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.materialise import materialise_model
+from common.warehouse import get_warehouse
 
 project_id = "jeremy-chia"
 target_schema = "jeremy-chia.sg_skillsfuture_models"
@@ -24,7 +30,7 @@ with
             trainer_experience,
             course_reference_number,
             course_run_id,
-        from `jeremy-chia.sg_skillsfuture.trainers`
+        from `jeremy-chia.sg_skillsfuture_staging.trainers`
         where trainer_uuid is not null and trainer_uuid != ''
     ),
 
@@ -45,19 +51,13 @@ with
 
     training_areas as (
         select course_reference_number, area_of_training_id, area_of_training_text,
-        from `jeremy-chia.sg_skillsfuture.training_areas`
-        qualify
-            row_number() over (
-                partition by course_reference_number
-                order by _accessed_at desc, area_of_training_id
-            )
-            = 1
+        from `jeremy-chia.sg_skillsfuture_staging.primary_training_areas`
     ),
 
     training_partners as (
         select distinct
             course_reference_number, training_partner_uen, training_partner_name,
-        from `jeremy-chia.sg_skillsfuture.courses`
+        from `jeremy-chia.sg_skillsfuture_staging.courses`
         where training_partner_uen is not null and training_partner_name is not null
     ),
 
@@ -69,7 +69,7 @@ with
             training_areas.area_of_training_text,
             training_partners.training_partner_uen,
             training_partners.training_partner_name,
-        from `jeremy-chia.sg_skillsfuture.trainers` as trainers
+        from `jeremy-chia.sg_skillsfuture_staging.trainers` as trainers
         left join
             training_areas
             on trainers.course_reference_number = training_areas.course_reference_number
@@ -228,14 +228,5 @@ order by count_areas_of_training desc
 
 """
 
-df = pandas_gbq.read_gbq(
-    query_or_table=sql,
-    project_id=project_id
-)
-
-pandas_gbq.to_gbq(
-    dataframe=df,
-    destination_table=f"{target_schema}.trainers",
-    project_id=project_id,
-    if_exists="replace"
-)
\ No newline at end of file
+if __name__ == "__main__":
+    materialise_model(get_warehouse(project_id), sql, f"{target_schema}.trainers")
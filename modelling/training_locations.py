@@ -1,5 +1,11 @@
 import os
-import pandas_gbq 
+import sys
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.materialise import materialise_model
+from common.warehouse import get_warehouse
 
 project_id = "jeremy-chia"
 target_schema = "jeremy-chia.sg_skillsfuture_models"
@@ -40,7 +46,7 @@ with
             coalesce(address_room, "") as address_room,
             count(distinct course_reference_number) as count_courses,
             count(distinct course_run_id) as count_course_runs,
-        from `jeremy-chia.sg_skillsfuture.course_runs`
+        from `jeremy-chia.sg_skillsfuture_staging.course_runs`
         where
             address_block is not null
             and address_street is not null
@@ -84,14 +90,7 @@ order by address_postal_code, address_room
 
 """
 
-df = pandas_gbq.read_gbq(
-    query_or_table=sql,
-    project_id=project_id
-)
-
-pandas_gbq.to_gbq(
-    dataframe=df,
-    destination_table=f"{target_schema}.training_locations",
-    project_id=project_id,
-    if_exists="replace"
-)
\ No newline at end of file
+if __name__ == "__main__":
+    materialise_model(
+        get_warehouse(project_id), sql, f"{target_schema}.training_locations"
+    )
@@ -1,5 +1,11 @@
 import os
-import pandas_gbq 
+import sys
+
+# Make the repository-level `common` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.materialise import materialise_model
+from common.warehouse import get_warehouse
 
 project_id = "jeremy-chia"
 target_schema = "jeremy-chia.sg_skillsfuture_models"
@@ -7,13 +13,10 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "tokens/gcp_token.json"
 sql = """
 with
     details as (
-        select course_reference_number, count_attendees,
-        from `jeremy-chia.sg_skillsfuture.course_details`
-        qualify
-            row_number() over (
-                partition by course_reference_number order by _accessed_at desc
-            )
-            = 1
+        select
+            course_reference_number,
+            safe_cast(count_attendees as int64) as count_attendees,
+        from `jeremy-chia.sg_skillsfuture_staging.course_details`
     ),
     course_information as (
         select
@@ -36,7 +39,7 @@ with
             date(courses.course_created_date) as course_created_date,
             details.count_attendees,
 
-        from `jeremy-chia.sg_skillsfuture.courses` as courses
+        from `jeremy-chia.sg_skillsfuture_staging.courses` as courses
         left join
             details on courses.course_reference_number = details.course_reference_number
     ),
@@ -63,14 +66,7 @@ from summarise_by_training_partner
 order by count_attendees desc
 """
 
-df = pandas_gbq.read_gbq(
-    query_or_table=sql,
-    project_id=project_id
-)
-
-pandas_gbq.to_gbq(
-    dataframe=df,
-    destination_table=f"{target_schema}.training_providers",
-    project_id=project_id,
-    if_exists="replace"
-)
\ No newline at end of file
+if __name__ == "__main__":
+    materialise_model(
+        get_warehouse(project_id), sql, f"{target_schema}.training_providers"
+    )
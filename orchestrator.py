@@ -0,0 +1,366 @@
+"""
+Dependency-aware runner for the SkillsFuture pipeline.
+
+Runs the extractors and the modelling scripts as stages of one process, sharing a
+single warehouse client. Stages start as soon as their dependencies have finished,
+so the independent models run concurrently. The models read the latest-snapshot
+tables that the `staging` stage builds once per run from the raw tables.
+
+Usage:
+    python orchestrator.py -a                       # full pipeline
+    python orchestrator.py -m                       # modelling only
+    python orchestrator.py --only models.trainers   # a single stage
+    python orchestrator.py --from course_details    # a stage and its dependents
+    python orchestrator.py -m --full-refresh        # rebuild incremental models
+    python orchestrator.py -m --check-incremental   # compare them with a rebuild
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+CREDENTIALS_PATH = "tokens/gcp_token.json"
+MODELS = [
+    "courses",
+    "course_runs",
+    "training_providers",
+    "training_locations",
+    "trainers",
+]
+
+_import_lock = threading.Lock()
+
+
+def load_module(module_name: str, relative_path: str, add_to_path: bool = False):
+    """Imports a script by path under a unique module name."""
+    path = os.path.join(REPO_ROOT, relative_path)
+    with _import_lock:
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        directory = os.path.dirname(path)
+        if add_to_path and directory not in sys.path:
+            sys.path.append(directory)
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+        return module
+
+
+def run_preflight(module, skip_preflight: bool) -> None:
+    """Runs an extractor's preflight checks, raising rather than exiting on failure."""
+    if not skip_preflight and not module.run_preflight(exit_on_failure=False):
+        raise RuntimeError("Preflight checks failed")
+
+
+def run_courses_extractor(skip_preflight: bool) -> None:
+    module = load_module(
+        "extractor_courses_main", "extractor_courses/main.py", add_to_path=True
+    )
+    run_preflight(module, skip_preflight)
+    module.main()
+
+
+def run_details_extractor(skip_preflight: bool) -> None:
+    module = load_module(
+        "extractor_details_main", "extractor_details/main.py", add_to_path=True
+    )
+    run_preflight(module, skip_preflight)
+    module.main(["--skip-preflight"])
+
+
+def run_staging(full_refresh: bool) -> Optional[int]:
+    from common.warehouse import get_warehouse
+
+    module = load_module("modelling_staging", "modelling/staging.py")
+    results = module.materialise_staging(
+        get_warehouse(module.project_id), refresh=full_refresh
+    )
+    return total_bytes([result.bytes_processed for result in results])
+
+
+def run_model(
+    model_name: str, full_refresh: bool, check_incremental: bool = False
+) -> Optional[int]:
+    from common.materialise import (
+        compare_with_full_refresh,
+        materialise_incremental,
+        materialise_model,
+        materialise_unless_unchanged,
+    )
+    from common.warehouse import get_warehouse
+
+    module = load_module(f"modelling_{model_name}", f"modelling/{model_name}.py")
+    warehouse = get_warehouse(module.project_id)
+    destination_table = f"{module.target_schema}.{model_name}"
+
+    def build():
+        # Models with a unique key are updated incrementally unless refreshed
+        if hasattr(module, "unique_key"):
+            return materialise_incremental(
+                warehouse,
+                module.sql,
+                destination_table,
+                full_refresh=full_refresh,
+            )
+        return materialise_model(warehouse, module.sql, destination_table)
+
+    # Skip models last built from the same SQL and unchanged source tables
+    result = materialise_unless_unchanged(
+        warehouse, module.sql, destination_table, build, refresh=full_refresh
+    )
+    if check_incremental and hasattr(module, "unique_key"):
+        differences = compare_with_full_refresh(
+            warehouse, module.sql, destination_table, module.unique_key
+        )
+        if not differences.empty:
+            raise RuntimeError(
+                f"{len(differences)} rows differ from a full refresh, such as\n"
+                f"{differences.head()}"
+            )
+    return result.bytes_processed
+
+
+def total_bytes(byte_counts: List[Optional[int]]) -> Optional[int]:
+    """Sums byte counts, or returns None if any of them is unknown."""
+    if any(count is None for count in byte_counts):
+        return None
+    return sum(byte_counts)
+
+
+@dataclass
+class Stage:
+    name: str
+    # Returns the bytes the stage processed in the warehouse, if it tracks them
+    run: Callable[[], Optional[int]]
+    depends_on: List[str] = field(default_factory=list)
+    status: str = "pending"
+    elapsed_seconds: Optional[float] = None
+    bytes_processed: Optional[int] = None
+
+
+def build_stages(
+    skip_preflight: bool = False,
+    full_refresh: bool = False,
+    check_incremental: bool = False,
+) -> Dict[str, Stage]:
+    stages = [
+        Stage("courses", lambda: run_courses_extractor(skip_preflight)),
+        Stage(
+            "course_details",
+            lambda: run_details_extractor(skip_preflight),
+            depends_on=["courses"],
+        ),
+    ]
+    stages.append(
+        Stage(
+            "staging",
+            lambda: run_staging(full_refresh),
+            depends_on=["courses", "course_details"],
+        )
+    )
+    for model_name in MODELS:
+        stages.append(
+            Stage(
+                f"models.{model_name}",
+                lambda model_name=model_name: run_model(
+                    model_name, full_refresh, check_incremental
+                ),
+                depends_on=["courses", "course_details", "staging"],
+            )
+        )
+    return {stage.name: stage for stage in stages}
+
+
+def dependents_of(stages: Dict[str, Stage], name: str) -> List[str]:
+    """Returns `name` and every stage that depends on it, directly or not."""
+    selected = [name]
+    for stage in stages.values():
+        if stage.name not in selected and any(
+            dependency in selected for dependency in stage.depends_on
+        ):
+            selected.append(stage.name)
+    return selected
+
+
+def run_stages(stages: Dict[str, Stage], selected: List[str], jobs: int) -> bool:
+    """
+    Runs the selected stages, each as soon as its selected dependencies succeed.
+
+    Dependencies outside the selection are assumed to be satisfied. Stages whose
+    dependencies fail are skipped. A stage fails when it raises an exception;
+    KeyboardInterrupt and SystemExit stop the whole run instead.
+
+    Returns:
+        True if every selected stage succeeded.
+    """
+    from common.materialise import format_bytes
+
+    pending = [name for name in stages if name in selected]
+    running = {}
+
+    def run_timed(stage: Stage) -> None:
+        start_time = time.monotonic()
+        try:
+            stage.bytes_processed = stage.run()
+            stage.status = "done"
+        except Exception as e:
+            stage.status = "failed"
+            print(f"✗ Stage {stage.name} failed: {e!r}")
+        finally:
+            stage.elapsed_seconds = time.monotonic() - start_time
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name in list(pending):
+                stage = stages[name]
+                dependencies = [d for d in stage.depends_on if d in selected]
+                if any(stages[d].status in ("failed", "skipped") for d in dependencies):
+                    stage.status = "skipped"
+                    pending.remove(name)
+                elif all(stages[d].status == "done" for d in dependencies):
+                    print(f"→ Starting {name}")
+                    stage.status = "running"
+                    running[executor.submit(run_timed, stage)] = name
+                    pending.remove(name)
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                # Re-raises KeyboardInterrupt and SystemExit from the stage
+                future.result()
+                stage = stages[name]
+                mark = "✓" if stage.status == "done" else "✗"
+                print(f"{mark} {name} {stage.status} in {stage.elapsed_seconds:.1f}s")
+
+    print("\nStage timings:")
+    for name in selected:
+        stage = stages[name]
+        elapsed = (
+            f"{stage.elapsed_seconds:8.1f}s"
+            if stage.elapsed_seconds is not None
+            else " " * 9
+        )
+        processed = (
+            f"  {format_bytes(stage.bytes_processed)} processed"
+            if stage.bytes_processed is not None
+            else ""
+        )
+        print(f"  {name:<28} {stage.status:<8} {elapsed}{processed}")
+
+    modelling = [
+        stages[name].bytes_processed
+        for name in selected
+        if name == "staging" or name.startswith("models.")
+    ]
+    if modelling:
+        print(f"\nModelling: {format_bytes(total_bytes(modelling))} processed")
+
+    return all(stages[name].status == "done" for name in selected)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the SkillsFuture pipeline.")
+    parser.add_argument(
+        "-e", "--extractors", action="store_true", help="Run the extractors."
+    )
+    parser.add_argument(
+        "-m", "--modelling", action="store_true", help="Run the modelling scripts."
+    )
+    parser.add_argument(
+        "-a", "--all", action="store_true", help="Run extractors and modelling."
+    )
+    parser.add_argument(
+        "--only", nargs="+", default=None, help="Run only the named stages."
+    )
+    parser.add_argument(
+        "--from",
+        dest="from_stage",
+        default=None,
+        help="Run the named stage and every stage that depends on it.",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=4, help="Maximum stages running at once."
+    )
+    parser.add_argument(
+        "--skip-preflight", action="store_true", help="Skip preflight checks."
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Rebuild every staging table and model, ignoring the model cache and "
+        "the high-water marks of the incremental models.",
+    )
+    parser.add_argument(
+        "--check-incremental",
+        action="store_true",
+        help="Compare each incremental model with a full rebuild after building "
+        "it, failing the stage if they differ.",
+    )
+    parser.add_argument(
+        "--warehouse",
+        choices=["bigquery", "local"],
+        default=None,
+        help="Run every stage against BigQuery or a local Parquet warehouse.",
+    )
+    parser.add_argument(
+        "--warehouse-dir", default=None, help="Directory of the local warehouse."
+    )
+    parser.add_argument("--list", action="store_true", help="List stages and exit.")
+    args = parser.parse_args(argv)
+
+    stages = build_stages(
+        skip_preflight=args.skip_preflight,
+        full_refresh=args.full_refresh,
+        check_incremental=args.check_incremental,
+    )
+
+    if args.list:
+        for stage in stages.values():
+            depends_on = ", ".join(stage.depends_on) or "-"
+            print(f"{stage.name:<28} depends on: {depends_on}")
+        return 0
+
+    if args.only:
+        unknown = [name for name in args.only if name not in stages]
+        if unknown:
+            parser.error(f"Unknown stages: {', '.join(unknown)}")
+        selected = args.only
+    elif args.from_stage:
+        if args.from_stage not in stages:
+            parser.error(f"Unknown stage: {args.from_stage}")
+        selected = dependents_of(stages, args.from_stage)
+    else:
+        selected = []
+        if args.extractors or args.all:
+            selected += ["courses", "course_details"]
+        if args.modelling or args.all:
+            selected += ["staging"]
+            selected += [f"models.{model_name}" for model_name in MODELS]
+
+    if not selected:
+        parser.print_help()
+        return 0
+
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = CREDENTIALS_PATH
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+    if args.warehouse:
+        from common.warehouse import configure_warehouse
+
+        configure_warehouse(args.warehouse, args.warehouse_dir)
+
+    return 0 if run_stages(stages, selected, args.jobs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
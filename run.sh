@@ -16,6 +16,7 @@ NC='\033[0m' # No Color
 # Default settings
 RUN_EXTRACTORS=false
 RUN_MODELLING=false
+FULL_REFRESH=false
 
 # --------------------------------------------
 # Helper Functions
@@ -46,6 +47,7 @@ show_help() {
     echo "  -e, --extractors    Run extraction scripts (courses & course_details)"
     echo "  -m, --modelling     Run modelling scripts"
     echo "  -a, --all           Run everything (extractors + modelling)"
+    echo "  --full-refresh      Rebuild incremental models from scratch"
     echo "  -h, --help          Show this help message"
     echo ""
     echo "Examples:"
@@ -78,6 +80,10 @@ while [[ $# -gt 0 ]]; do
             RUN_MODELLING=true
             shift
             ;;
+        --full-refresh)
+            FULL_REFRESH=true
+            shift
+            ;;
         -h|--help)
             show_help
             exit 0
@@ -91,47 +97,24 @@ while [[ $# -gt 0 ]]; do
 done
 
 # --------------------------------------------
-# STAGE 1: Extractors
+# Run Stages
 # --------------------------------------------
+# orchestrator.py runs the selected stages in one process, starting each stage
+# once its dependencies finish so that independent models run concurrently.
+STAGE_ARGS=()
 if [ "$RUN_EXTRACTORS" = true ]; then
-    print_header "STAGE 1: Running Extractors"
-    
-    print_step "Extracting courses..."
-    python extractor_courses/main.py
-    print_success "Courses extraction complete"
-    
-    print_step "Extracting course details..."
-    python extractor_details/main.py
-    print_success "Course details extraction complete"
+    STAGE_ARGS+=(--extractors)
 fi
-
-# --------------------------------------------
-# STAGE 2: Modelling
-# --------------------------------------------
 if [ "$RUN_MODELLING" = true ]; then
-    print_header "STAGE 2: Running Modelling"
-    
-    print_step "Building courses model..."
-    python modelling/courses.py
-    print_success "Courses model complete"
-    
-    print_step "Building course_runs model..."
-    python modelling/course_runs.py
-    print_success "Course runs model complete"
-    
-    print_step "Building training_providers model..."
-    python modelling/training_providers.py
-    print_success "Training providers model complete"
-    
-    print_step "Building training_locations model..."
-    python modelling/training_locations.py
-    print_success "Training locations model complete"
-    
-    print_step "Building trainers model..."
-    python modelling/trainers.py
-    print_success "Trainers model complete"
+    STAGE_ARGS+=(--modelling)
+fi
+if [ "$FULL_REFRESH" = true ]; then
+    STAGE_ARGS+=(--full-refresh)
 fi
 
+print_header "Running Pipeline"
+python orchestrator.py "${STAGE_ARGS[@]}"
+
 # --------------------------------------------
 # Summary
 # --------------------------------------------